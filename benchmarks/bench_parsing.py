@@ -0,0 +1,243 @@
+# ---------------------------------------------------------------
+# File        : bench_parsing.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Benchmark the parsing/relay hot path against the recorded frame corpus.
+
+Each case is run over every frame of the corpus (optionally restricted to
+one phase) and reports throughput, per-message latency percentiles and
+allocations. Results can be saved as JSON and compared with a later run.
+
+Usage:
+    python benchmarks/bench_parsing.py [--phase delta] [--repeat 5] [--clients 20]
+    python benchmarks/bench_parsing.py --save base.json
+    python benchmarks/bench_parsing.py --compare base.json
+
+New cases are added to CASES: a name mapped to a setup function that takes
+the corpus tables and returns a callable invoked once per frame (or an async
+function for coroutine paths).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nadex_dashboard import frontend, parsing  # noqa: E402
+from nadex_dashboard.config import Config  # noqa: E402
+from nadex_dashboard.decoder import FrameDecoder  # noqa: E402
+from nadex_dashboard.fanout import ClientSession, JSON, RAW  # noqa: E402
+from nadex_dashboard.messages import FOREX_SCHEMA  # noqa: E402
+from nadex_dashboard.orderbook import TABLE_SCHEMAS  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "frames.jsonl")
+
+def load_corpus(path):
+    """Load the corpus; returns (tables, frames) with frames as (t, phase, data)."""
+    tables, frames = [], []
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["kind"] == "tables":
+                tables = record["tables"]
+            else:
+                frames.append((record["t"], record["phase"], record["data"]))
+    return tables, frames
+
+# ---------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------
+
+def setup_process_message(tables, clients):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        parsing.clear_table_mapping()
+        for table_id, epic, kind in tables:
+            parsing.update_table_mapping(epic, table_id, kind)
+    return parsing.process_message
+
+def setup_decoder(tables, clients):
+    decoder = FrameDecoder()
+    for tbl, pair in parsing.FOREX_TABLES.items():
+        decoder.register(tbl, "FOREX", FOREX_SCHEMA, pair)
+    for table_id, epic, kind in tables:
+        decoder.register(table_id, kind, TABLE_SCHEMAS[kind], epic)
+    return decoder.decode
+
+class _NullClient:
+    """Stand-in frontend connection whose send completes immediately."""
+
+    remote_address = ("bench", 0)
+
+    async def send(self, message):
+        pass
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+def _frontend_case(clients, relay, format=RAW):
+    """
+    Wrap a relay call for the benchmark. Client sessions of the given wire
+    format are (re)created on the running loop, and each call yields once so
+    the writer tasks drain their queues; the measured time covers enqueue
+    plus send work.
+    """
+    state = {"loop": None}
+
+    async def run(data):
+        loop = asyncio.get_running_loop()
+        if state["loop"] is not loop:
+            state["loop"] = loop
+            frontend.frontend_clients.clear()
+            for _ in range(clients):
+                client = _NullClient()
+                session = ClientSession(client, Config.FRONTEND_QUEUE_SIZE, Config.SLOW_CONSUMER_POLICY, format)
+                frontend.frontend_clients[client] = session
+                session.start()
+        await relay(data)
+        await asyncio.sleep(0)
+    return run
+
+def setup_relay_to_frontend(tables, clients):
+    return _frontend_case(clients, frontend.relay_to_frontend)
+
+def setup_relay_updates(tables, clients):
+    decode = setup_decoder(tables, clients)
+
+    async def relay(data):
+        frontend.relay_updates(decode(data))
+    # Unfiltered raw clients take the frames as received; decoded updates go to the others
+    return _frontend_case(clients, relay, JSON)
+
+CASES = {
+    "decoder.decode": setup_decoder,
+    "parsing.process_message": setup_process_message,
+    "frontend.relay_to_frontend": setup_relay_to_frontend,
+    "frontend.relay_updates": setup_relay_updates,
+}
+
+# ---------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(int(round(pct / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+def _run_once(fn, frames):
+    """Run fn over all frames; returns per-message latencies in ns."""
+    latencies = []
+    clock = time.perf_counter_ns
+    if asyncio.iscoroutinefunction(fn):
+        async def drive():
+            for data in frames:
+                start = clock()
+                await fn(data)
+                latencies.append(clock() - start)
+        asyncio.run(drive())
+    else:
+        for data in frames:
+            start = clock()
+            fn(data)
+            latencies.append(clock() - start)
+    return latencies
+
+def _measure_allocations(fn, frames):
+    """Peak traced memory and net allocated blocks per message over one pass."""
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    _run_once(fn, frames)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    blocks_after = sys.getallocatedblocks()
+    return peak, (blocks_after - blocks_before) / max(len(frames), 1)
+
+def run_case(name, setup, tables, frames, repeat, clients):
+    updates = sum(data.count("(") for data in frames)
+    fn = setup(tables, clients)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        _run_once(fn, frames)  # warm-up
+        best_total, all_latencies = None, []
+        for _ in range(repeat):
+            latencies = _run_once(fn, frames)
+            total = sum(latencies)
+            if best_total is None or total < best_total:
+                best_total = total
+            all_latencies.extend(latencies)
+        peak, blocks = _measure_allocations(fn, frames)
+    all_latencies.sort()
+    seconds = best_total / 1e9
+    return {
+        "case": name,
+        "messages": len(frames),
+        "msgs_per_sec": len(frames) / seconds if seconds else 0.0,
+        "updates_per_sec": updates / seconds if seconds else 0.0,
+        "p50_us": _percentile(all_latencies, 50) / 1000,
+        "p90_us": _percentile(all_latencies, 90) / 1000,
+        "p99_us": _percentile(all_latencies, 99) / 1000,
+        "max_us": all_latencies[-1] / 1000 if all_latencies else 0.0,
+        "peak_kib": peak / 1024,
+        "blocks_per_msg": blocks,
+    }
+
+def print_results(results, baseline=None):
+    base = {r["case"]: r for r in (baseline or [])}
+    print("\n" + "=" * 108)
+    print(f"{'Case':<28} {'msgs/s':>10} {'updates/s':>11} {'p50 us':>8} {'p90 us':>8} "
+          f"{'p99 us':>8} {'max us':>9} {'peak KiB':>9} {'blk/msg':>8} {'vs base':>8}")
+    print("-" * 108)
+    for r in results:
+        delta = ""
+        if r["case"] in base and base[r["case"]]["updates_per_sec"]:
+            delta = f"{r['updates_per_sec'] / base[r['case']]['updates_per_sec']:.2f}x"
+        print(f"{r['case']:<28} {r['msgs_per_sec']:>10.0f} {r['updates_per_sec']:>11.0f} {r['p50_us']:>8.1f} "
+              f"{r['p90_us']:>8.1f} {r['p99_us']:>8.1f} {r['max_us']:>9.1f} {r['peak_kib']:>9.1f} "
+              f"{r['blocks_per_msg']:>8.2f} {delta:>8}")
+    print("=" * 108)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Nadex parsing hot path")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--phase", choices=["snapshot", "delta", "heartbeat"], help="only frames of this phase")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="run only these cases")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes per case (best is reported)")
+    parser.add_argument("--clients", type=int, default=20, help="fake frontend clients for relay cases")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    args = parser.parse_args()
+
+    tables, frames = load_corpus(args.corpus)
+    frames = [data for _, phase, data in frames if args.phase in (None, phase)]
+    print(f"[+] Corpus: {len(frames)} frames, {len(tables)} strike tables, python {sys.version.split()[0]}")
+
+    results = [run_case(name, CASES[name], tables, frames, args.repeat, args.clients)
+               for name in (args.case or CASES)]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "phase": args.phase, "results": results}, f, indent=2)
+        print(f"[+] Saved results to {args.save}")
+
+if __name__ == "__main__":
+    main()
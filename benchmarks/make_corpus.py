@@ -0,0 +1,136 @@
+# ---------------------------------------------------------------
+# File        : make_corpus.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Generate the benchmark frame corpus (corpus/frames.jsonl).
+
+The corpus mirrors a full forex strike subscription: a z() snapshot burst
+for every table right after send_strike_subscriptions, then steady-state
+d() MERGE deltas and heartbeats. Output is deterministic for a given seed.
+
+Format, one JSON object per line:
+    {"kind": "tables", "tables": [[table_id, epic, type], ...]}
+    {"kind": "frame", "t": <seconds since start>, "phase": "snapshot|delta|heartbeat", "data": "<frame>"}
+
+Usage:
+    python benchmarks/make_corpus.py [--strikes 12] [--deltas 1500] [--seed 7]
+"""
+
+import argparse
+import json
+import os
+import random
+
+PAIRS = {
+    8: ("AUD-USD", 0.6650, 5),
+    9: ("EUR-USD", 1.0845, 5),
+    10: ("GBP-USD", 1.2710, 5),
+    11: ("USD-JPY", 151.20, 3),
+    12: ("EUR-JPY", 163.90, 3),
+    13: ("GBP-JPY", 192.15, 3),
+    14: ("USD-CAD", 1.3630, 5),
+}
+
+FIRST_STRIKE_TABLE = 15
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "frames.jsonl")
+
+def _q(value):
+    """Quote a field value the way the Lightstreamer JS protocol does."""
+    return f"'{value}'"
+
+def _clock(t):
+    secs = 14 * 3600 + 35 * 60 + int(t)
+    return f"{secs // 3600:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}"
+
+def _book_fields(rng, level1_bid):
+    fields = []
+    for level in range(5):
+        bid = max(level1_bid - level * rng.choice((0.25, 0.5, 1.0)), 0.25)
+        ask = min(bid + rng.choice((1.5, 2.0, 2.5, 3.0)), 99.75)
+        # LS_id order: BDn, AKn, BSn, ASn
+        fields += [_q(f"{bid:.2f}"), _q(f"{ask:.2f}"), _q(rng.randint(1, 250)), _q(rng.randint(1, 250))]
+    return fields
+
+def build_corpus(strikes, deltas, seed):
+    rng = random.Random(seed)
+    tables = []
+    table_id = FIRST_STRIKE_TABLE
+    strike_state = {}
+    for fx_table, (pair, _, _) in PAIRS.items():
+        for n in range(1, strikes + 1):
+            epic = f"NB.I.{pair}.OPT-1-{n}-18Oct26.IP"
+            tables.append([table_id, epic, "STRIKE"])
+            tables.append([table_id + 1, epic, "ORDERBOOK"])
+            strike_state[table_id] = (fx_table, rng.uniform(5, 95))
+            table_id += 2
+
+    records = [{"kind": "tables", "tables": tables}]
+    t = 0.0
+
+    # Snapshot burst: forex underlyings, then every strike table in frames of ~12 calls
+    spot = {tbl: base for tbl, (_, base, _) in PAIRS.items()}
+    calls = [f"z({tbl},1,{_q(f'{spot[tbl]:.{dp}f}')},{_q(_clock(t))})" for tbl, (_, _, dp) in PAIRS.items()]
+    for tbl, epic, kind in tables:
+        mid = strike_state[tbl if kind == "STRIKE" else tbl - 1][1]
+        if kind == "STRIKE":
+            fields = [_q(f"{mid - 1:.2f}"), _q(f"{mid + 1:.2f}"), _q(rng.randint(1, 250)),
+                      _q(rng.randint(1, 250)), _q(_clock(t)), "$", _q("TRADEABLE"), "$", "$"]
+        else:
+            fields = _book_fields(rng, mid - 1)
+        calls.append(f"z({tbl},1,{','.join(fields)})")
+    for i in range(0, len(calls), 12):
+        t += 0.002
+        records.append({"kind": "frame", "t": round(t, 6), "phase": "snapshot", "data": ";".join(calls[i:i + 12]) + ";"})
+
+    # Steady state: d() deltas with '#' for unchanged fields, heartbeats every second
+    next_heartbeat = 1.0
+    for _ in range(deltas):
+        t += rng.expovariate(40.0)
+        if t >= next_heartbeat:
+            records.append({"kind": "frame", "t": round(next_heartbeat, 6), "phase": "heartbeat",
+                            "data": f"d(1,1,{_q(int(next_heartbeat * 1000))});"})
+            next_heartbeat += 1.0
+        calls = []
+        for _ in range(rng.randint(1, 8)):
+            if rng.random() < 0.2:
+                tbl = rng.choice(list(PAIRS))
+                dp = PAIRS[tbl][2]
+                spot[tbl] *= 1 + rng.gauss(0, 0.00005)
+                calls.append(f"d({tbl},1,{_q(f'{spot[tbl]:.{dp}f}')},{_q(_clock(t))})")
+                continue
+            tbl, epic, kind = rng.choice(tables)
+            mid = strike_state[tbl if kind == "STRIKE" else tbl - 1][1] + rng.gauss(0, 2)
+            mid = min(max(mid, 2.0), 98.0)
+            if kind == "STRIKE":
+                fields = [_q(f"{mid - 1:.2f}"), _q(f"{mid + 1:.2f}"), "#", _q(rng.randint(1, 250)),
+                          _q(_clock(t)), "#", "#", "#", "#"]
+            else:
+                fields = ["#"] * 20
+                for pos in rng.sample(range(20), rng.randint(1, 6)):
+                    fields[pos] = _q(f"{mid:.2f}") if pos % 4 < 2 else _q(rng.randint(1, 250))
+            calls.append(f"d({tbl},1,{','.join(fields)})")
+        records.append({"kind": "frame", "t": round(t, 6), "phase": "delta", "data": ";".join(calls) + ";"})
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the benchmark frame corpus")
+    parser.add_argument("--strikes", type=int, default=12, help="strike epics per forex pair")
+    parser.add_argument("--deltas", type=int, default=1500, help="number of steady-state delta frames")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    records = build_corpus(args.strikes, args.deltas, args.seed)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"[+] Wrote {len(records) - 1} frames to {args.output}")
+
+if __name__ == "__main__":
+    main()
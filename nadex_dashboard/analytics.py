@@ -0,0 +1,159 @@
+# ---------------------------------------------------------------
+# File        : analytics.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Strike-ladder analytics. For every underlying, the strike epics subscribed
+on it form a Ladder: NumPy arrays aligned by strike, sorted by strike level,
+of the level and the best bid/ask and their sizes, plus derived arrays:
+
+    mid          (bid + ask) / 2
+    spread       ask - bid
+    probability  mid / 100, the market's implied P(spot above level) at expiry
+    distance     spot - level, against the underlying's forex price (tables 8-14)
+
+The ladders are slices of one set of columns over every subscribed strike,
+so recomputing all of them is a handful of array operations. At the end of
+each decoded frame the strikes and spots it touched write their row once,
+then refresh() recomputes the derived columns if anything changed. Strike levels come from market
+discovery (the instrument name, e.g. "EUR/USD >1.08450 (3PM)"); until one is
+known the level and distance of that strike are NaN.
+
+    ladder = parsing.ladders.get("EURUSD")
+    ladder.level, ladder.probability, ladder.distance
+"""
+
+import math
+import re
+
+import numpy as np
+
+# "EUR/USD >1.08450 (3PM)" -> 1.08450
+_LEVEL_RE = re.compile(r">\s*(-?\d+(?:\.\d+)?)")
+
+def parse_level(instrument_name):
+    """Strike level from a Nadex instrument name, or None."""
+    match = _LEVEL_RE.search(instrument_name or "")
+    return float(match.group(1)) if match else None
+
+# Columns per strike; each Ladder holds a view of its rows of every one
+COLUMNS = ("level", "bid", "ask", "bid_size", "ask_size", "mid", "spread", "probability", "distance")
+
+class Ladder:
+    """Aligned strike arrays of one underlying (views into the StrikeLadders columns)."""
+
+    __slots__ = ("pair", "epics", "rows", "spot") + COLUMNS
+
+    def __init__(self, pair, epics, rows, columns):
+        self.pair = pair
+        self.epics = epics
+        self.rows = rows
+        self.spot = math.nan
+        for field in COLUMNS:
+            setattr(self, field, columns[field][rows])
+
+    def to_dict(self):
+        """The ladder as plain Python lists (NaN for missing values)."""
+        return {
+            "pair": self.pair, "epics": list(self.epics), "spot": self.spot,
+            **{field: getattr(self, field).tolist() for field in COLUMNS},
+        }
+
+class StrikeLadders:
+    """Ladders per underlying pair key, rebuilt when the table mapping or levels change."""
+
+    def __init__(self, order_books, table_underlying):
+        self.order_books = order_books
+        self.table_underlying = table_underlying
+        self.levels = {}    # epic -> strike level, from discovery
+        self.spots = {}     # pair -> latest forex price
+        self.ladders = {}   # pair -> Ladder
+        self.rows = {}      # epic -> row
+        self._allocate(0)
+        self.dirty = False
+        self.stale = True
+
+    def _allocate(self, n):
+        self.columns = {field: np.full(n, np.nan) for field in COLUMNS}
+        self.spot_column = np.full(n, np.nan)
+        self.bid, self.ask = self.columns["bid"], self.columns["ask"]
+        self.bid_size, self.ask_size = self.columns["bid_size"], self.columns["ask_size"]
+
+    def invalidate(self):
+        """The table mapping changed; rebuild on the next refresh."""
+        self.stale = True
+
+    def set_levels(self, levels):
+        """
+        Take the strike levels of a discovery pass. Levels of epics no longer
+        listed are dropped unless they are still subscribed.
+        """
+        kept = {epic: level for epic, level in self.levels.items() if epic in self.rows}
+        kept.update(levels)
+        self.levels = kept
+        self.stale = True
+
+    def get(self, pair):
+        return self.ladders.get(pair)
+
+    def update(self, book):
+        """Copy the top of an updated order book into its row."""
+        row = self.rows.get(book.epic)
+        if row is not None:
+            self.bid[row] = book.bids[0]
+            self.ask[row] = book.asks[0]
+            self.bid_size[row] = book.bid_sizes[0]
+            self.ask_size[row] = book.ask_sizes[0]
+            self.dirty = True
+
+    def spot(self, pair, price):
+        """Set the forex price of an underlying."""
+        self.spots[pair] = price
+        ladder = self.ladders.get(pair)
+        if ladder is not None:
+            ladder.spot = price
+            self.spot_column[ladder.rows] = price
+            self.dirty = True
+
+    def refresh(self):
+        """Recompute the derived columns of every ladder if anything changed."""
+        if self.stale:
+            self._rebuild()
+        if not self.dirty:
+            return
+        self.dirty = False
+        c = self.columns
+        np.add(self.bid, self.ask, out=c["mid"])
+        c["mid"] *= 0.5
+        np.subtract(self.ask, self.bid, out=c["spread"])
+        np.multiply(c["mid"], 0.01, out=c["probability"])
+        np.subtract(self.spot_column, c["level"], out=c["distance"])
+
+    def _rebuild(self):
+        self.stale = False
+        groups = {}
+        for table_id, (book, _) in self.order_books.tables.items():
+            pair = self.table_underlying.get(table_id)
+            if pair is not None:
+                groups.setdefault(pair, {})[book.epic] = book
+        levels = self.levels
+        self._allocate(sum(len(books) for books in groups.values()))
+        self.ladders, self.rows = {}, {}
+        start = 0
+        for pair, books in groups.items():
+            # By level; strikes without a known level go last, in epic order
+            epics = sorted(books, key=lambda e: (e not in levels, levels.get(e, 0.0), e))
+            rows = slice(start, start + len(epics))
+            for row, epic in enumerate(epics, start):
+                self.columns["level"][row] = levels.get(epic, math.nan)
+                self.rows[epic] = row
+                self.update(books[epic])
+            ladder = self.ladders[pair] = Ladder(pair, epics, rows, self.columns)
+            ladder.spot = self.spots.get(pair, math.nan)
+            self.spot_column[rows] = ladder.spot
+            start = rows.stop
+        self.dirty = True
@@ -0,0 +1,110 @@
+# ---------------------------------------------------------------
+# File        : cache.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+On-disk warm-start cache for the session token, the market tree, navigation
+nodes and the epic mapping built from them. Each key is one JSON file in
+Config.CACHE_DIR holding {"saved": unix time, "etag", "last_modified", "data"}.
+An empty CACHE_DIR disables the cache.
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+
+from .config import Config
+
+def _path(key):
+    return os.path.join(Config.CACHE_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", str(key)) + ".json")
+
+def load_entry(key):
+    """The raw cache entry for key, or None."""
+    if not Config.CACHE_DIR:
+        return None
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load(key, ttl):
+    """Cached data for key if younger than ttl seconds, else None."""
+    entry = load_entry(key)
+    if entry is None or time.time() - entry.get("saved", 0) > ttl:
+        return None
+    return entry.get("data")
+
+def save(key, data, etag=None, last_modified=None, private=False):
+    """Store data under key atomically; private files are readable by the owner only."""
+    if not Config.CACHE_DIR:
+        return
+    entry = {"saved": time.time(), "etag": etag, "last_modified": last_modified, "data": data}
+    try:
+        os.makedirs(Config.CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=Config.CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        if private:
+            os.chmod(tmp, 0o600)
+        os.replace(tmp, _path(key))
+    except OSError as e:
+        print(f"[ERROR] Failed to write cache {key}: {e}")
+
+def invalidate(key):
+    """Remove a cache entry."""
+    if not Config.CACHE_DIR:
+        return
+    try:
+        os.remove(_path(key))
+    except OSError:
+        pass
+
+def conditional_get(session, key, url, headers, ttl=0):
+    """
+    GET a JSON document through the cache. Within ttl the cached copy is
+    returned without a request; after that the request carries
+    If-None-Match/If-Modified-Since and a 304 keeps the cached copy.
+    """
+    entry = load_entry(key)
+    if entry is not None and time.time() - entry.get("saved", 0) <= ttl:
+        return entry["data"]
+    hdrs = dict(headers)
+    if entry is not None:
+        if entry.get("etag"):
+            hdrs["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            hdrs["If-Modified-Since"] = entry["last_modified"]
+    resp = session.get(url, headers=hdrs)
+    if resp.status_code == 304 and entry is not None:
+        save(key, entry["data"], entry.get("etag"), entry.get("last_modified"))
+        return entry["data"]
+    resp.raise_for_status()
+    data = resp.json()
+    save(key, data, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return data
+
+def save_mapping(fx_ids, mapping, levels=None):
+    """Cache discovered forex ids, their {mid: {underlying: [epics]}} mapping and {epic: strike level}."""
+    rows = [[mid, ue, eps] for mid, ueps in mapping.items() for ue, eps in ueps.items()]
+    save("mapping", {"fx_ids": fx_ids, "rows": rows, "levels": levels or {}})
+
+def load_mapping():
+    """Cached (fx_ids, mapping, levels, age seconds) if younger than MAPPING_CACHE_TTL, else None."""
+    entry = load_entry("mapping")
+    if entry is None:
+        return None
+    age = time.time() - entry.get("saved", 0)
+    if age > Config.MAPPING_CACHE_TTL:
+        return None
+    mapping = defaultdict(lambda: defaultdict(list))
+    for mid, ue, eps in entry["data"]["rows"]:
+        mapping[mid][ue].extend(eps)
+    return entry["data"]["fx_ids"], mapping, entry["data"].get("levels", {}), age
@@ -23,13 +23,94 @@ class Config:
     NADEX_MARKET_TREE_URL = os.getenv('NADEX_MARKET_TREE_URL', 'https://demo-trade.nadex.com/iDeal/markets/hierarchy/tree/full')
     NADEX_NAVIGATION_URL = os.getenv('NADEX_NAVIGATION_URL', 'https://demo-trade.nadex.com/iDeal/markets/navigation')
     FRONTEND_PORT = os.getenv('FRONTEND_PORT', '8765')
+    # Lightstreamer WebSocket scheme; ws for the local fake server (fakeserver.py)
+    NADEX_WS_SCHEME = os.getenv('NADEX_WS_SCHEME', 'wss')
 
     PING_INTERVAL = int(os.getenv('PING_INTERVAL', 30))
     RESUBSCRIBE_INTERVAL = int(os.getenv('RESUBSCRIBE_INTERVAL', 300))
+
+    # Reconnect supervision: seconds without any Nadex frame before the
+    # connection counts as stalled, and the jittered exponential backoff range
+    STALL_TIMEOUT = float(os.getenv('STALL_TIMEOUT', 45))
+    RECONNECT_BASE_DELAY = float(os.getenv('RECONNECT_BASE_DELAY', 1))
+    RECONNECT_MAX_DELAY = float(os.getenv('RECONNECT_MAX_DELAY', 30))
+
+    # Sharded ingest: number of Lightstreamer sessions the strikes are split
+    # across, by underlying or hash, table ids reserved per shard, and
+    # whether shards run in worker processes (with a bounded event queue)
+    SHARDS = int(os.getenv('SHARDS', 1))
+    SHARD_BY = os.getenv('SHARD_BY', 'underlying')
+    SHARD_TABLE_SPAN = int(os.getenv('SHARD_TABLE_SPAN', 10000))
+    SHARD_PROCESSES = os.getenv('SHARD_PROCESSES', 'false').lower() in ('1', 'true', 'yes')
+    SHARD_QUEUE_SIZE = int(os.getenv('SHARD_QUEUE_SIZE', 10000))
+
+    # Rollover scheduling: start discovering the next cycle's strikes this many
+    # seconds before the 5-minute boundary, poll for new listings every
+    # PREFETCH_POLL seconds, and delete expired strikes RETIRE_GRACE seconds after it
+    PREFETCH_LEAD = float(os.getenv('PREFETCH_LEAD', 30))
+    PREFETCH_POLL = float(os.getenv('PREFETCH_POLL', 10))
+    RETIRE_GRACE = float(os.getenv('RETIRE_GRACE', 5))
     INITIAL_TABLE_COUNTER = int(os.getenv('INITIAL_TABLE_COUNTER', 15))
     INITIAL_REQ_PHASE_COUNTER = int(os.getenv('INITIAL_REQ_PHASE_COUNTER', 663))
     WIN_PHASE = int(os.getenv('WIN_PHASE', 63))
 
+    # Subscription pipeline: control requests per frame, max tables awaiting
+    # their first snapshot, and seconds to wait for a snapshot before giving up
+    CONTROL_BATCH_SIZE = int(os.getenv('CONTROL_BATCH_SIZE', 20))
+    SUBSCRIBE_WINDOW = int(os.getenv('SUBSCRIBE_WINDOW', 200))
+    SUBSCRIBE_ACK_TIMEOUT = float(os.getenv('SUBSCRIBE_ACK_TIMEOUT', 5))
+
+    # Warm-start cache (empty CACHE_DIR disables it). TTLs in seconds: the
+    # tree is revalidated after TREE_CACHE_TTL, a cached mapping is used to
+    # subscribe at startup if younger than MAPPING_CACHE_TTL
+    CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'nadex_dashboard'))
+    TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 1800))
+    TREE_CACHE_TTL = int(os.getenv('TREE_CACHE_TTL', 3600))
+    MAPPING_CACHE_TTL = int(os.getenv('MAPPING_CACHE_TTL', 900))
+
+    # Per-update logging: level, enabled categories (forex, option, mapping,
+    # ping, frontend or all), 1-in-N sampling ("10" or "option=10,forex=2")
+    # and quiet mode (only per-second counts)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_CATEGORIES = os.getenv('LOG_CATEGORIES', 'all')
+    LOG_SAMPLE = os.getenv('LOG_SAMPLE', '1')
+    LOG_QUIET = os.getenv('LOG_QUIET', 'false').lower() in ('1', 'true', 'yes')
+
+    # In-memory tick history: ticks and bars kept per epic/underlying
+    HISTORY_TICKS = int(os.getenv('HISTORY_TICKS', 2048))
+    HISTORY_BARS = int(os.getenv('HISTORY_BARS', 240))
+
+    # Terminal dashboard (--tui) redraws per second
+    TUI_FPS = float(os.getenv('TUI_FPS', 10))
+
+    # Prometheus text metrics endpoint (0 disables it); fan-out worker
+    # processes serve theirs on the following ports
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+
+    # Max navigation requests in flight during market discovery
+    DISCOVERY_CONCURRENCY = int(os.getenv('DISCOVERY_CONCURRENCY', 8))
+
+    # Tick recorder (empty RECORD_DIR disables it): segment file size in bytes
+    # and rotation period in seconds, aligned to the clock
+    RECORD_DIR = os.getenv('RECORD_DIR', '')
+    RECORD_SEGMENT_SIZE = int(os.getenv('RECORD_SEGMENT_SIZE', 64 * 1024 * 1024))
+    RECORD_SEGMENT_SECONDS = int(os.getenv('RECORD_SEGMENT_SECONDS', 300))
+
+    # Multi-process fan-out: worker processes serving FRONTEND_PORT from a
+    # shared-memory ring of RING_BUFFER_SIZE bytes (0 workers = in-process)
+    FANOUT_PROCESSES = int(os.getenv('FANOUT_PROCESSES', 0))
+    RING_BUFFER_SIZE = int(os.getenv('RING_BUFFER_SIZE', 16 * 1024 * 1024))
+
+    # Frontend fan-out: per-client outbound queue bound and slow-consumer
+    # policy (drop_oldest | conflate | disconnect)
+    FRONTEND_QUEUE_SIZE = int(os.getenv('FRONTEND_QUEUE_SIZE', 1000))
+    SLOW_CONSUMER_POLICY = os.getenv('SLOW_CONSUMER_POLICY', 'drop_oldest')
+
+    # Default per-client flush rate (flushes/sec, 0 = unlimited); updates are
+    # conflated per table between flushes. Clients can override it.
+    FRONTEND_MAX_RATE = float(os.getenv('FRONTEND_MAX_RATE', 0))
+
 # Headers for authentication
 AUTH_HEADERS = {
     "Accept": "application/json; charset=UTF-8",
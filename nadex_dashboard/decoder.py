@@ -0,0 +1,236 @@
+# ---------------------------------------------------------------
+# File        : decoder.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import json
+import re
+
+from .wire import encode_update_body
+
+# One z()/d() call: kind, table id, and the ",field,field..." argument tail.
+# Quoted values may contain ',' ')' and backslash-escaped quotes; whitespace
+# is allowed around the call arguments.
+CALL_RE = re.compile(r"([zd])\(\s*(\d+)\s*,\s*\d+\s*(,[^)']*(?:'[^'\\]*(?:\\.[^'\\]*)*'[^)']*)*)\)")
+
+# Slow-path field tokenizer, used for escapes, whitespace and quoted commas
+FIELD_RE = re.compile(r",\s*(?:'([^'\\]*(?:\\.[^'\\]*)*)'\s*|([^,]*))")
+
+# Backslash escapes inside quoted values: \uXXXX or a single escaped character
+ESCAPE_RE = re.compile(r"\\(u[0-9a-fA-F]{4}|.)", re.S)
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t"}
+
+# Lightstreamer markers: '#' = null/unchanged, '$' = empty string
+NULL = "#"
+EMPTY = "$"
+_MARKERS = {NULL: None, EMPTY: ""}
+
+class TableSchema:
+    """Field layout of a subscribed table."""
+
+    __slots__ = ("table_id", "kind", "fields", "name", "mode", "index")
+
+    def __init__(self, table_id, kind, fields, name=None, mode="MERGE"):
+        self.table_id = table_id
+        self.kind = kind
+        self.fields = tuple(fields)
+        self.name = name
+        self.mode = mode
+        self.index = {field: i for i, field in enumerate(self.fields)}
+
+class Update:
+    """
+    A single decoded table update. values is positional per schema field:
+    None for unchanged (#), '' for empty ($), otherwise the raw string.
+    received is the perf_counter() time its frame arrived, if known.
+    """
+
+    __slots__ = ("kind", "table", "values", "schema", "received", "_raw", "_json", "_binary")
+
+    def __init__(self, kind, table, values, schema):
+        self.kind = kind
+        self.table = table
+        self.values = values
+        self.schema = schema
+        self.received = None
+        self._raw = None
+        self._json = None
+        self._binary = None
+
+    @property
+    def is_snapshot(self):
+        return self.kind == "z"
+
+    def get(self, field, default=None):
+        """Get a field value by schema name."""
+        i = self.schema.index.get(field)
+        if i is None or i >= len(self.values):
+            return default
+        value = self.values[i]
+        return default if value is None else value
+
+    def fields(self):
+        """Return changed fields as a {name: value} dict."""
+        return {name: value for name, value in zip(self.schema.fields, self.values) if value is not None}
+
+    def merge(self, newer):
+        """
+        Conflate a newer update for the same table into this one.
+        Fields the newer update leaves unchanged keep their current value;
+        a snapshot stays a snapshot.
+        """
+        values = list(self.values)
+        if len(newer.values) > len(values):
+            values.extend([None] * (len(newer.values) - len(values)))
+        for i, value in enumerate(newer.values):
+            if value is not None:
+                values[i] = value
+        merged = Update(self.kind if self.kind == "z" else newer.kind, self.table, values, self.schema)
+        merged.received = self.received
+        return merged
+
+    def to_raw(self):
+        """Encode as a Lightstreamer z()/d() call. Cached, so shared by all consumers."""
+        if self._raw is None:
+            fields = ",".join(
+                NULL if v is None else (EMPTY if v == "" else "'" + _escape(v) + "'")
+                for v in self.values
+            )
+            self._raw = f"{self.kind}({self.table},1,{fields})"
+        return self._raw
+
+    def to_json(self):
+        """
+        Encode the body of a JSON update object, without braces, so callers
+        can prepend per-client fields such as a sequence number. Cached.
+        Snapshots also carry the table kind and name (epic or pair).
+        """
+        if self._json is None:
+            body = {"table": self.table}
+            if self.kind == "z":
+                body["kind"] = self.schema.kind
+                body["name"] = self.schema.name
+            body["fields"] = self.fields()
+            self._json = json.dumps(body, separators=(",", ":"))[1:-1]
+        return self._json
+
+    def to_binary(self):
+        """Encode as a binary update record without sequence number (see wire.py). Cached."""
+        if self._binary is None:
+            self._binary = encode_update_body(self.table, self.values)
+        return self._binary
+
+def _unescape_char(match):
+    code = match.group(1)
+    return chr(int(code[1:], 16)) if len(code) == 5 else _ESCAPES.get(code, code)
+
+def _escape(value):
+    """Quote-safe form of a value for a '...' field."""
+    if "'" in value or "\\" in value:
+        return value.replace("\\", "\\\\").replace("'", "\\'")
+    return value
+
+def split_fields(argtail):
+    """
+    Split a ",field,field..." argument tail into positional values,
+    keeping '#' and '$' markers in place and unescaping quoted values.
+    """
+    values = []
+    for quoted, bare in FIELD_RE.findall(argtail):
+        bare = bare.strip()
+        if bare == NULL:
+            values.append(None)
+        elif bare == EMPTY:
+            values.append("")
+        elif bare:
+            values.append(bare)
+        else:
+            values.append(ESCAPE_RE.sub(_unescape_char, quoted) if "\\" in quoted else quoted)
+    return values
+
+class MergedState:
+    """Latest merged field values of each MERGE-mode table, for snapshots."""
+
+    def __init__(self):
+        self.tables = {}  # table_id -> (schema, values)
+
+    def apply(self, update):
+        """Merge an update into its table's state."""
+        if update.schema.mode != "MERGE":
+            return
+        entry = self.tables.get(update.table)
+        if entry is None or entry[0] is not update.schema:
+            self.tables[update.table] = (update.schema, list(update.values))
+            return
+        values = entry[1]
+        if len(update.values) > len(values):
+            values.extend([None] * (len(update.values) - len(values)))
+        for i, value in enumerate(update.values):
+            if value is not None:
+                values[i] = value
+
+    def snapshot(self, wanted=None):
+        """
+        Return the current state as z() updates, optionally filtered by
+        wanted(schema) -> bool.
+        """
+        return [
+            Update("z", table_id, list(values), schema)
+            for table_id, (schema, values) in self.tables.items()
+            if wanted is None or wanted(schema)
+        ]
+
+    def discard(self, table_id):
+        self.tables.pop(table_id, None)
+
+    def clear(self):
+        self.tables.clear()
+
+class FrameDecoder:
+    """
+    Single-pass decoder for Lightstreamer text frames.
+    Each call is tokenized once and routed by table id to its registered schema;
+    calls for unregistered tables are skipped without splitting their fields.
+    """
+
+    def __init__(self):
+        self.schemas = {}  # table_id -> TableSchema
+
+    def register(self, table_id, kind, fields, name=None, mode="MERGE"):
+        """Register the field schema of a subscribed table."""
+        schema = TableSchema(table_id, kind, fields, name, mode)
+        self.schemas[table_id] = schema
+        return schema
+
+    def unregister(self, table_id):
+        """Forget a table's schema."""
+        self.schemas.pop(table_id, None)
+
+    def decode(self, frame):
+        """Decode all z()/d() calls for registered tables in a frame."""
+        schemas = self.schemas
+        marker = _MARKERS.get
+        updates = []
+        for kind, table, argtail in CALL_RE.findall(frame):
+            schema = schemas.get(int(table))
+            if schema is None:
+                continue
+            if "\\" in argtail or " " in argtail:
+                values = split_fields(argtail)
+            else:
+                # Without escapes, quotes only delimit values: the odd pieces
+                # between them are the quoted values. If none holds a comma,
+                # dropping the quotes and splitting on commas is exact. Schema
+                # fields carry prices, sizes and status codes, never a literal '#'/'$'.
+                pieces = argtail.split("'")
+                if not len(pieces) % 2 or "," in "".join(pieces[1::2]):
+                    values = split_fields(argtail)
+                else:
+                    tokens = "".join(pieces).split(",")
+                    del tokens[0]
+                    values = [marker(tok, tok) for tok in tokens]
+            updates.append(Update(kind, schema.table_id, values, schema))
+        return updates
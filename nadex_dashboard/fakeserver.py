@@ -0,0 +1,333 @@
+# ---------------------------------------------------------------
+# File        : fakeserver.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Local stand-in for the Nadex endpoints the dashboard uses, for offline
+end-to-end and load testing:
+
+    POST /iDeal/v2/security/authenticate      x-security-token header
+    POST /lightstreamer/create_session.js     start('<sid>', '<host>') / setPhase(n)
+    GET  /iDeal/markets/hierarchy/tree/full   5 Minute Binaries > Forex markets
+    GET  /iDeal/markets/navigation/<id>       strikes of the current 5-minute cycle
+                                              (and the next one, LEAD seconds ahead)
+    ws   /lightstreamer                       bind_session, control add/delete,
+                                              constrain (answered with PONG),
+                                              z() snapshots and d() updates
+
+Prices are synthetic: each pair's spot follows a random walk and strike
+prices follow the spot. --rate sets the total updates per second over all
+subscribed tables on a connection, sent every --interval ms in one frame.
+
+Usage:
+    python -m nadex_dashboard.fakeserver --rate 5000
+and point the dashboard at it with the environment lines it prints.
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import websockets
+
+from .messages import FOREX_SCHEMA
+
+# Pair -> (starting spot, decimals)
+PAIRS = {
+    "AUD-USD": (0.66500, 5),
+    "EUR-USD": (1.08450, 5),
+    "GBP-USD": (1.27100, 5),
+    "USD-JPY": (151.200, 3),
+    "EUR-JPY": (163.900, 3),
+    "GBP-JPY": (192.150, 3),
+    "USD-CAD": (1.36300, 5),
+}
+
+class Market:
+    """Synthetic spot prices and strike listings, shared by all connections."""
+
+    def __init__(self, strikes, lead):
+        self.strikes = strikes
+        self.lead = lead
+        self.spot = {pair: start for pair, (start, _) in PAIRS.items()}
+        self.levels = {}  # epic -> strike level
+        self.lock = threading.Lock()
+
+    def step(self, pair):
+        """Move a pair's spot by a small random amount and return it."""
+        self.spot[pair] *= 1 + random.gauss(0, 0.00002)
+        return self.spot[pair]
+
+    def fmt(self, pair, value):
+        return f"{value:.{PAIRS[pair][1]}f}"
+
+    def cycle_epics(self, pair, expiry):
+        """Strike epics of one 5-minute cycle, with levels centred on the spot."""
+        tag = expiry.strftime("%H%M")
+        day = expiry.strftime("%d%b%y")
+        epics = [f"NB.I.{pair}.OPT-{tag}-{i}-{day}.IP" for i in range(1, self.strikes + 1)]
+        with self.lock:
+            if epics[0] not in self.levels:
+                spot = self.spot[pair]
+                step = spot * 0.0002
+                for i, epic in enumerate(epics):
+                    self.levels[epic] = spot + (i - self.strikes // 2) * step
+        return epics
+
+    def listings(self, pair):
+        """Epics listed now: the current cycle, plus the next within LEAD seconds of it."""
+        now = datetime.datetime.now()
+        expiry = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=5 - now.minute % 5)
+        epics = self.cycle_epics(pair, expiry)
+        if (expiry - now).total_seconds() <= self.lead:
+            epics += self.cycle_epics(pair, expiry + datetime.timedelta(minutes=5))
+        return epics
+
+    def level(self, epic, pair):
+        level = self.levels.get(epic)
+        return self.spot[pair] if level is None else level
+
+    def binary_price(self, pair, level):
+        """Mid price (0-100) of "pair above level" for the current spot."""
+        spot = self.spot[pair]
+        return 100 / (1 + math.exp(-(spot - level) / (spot * 0.0002)))
+
+def _pair_of(text):
+    """The PAIRS key mentioned in an LS_id, e.g. CH.U.X:SEURUSD:... or NB.I.EUR-USD..."""
+    flat = text.upper().replace("-", "")
+    for pair in PAIRS:
+        if pair.replace("-", "") in flat:
+            return pair
+    return None
+
+class Table:
+    """One subscribed table on a fake Lightstreamer connection."""
+
+    def __init__(self, table_id, mode, ls_id, fields):
+        self.id = table_id
+        self.mode = mode
+        self.fields = fields
+        self.pair = _pair_of(ls_id)
+        self.epic = ls_id.split("|")[-1]
+        if fields and fields[0] == FOREX_SCHEMA[0]:
+            self.kind = "FOREX"
+        elif fields and fields[0] == "displayOffer":
+            self.kind = "BOOK"
+        elif table_id == 3:
+            self.kind = "BALANCE"
+        else:
+            self.kind = "RAW"
+
+    def values(self, market, full):
+        """Field values for a snapshot (full) or an update; None = unchanged."""
+        now = time.strftime("%H:%M:%S")
+        if self.kind == "FOREX" and self.pair:
+            return [market.fmt(self.pair, market.step(self.pair)), now]
+        if self.kind == "BALANCE":
+            return ["10000.00", "0.00"] if full else None
+        if self.kind != "BOOK" or not self.pair:
+            return None
+        mid = market.binary_price(self.pair, market.level(self.epic, self.pair))
+        values = [None] * len(self.fields)
+        for level in range(len(self.fields) // 4 if len(self.fields) == 20 else 1):
+            spread = 1 + level * 0.5
+            base = level * 4
+            # LS_id order: BDn, AKn, BSn, ASn
+            values[base] = f"{max(0.0, mid - spread):.2f}"
+            values[base + 1] = f"{min(100.0, mid + spread):.2f}"
+            values[base + 2] = str(random.randint(1, 250))
+            values[base + 3] = str(random.randint(1, 250))
+        if len(self.fields) == 9:
+            values[4] = now
+            if full:
+                values[5:] = ["0", "TRADEABLE", "", ""]
+        return values
+
+    def call(self, kind, values):
+        fields = ",".join("#" if v is None else ("$" if v == "" else f"'{v}'") for v in values)
+        return f"{kind}({self.id},1,{fields})"
+
+class Connection:
+    """Serves one Lightstreamer WebSocket."""
+
+    def __init__(self, ws, market, rate, interval):
+        self.ws = ws
+        self.market = market
+        self.rate = rate
+        self.interval = interval
+        self.tables = {}
+        self.live = []  # tables that get updates
+
+    async def serve(self):
+        ticker = asyncio.create_task(self.tick())
+        try:
+            async for message in self.ws:
+                await self.handle(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            ticker.cancel()
+
+    async def handle(self, message):
+        lines = message.split("\r\n")
+        if lines[0] == "bind_session":
+            await self.ws.send(f"setPhase({random.randint(1000, 9000)});start();")
+        calls = []
+        for line in lines[1:]:
+            request = {k: v[0] for k, v in parse_qs(line).items()}
+            op = request.get("LS_op")
+            if op == "add":
+                table = Table(int(request["LS_table"]), request.get("LS_mode", "MERGE"),
+                              request.get("LS_id", ""), request.get("LS_schema", "").split())
+                self.tables[table.id] = table
+                self.live = [t for t in self.tables.values() if t.kind in ("FOREX", "BOOK")]
+                if request.get("LS_snapshot") == "true":
+                    values = table.values(self.market, full=True)
+                    if values:
+                        calls.append(table.call("z", values))
+            elif op == "delete":
+                self.tables.pop(int(request["LS_table"]), None)
+                self.live = [t for t in self.tables.values() if t.kind in ("FOREX", "BOOK")]
+            elif op == "constrain":
+                await self.ws.send("PONG")
+        if calls:
+            await self.ws.send(";".join(calls) + ";")
+
+    async def tick(self):
+        """Send rate updates per second, batched per interval, plus a heartbeat."""
+        budget = 0.0
+        last_beat = 0.0
+        while True:
+            await asyncio.sleep(self.interval)
+            calls = []
+            now = time.monotonic()
+            if 1 in self.tables and now - last_beat >= 1:
+                calls.append(f"d(1,1,'{time.strftime('%H:%M:%S')}')")
+                last_beat = now
+            budget += self.rate * self.interval
+            live = self.live
+            while budget >= 1 and live:
+                table = random.choice(live)
+                values = table.values(self.market, full=False)
+                if values:
+                    calls.append(table.call("d", values))
+                budget -= 1
+            if not live:
+                budget = 0.0
+            if calls:
+                await self.ws.send(";".join(calls) + ";")
+
+def _etag(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+def make_http_handler(market, ws_host):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="application/json", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, data):
+            body = json.dumps(data).encode("utf-8")
+            etag = _etag(body)
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+            else:
+                self._send(200, body, headers={"ETag": etag})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path.endswith("/security/authenticate"):
+                self._send(200, b"{}", headers={"x-security-token": uuid.uuid4().hex * 2})
+            elif self.path.endswith("/create_session.js"):
+                sid = "S" + uuid.uuid4().hex[:16]
+                body = f"setPhase({random.randint(1000, 9000)});start('{sid}', '{ws_host}', 0, 50000);"
+                self._send(200, body.encode("utf-8"), "text/javascript")
+            else:
+                self._send(404)
+
+        def do_GET(self):
+            if self.path.endswith("/hierarchy/tree/full"):
+                self._json({"topLevelNodes": [{
+                    "name": "5 Minute Binaries",
+                    "children": [{"name": "Forex", "children": [{"id": f"fx-{pair}", "name": pair} for pair in PAIRS]}],
+                }]})
+            elif "/navigation/fx-" in self.path:
+                pair = self.path.rsplit("/fx-", 1)[1]
+                if pair not in PAIRS:
+                    self._send(404)
+                    return
+                underlying = f"CS.D.{pair.replace('-', '')}.OPT.IP"
+                name = pair.replace("-", "/")
+                self._json({"markets": [
+                    {"epic": epic, "underlyingEpic": underlying,
+                     "instrumentName": f"{name} >{market.fmt(pair, market.level(epic, pair))}"}
+                    for epic in market.listings(pair)
+                ]})
+            else:
+                self._send(404)
+
+    return Handler
+
+async def serve(host, http_port, ws_port, rate, interval, strikes, lead):
+    market = Market(strikes, lead)
+    httpd = ThreadingHTTPServer((host, http_port), make_http_handler(market, f"{host}:{ws_port}"))
+    threading.Thread(target=httpd.serve_forever, name="fake-nadex-http", daemon=True).start()
+
+    async def handler(ws):
+        await Connection(ws, market, rate, interval).serve()
+
+    async with websockets.serve(handler, host, ws_port, subprotocols=["js.lightstreamer.com"]):
+        base = f"http://{host}:{http_port}"
+        print(f"[+] Fake Nadex on {base} (Lightstreamer ws://{host}:{ws_port}), {rate:g} updates/s per connection")
+        print("[+] Point the dashboard at it with:")
+        print(f"    NADEX_AUTH_URL={base}/iDeal/v2/security/authenticate")
+        print(f"    NADEX_SESSION_URL={base}/lightstreamer/create_session.js")
+        print(f"    NADEX_MARKET_TREE_URL={base}/iDeal/markets/hierarchy/tree/full")
+        print(f"    NADEX_NAVIGATION_URL={base}/iDeal/markets/navigation")
+        print("    NADEX_WS_SCHEME=ws CACHE_DIR=")
+        try:
+            await asyncio.Future()
+        finally:
+            httpd.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in Nadex server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800, help="HTTP port (default 8800)")
+    parser.add_argument("--ws-port", type=int, default=8801, help="Lightstreamer WebSocket port (default 8801)")
+    parser.add_argument("--rate", type=float, default=100, help="updates/sec per connection (default 100)")
+    parser.add_argument("--interval", type=float, default=10, help="ms between frames (default 10)")
+    parser.add_argument("--strikes", type=int, default=12, help="strikes per pair and cycle (default 12)")
+    parser.add_argument("--lead", type=float, default=60, help="seconds before a rollover the next cycle is listed")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.ws_port, args.rate, args.interval / 1000,
+                          args.strikes, args.lead))
+    except KeyboardInterrupt:
+        print("\n[!] Fake Nadex stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# ---------------------------------------------------------------
+# File        : fanout.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+
+from websockets.exceptions import ConnectionClosed
+
+from .decoder import Update
+from .metrics import send_latency
+from .wire import encode_delta, MAX_RECORDS
+
+# Slow-consumer policies, applied when a client's outbound queue is full
+DROP_OLDEST = "drop_oldest"   # evict the oldest queued message
+CONFLATE = "conflate"         # merge updates per table (latest per epic), then drop oldest
+DISCONNECT = "disconnect"     # close the client
+POLICIES = (DROP_OLDEST, CONFLATE, DISCONNECT)
+
+# Close code sent to clients disconnected as slow consumers (Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Wire formats a client can ask for
+RAW = "raw"     # Lightstreamer-style z()/d() calls, as relayed from Nadex
+JSON = "json"   # {"type": "snapshot"|"delta", ...} with per-update sequence numbers
+BINARY = "binary"  # JSON snapshots with schemas, binary deltas (see wire.py)
+FORMATS = (RAW, JSON, BINARY)
+
+class Snapshot:
+    """Merged state of a set of tables, sent as one message."""
+
+    __slots__ = ("updates",)
+
+    def __init__(self, updates):
+        self.updates = updates
+
+    def to_raw(self):
+        return ";".join(u.to_raw() for u in self.updates) + ";"
+
+    def to_json(self, seq, schemas=False):
+        """JSON snapshot; with schemas, also the field list per table kind."""
+        tables = ",".join("{" + u.to_json() + "}" for u in self.updates)
+        if not schemas:
+            return f'{{"type":"snapshot","seq":{seq},"tables":[{tables}]}}'
+        kinds = json.dumps({u.schema.kind: u.schema.fields for u in self.updates}, separators=(",", ":"))
+        return f'{{"type":"snapshot","seq":{seq},"schemas":{kinds},"tables":[{tables}]}}'
+
+def _schema_message(schemas):
+    """Tell a binary client the kind and field names of tables it has not seen."""
+    return json.dumps({
+        "type": "schema",
+        "schemas": {s.kind: s.fields for s in schemas},
+        "tables": {str(s.table_id): s.kind for s in schemas},
+    }, separators=(",", ":"))
+
+class ClientSession:
+    """
+    A connected frontend client with a bounded outbound queue and its own
+    writer task. Enqueueing never awaits, so a slow client cannot stall ingest.
+
+    Every queued Update or Snapshot takes the next sequence number. Conflating
+    into a queued update reuses its number, so only dropped messages leave
+    gaps; a client that sees one can ask for a fresh snapshot.
+
+    With max_rate set, updates are always conflated per table and the writer
+    flushes at most max_rate times per second.
+    """
+
+    def __init__(self, websocket, max_queue, policy=DROP_OLDEST, format=RAW, max_rate=0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        if format not in FORMATS:
+            raise ValueError(f"Unknown wire format: {format}")
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.format = format
+        self.max_rate = max_rate
+        self.queue = OrderedDict()  # key -> (seq, str | Update | Snapshot)
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self.topics = None  # topics.Topics, None = receive everything
+        self._keys = itertools.count()
+        self._barrier = 0  # bumped by every queued Snapshot or message
+        self._wakeup = asyncio.Event()
+        self._next_flush = 0.0
+        self._announced = {}  # table_id -> TableSchema whose fields a binary client knows
+        self._oldest = None  # earliest receive time among the updates being sent
+        self._task = None
+
+    @property
+    def remote_address(self):
+        return getattr(self.websocket, "remote_address", None)
+
+    @property
+    def verbatim(self):
+        """Raw client taking every table unconflated: it gets Nadex frames as received."""
+        return self.format == RAW and self.topics is None and not self.max_rate and self.policy != CONFLATE
+
+    def start(self):
+        """Start the writer task."""
+        self._task = asyncio.create_task(self._writer())
+
+    def enqueue(self, payload, key=None):
+        """
+        Queue a message (str), Update or Snapshot for this client. key
+        identifies a conflatable stream (table id); None queues the payload
+        unconditionally. Returns False if the client is closed or was disconnected.
+        """
+        if not self._put(payload, key):
+            return False
+        self._wakeup.set()
+        return True
+
+    def enqueue_many(self, items):
+        """Queue (payload, key) pairs; see enqueue. Returns False if the client closed."""
+        for payload, key in items:
+            if not self._put(payload, key):
+                return False
+        self._wakeup.set()
+        return True
+
+    def _put(self, payload, key):
+        """Apply the queue bound and slow-consumer policy for one payload."""
+        if self.closed:
+            return False
+        queue = self.queue
+        conflate = key is not None and (self.max_rate or self.policy == CONFLATE)
+        if conflate:
+            # Only merge into an update queued after the last snapshot or
+            # message, so a newer value is never sent ahead of an older one
+            key = (self._barrier, key)
+            if key in queue:
+                seq, queued = queue[key]
+                queue[key] = (seq, queued.merge(payload))
+                return True
+        if len(queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                self._disconnect()
+                return False
+            queue.popitem(last=False)
+            self.dropped += 1
+        if not conflate:
+            key = ("seq", next(self._keys))
+        if isinstance(payload, str):
+            queue[key] = (None, payload)
+        else:
+            self.seq += 1
+            queue[key] = (self.seq, payload)
+        if not isinstance(payload, Update):
+            self._barrier += 1
+        return True
+
+    def _drain(self):
+        """Take everything queued, packing consecutive updates into one frame."""
+        entries = list(self.queue.values())
+        self.queue.clear()
+        fmt = self.format
+        announced = self._announced
+        frames, calls = [], []
+        oldest = None
+        for seq, payload in entries:
+            if isinstance(payload, Update):
+                if payload.received is not None and (oldest is None or payload.received < oldest):
+                    oldest = payload.received
+                if fmt == BINARY:
+                    if announced.get(payload.table) is not payload.schema:
+                        # Field names for a table's records come once, as text
+                        if calls:
+                            frames.extend(self._pack(calls))
+                            calls = []
+                        announced[payload.table] = payload.schema
+                        frames.append(_schema_message([payload.schema]))
+                    calls.append((seq, payload.to_binary()))
+                elif fmt == JSON:
+                    calls.append(f'{{"seq":{seq},{payload.to_json()}}}')
+                else:
+                    calls.append(payload.to_raw())
+                continue
+            if calls:
+                frames.extend(self._pack(calls))
+                calls = []
+            if isinstance(payload, Snapshot):
+                if fmt == RAW:
+                    frames.append(payload.to_raw())
+                elif fmt == JSON:
+                    frames.append(payload.to_json(seq))
+                else:
+                    for u in payload.updates:
+                        announced[u.table] = u.schema
+                    frames.append(payload.to_json(seq, schemas=True))
+            else:
+                frames.append(payload)
+        if calls:
+            frames.extend(self._pack(calls))
+        self._oldest = oldest
+        return frames
+
+    def _pack(self, calls):
+        """Join encoded updates into frames: one, or as many as the binary record count needs."""
+        if self.format == BINARY:
+            return [encode_delta(calls[i:i + MAX_RECORDS]) for i in range(0, len(calls), MAX_RECORDS)]
+        if self.format == JSON:
+            return ['{"type":"delta","updates":[' + ",".join(calls) + "]}"]
+        return [";".join(calls) + ";"]
+
+    async def _writer(self):
+        """Send queued messages to the client until it closes."""
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                if self.max_rate:
+                    # Let updates conflate until the next flush slot
+                    delay = self._next_flush - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    self._next_flush = loop.time() + 1.0 / self.max_rate
+                self._wakeup.clear()
+                for frame in self._drain():
+                    await self.websocket.send(frame)
+                    self.sent += 1
+                if self._oldest is not None:
+                    send_latency.observe(time.perf_counter() - self._oldest)
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Failed to send to frontend client: {e}")
+        finally:
+            self.closed = True
+            self.queue.clear()
+
+    def _disconnect(self):
+        """Drop a slow consumer."""
+        print(f"[-] Disconnecting slow frontend client: {self.remote_address}")
+        self.closed = True
+        self.queue.clear()
+        self._wakeup.set()
+        asyncio.ensure_future(self.websocket.close(SLOW_CONSUMER_CLOSE_CODE, "slow consumer"))
+
+    async def close(self):
+        """Stop the writer task and close the connection."""
+        self.closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.websocket.close()
@@ -9,54 +9,220 @@
 import asyncio
 import websockets
 import json
-from typing import Set
+from typing import Dict
+from urllib.parse import urlparse, parse_qs
 
-# Store connected frontend clients
-frontend_clients: Set[websockets.WebSocketServerProtocol] = set()
+from . import parsing
+from .config import Config
+from .log import frontend_log
+from .fanout import ClientSession, Snapshot, FORMATS, RAW
+from .topics import Topics, TopicRouter
 
-async def frontend_handler(websocket, path):
+# Store connected frontend clients (websocket -> ClientSession)
+frontend_clients: Dict[object, ClientSession] = {}
+
+# Routes table updates to subscribed clients
+router = TopicRouter()
+
+def send_snapshot(session):
+    """Queue the merged state of every table the session is subscribed to."""
+    topics = session.topics
+    if topics is None:
+        updates = parsing.table_state.snapshot()
+    else:
+        underlying = parsing.table_underlying
+        updates = parsing.table_state.snapshot(
+            lambda schema: topics.matches(schema, underlying.get(schema.table_id))
+        )
+    if updates or session.format != RAW:
+        session.enqueue(Snapshot(updates))
+
+def handle_client_request(session, message):
+    """
+    Handle a JSON control request from a frontend client:
+        {"op": "subscribe", "underlyings": ["EUR/USD"], "epics": [...], "forex": true}
+        {"op": "unsubscribe", ...same keys...}
+        {"op": "snapshot"}  (resync, e.g. after a sequence gap)
+        {"op": "options", "max_rate": 2}  (flushes/sec, 0 = unlimited)
+        {"op": "options", "format": ["binary", "json"]}  (first supported wins)
+    Returns False if the message is not a control request.
+    """
+    try:
+        request = json.loads(message)
+    except ValueError:
+        return False
+    if not isinstance(request, dict) or "op" not in request:
+        return False
+
+    op = request["op"]
+    if op in ("subscribe", "unsubscribe"):
+        if session.topics is None:
+            session.topics = Topics()
+        session.topics.update(request, subscribe=(op == "subscribe"))
+        router.invalidate()
+        session.enqueue(json.dumps({"type": op + "d", "topics": session.topics.to_dict()}))
+        if op == "subscribe":
+            send_snapshot(session)
+    elif op == "snapshot":
+        send_snapshot(session)
+    elif op == "options":
+        if "max_rate" in request:
+            rate = _parse_rate(request["max_rate"])
+            if rate is None:
+                session.enqueue(json.dumps({"type": "error", "error": "max_rate must be a number >= 0"}))
+                return True
+            session.max_rate = rate
+            router.invalidate()
+        resync = False
+        if "format" in request:
+            fmt = _negotiate_format(request["format"])
+            if fmt is None:
+                session.enqueue(json.dumps({"type": "error", "error": f"format must be one of {list(FORMATS)}"}))
+                return True
+            resync = fmt != session.format
+            session.format = fmt
+            router.invalidate()
+        session.enqueue(json.dumps({"type": "options", "format": session.format, "max_rate": session.max_rate}))
+        if resync:
+            # Field schemas and sequence state come with the snapshot
+            send_snapshot(session)
+    else:
+        session.enqueue(json.dumps({"type": "error", "error": f"unknown op: {op}"}))
+    return True
+
+def _parse_rate(value):
+    """Validate a client max_rate (flushes/sec); None if invalid."""
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rate if rate >= 0 else None
+
+def _negotiate_format(value):
+    """Pick the first supported format from a name or a list of names; None if none."""
+    offered = [value] if isinstance(value, str) else value
+    if not isinstance(offered, list):
+        return None
+    for fmt in offered:
+        if fmt in FORMATS:
+            return fmt
+    return None
+
+def _connection_options(websocket, path):
+    """
+    Options requested in the connection URL, e.g.
+    ws://host:8765/?format=binary,json&max_rate=2. Returns (format, max_rate).
+    """
+    if path is None:
+        request = getattr(websocket, "request", None)
+        path = getattr(request, "path", "") if request is not None else ""
+    query = parse_qs(urlparse(path).query)
+    fmt = _negotiate_format(query.get("format", [RAW])[0].split(","))
+    rate = _parse_rate(query.get("max_rate", [Config.FRONTEND_MAX_RATE])[0])
+    return (fmt or RAW), (Config.FRONTEND_MAX_RATE if rate is None else rate)
+
+async def frontend_handler(websocket, path=None):
     """Handle frontend WebSocket connections."""
-    frontend_clients.add(websocket)
+    fmt, max_rate = _connection_options(websocket, path)
+    session = ClientSession(
+        websocket, Config.FRONTEND_QUEUE_SIZE, Config.SLOW_CONSUMER_POLICY, fmt, max_rate
+    )
+    frontend_clients[websocket] = session
+    router.invalidate()
+    session.start()
     print(f"[+] Frontend client connected: {websocket.remote_address}")
-    
+
+    # Bring the new client up to date before it starts receiving deltas
+    send_snapshot(session)
+
     try:
         async for message in websocket:
             # Handle messages from frontend clients if needed
-            print(f"[FRONTEND] Received: {message}")
-            # Echo back or process as needed
-            await websocket.send(f"Echo: {message}")
+            if frontend_log.sample():
+                frontend_log.info(f"[FRONTEND] Received: {message}")
+            if handle_client_request(session, message):
+                continue
+            # Echo back anything else
+            session.enqueue(f"Echo: {message}")
     except websockets.exceptions.ConnectionClosed:
         print(f"[-] Frontend client disconnected: {websocket.remote_address}")
     finally:
-        frontend_clients.discard(websocket)
+        frontend_clients.pop(websocket, None)
+        router.invalidate()
+        await session.close()
+
+def _prune_closed():
+    """Remove sessions whose writer has stopped."""
+    for websocket in [ws for ws, session in frontend_clients.items() if session.closed]:
+        frontend_clients.pop(websocket, None)
+    router.invalidate()
+
+def _enqueue_all(message, wanted=None):
+    """Queue a text message for every client, or those for which wanted(session) is true."""
+    closed = False
+    for session in frontend_clients.values():
+        if wanted is not None and not wanted(session):
+            continue
+        if not session.enqueue(message):
+            closed = True
+    if closed:
+        _prune_closed()
 
-async def relay_to_frontend(message: str):
-    """Relay message to all connected frontend clients."""
+def _takes_frame(session):
+    return session.format == RAW
+
+def _takes_decoded_frame(session):
+    return session.verbatim
+
+async def relay_to_frontend(message: str, decoded=False):
+    """
+    Relay a Nadex frame as received. Verbatim raw clients (every table,
+    no conflation) get every frame, so nothing the decoder skips is lost:
+    loop(), setPhase(...), unregistered tables. Other raw clients only get
+    frames without table updates (decoded=False); their updates come
+    re-encoded through relay_updates. JSON and binary clients get neither.
+    Only queues the message; each client's writer task does the send.
+    """
     if not frontend_clients:
         return
-    
-    # Create a copy of the set to avoid modification during iteration
-    clients_copy = frontend_clients.copy()
-    
-    # Send to all connected clients
-    disconnected_clients = []
-    for client in clients_copy:
-        try:
-            await client.send(message)
-        except websockets.exceptions.ConnectionClosed:
-            disconnected_clients.append(client)
-        except Exception as e:
-            print(f"[ERROR] Failed to send to frontend client: {e}")
-            disconnected_clients.append(client)
-    
-    # Remove disconnected clients
-    for client in disconnected_clients:
-        frontend_clients.discard(client)
+    _enqueue_all(message, _takes_decoded_frame if decoded else _takes_frame)
+
+def relay_updates(updates):
+    """
+    Queue decoded Nadex updates for the frontend clients subscribed to them.
+    MERGE-mode tables are keyed by table id so slow clients can conflate them.
+    """
+    if not frontend_clients or not updates:
+        return
+
+    # Group updates by audience; with few distinct audiences (e.g. every
+    # client unfiltered) each client gets a single enqueue_many call
+    sessions = frontend_clients.values()
+    groups = {}  # id(audience) -> (audience, items)
+    for update in updates:
+        audience = router.audience(update.schema, sessions)
+        if not audience:
+            continue
+        item = (update, update.table if update.schema.mode == "MERGE" else None)
+        group = groups.get(id(audience))
+        if group is None:
+            groups[id(audience)] = (audience, [item])
+        else:
+            group[1].append(item)
+
+    closed = False
+    for audience, items in groups.values():
+        for session in audience:
+            if not session.enqueue_many(items):
+                closed = True
+    if closed:
+        _prune_closed()
 
 async def broadcast_to_frontend(data: dict):
-    """Broadcast structured data to frontend clients."""
-    message = json.dumps(data)
-    await relay_to_frontend(message)
+    """Broadcast structured data to all frontend clients, whatever their format."""
+    if not frontend_clients:
+        return
+    _enqueue_all(json.dumps(data))
 
 def get_frontend_client_count() -> int:
     """Get the number of connected frontend clients."""
@@ -66,19 +232,19 @@ async def close_all_frontend_connections():
     """Close all frontend connections gracefully."""
     if not frontend_clients:
         return
-    
+
     print(f"[+] Closing {len(frontend_clients)} frontend connections...")
-    
+
     # Create a copy to avoid modification during iteration
-    clients_copy = frontend_clients.copy()
-    
+    sessions = list(frontend_clients.values())
+
     # Close all connections
-    for client in clients_copy:
+    for session in sessions:
         try:
-            await client.close()
+            await session.close()
         except Exception as e:
             print(f"[ERROR] Failed to close frontend client: {e}")
-    
-    # Clear the set
+
+    # Clear the registry
     frontend_clients.clear()
     print("[+] All frontend connections closed.")
\ No newline at end of file
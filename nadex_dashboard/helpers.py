@@ -6,10 +6,16 @@
 # Copyright (c) Shivam Garg. All rights reserved.
 # ---------------------------------------------------------------
 
+import asyncio
 import requests
 import re
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
+from . import cache
+from .analytics import parse_level
 from .config import (
     Config,
     AUTH_HEADERS,
@@ -23,11 +29,22 @@ from .config import (
 # Global XST token
 xst_token = None
 
+# Shared keep-alive HTTP client for auth, session and discovery requests.
+# Headers are passed per request; the pool holds one connection per
+# concurrent navigation fetch.
+http = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=max(1, Config.DISCOVERY_CONCURRENCY),
+)
+http.mount("https://", _adapter)
+http.mount("http://", _adapter)
+
 def get_xst_token():
     """Authenticate with Nadex and get XST token."""
     global xst_token
     print("[+] Authenticating with Nadex...")
-    resp = requests.post(
+    resp = http.post(
         Config.NADEX_AUTH_URL,
         json=get_auth_payload(),
         headers=AUTH_HEADERS
@@ -37,24 +54,48 @@ def get_xst_token():
     if not token:
         raise RuntimeError("Missing x-security-token")
     xst_token = token
+    cache.save(_token_key(), token, private=True)
     print(f"[+] Obtained XST token: {token[:20]}…")
     return token
 
+def _token_key():
+    return f"token-{Config.NADEX_USERNAME}"
+
 def get_session_info():
-    """Create Lightstreamer session and return session info."""
+    """
+    Create Lightstreamer session and return session info. A cached XST token
+    younger than TOKEN_CACHE_TTL (or the one already in memory) is tried
+    first; if the session is refused with it, authenticate again.
+    """
+    global xst_token
+    cached = cache.load(_token_key(), Config.TOKEN_CACHE_TTL) or xst_token
+    if cached:
+        xst_token = cached
+        print("[+] Reusing XST token…")
+        try:
+            return _create_session()
+        except (requests.HTTPError, RuntimeError) as e:
+            print(f"[-] Cached token rejected ({e}), re-authenticating")
+            cache.invalidate(_token_key())
     get_xst_token()
+    return _create_session()
+
+def _create_session():
+    """Create the Lightstreamer session with the current XST token."""
     print("[+] Creating Lightstreamer session…")
-    resp = requests.post(
+    resp = http.post(
         Config.NADEX_SESSION_URL,
         data=get_session_payload(xst_token),
         headers=SESSION_HEADERS
     )
     resp.raise_for_status()
     body = resp.text
-    sid = re.search(r"start\('([^']+)'", body).group(1)
-    host = re.search(r"start\('[^']+',\s*'([^']+)'", body).group(1)
-    phase = re.search(r"setPhase\((\d+)\);", body).group(1)
-    return sid, host, int(phase)
+    sid = re.search(r"start\('([^']+)'", body)
+    host = re.search(r"start\('[^']+',\s*'([^']+)'", body)
+    phase = re.search(r"setPhase\((\d+)\);", body)
+    if not (sid and host and phase):
+        raise RuntimeError("Unexpected Lightstreamer session response")
+    return sid.group(1), host.group(1), int(phase.group(1))
 
 def fetch_market_tree():
     """Fetch market tree from Nadex API."""
@@ -63,10 +104,10 @@ def fetch_market_tree():
     print("[+] Fetching market tree…")
     hdrs = {k: v for k, v in MARKET_HEADERS.items() if not k.startswith(":")}
     hdrs["x-security-token"] = xst_token
-    resp = requests.get(Config.NADEX_MARKET_TREE_URL, headers=hdrs)
-    resp.raise_for_status()
-    print(f"[+] Market Tree status: {resp.status_code}")
-    return resp.json()
+    # Served from cache within TREE_CACHE_TTL, then revalidated with its ETag
+    tree = cache.conditional_get(http, "tree", Config.NADEX_MARKET_TREE_URL, hdrs, Config.TREE_CACHE_TTL)
+    print("[+] Market Tree fetched")
+    return tree
 
 def extract_forex_ids(tree):
     """Extract forex market IDs from market tree."""
@@ -82,23 +123,54 @@ def fetch_navigation_by_id(mid):
     url = f"{Config.NADEX_NAVIGATION_URL}/{mid}"
     hdrs = NAVIGATION_HEADERS.copy()
     hdrs["x-security-token"] = xst_token
-    resp = requests.get(url, headers=hdrs)
-    resp.raise_for_status()
-    return resp.json()
+    # Always revalidated: strikes change every cycle, but an unchanged node costs a 304
+    return cache.conditional_get(http, f"nav-{mid}", url, hdrs)
 
 def map_market_data(fx_ids):
-    """Map market data from forex IDs to underlying epics."""
+    """
+    Map market data from forex IDs to underlying epics. Navigation nodes are
+    fetched concurrently, at most Config.DISCOVERY_CONCURRENCY at a time,
+    over the shared keep-alive session. Returns (mapping, {epic: strike level}).
+    """
     mapping = defaultdict(lambda: defaultdict(list))
-    for mid in fx_ids:
-        print(f"⟳ Processing market ID {mid}")
-        nav = fetch_navigation_by_id(mid)
-        for m in nav.get("markets", []):
-            ue = m.get("underlyingEpic", "")
-            ep = m.get("epic", "")
-            if ue and ep:
-                mapping[mid][ue].append(ep)
-        print(f"  → Found {len(nav.get('markets', []))} epics")
-    return mapping
+    levels = {}
+    if not fx_ids:
+        return mapping, levels
+    start = time.perf_counter()
+    workers = max(1, min(Config.DISCOVERY_CONCURRENCY, len(fx_ids)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nadex-nav") as pool:
+        # map() yields in fx_ids order, so the mapping keeps the serial order
+        for mid, nav in zip(fx_ids, pool.map(fetch_navigation_by_id, fx_ids)):
+            print(f"⟳ Processing market ID {mid}")
+            for m in nav.get("markets", []):
+                ue = m.get("underlyingEpic", "")
+                ep = m.get("epic", "")
+                if ue and ep:
+                    mapping[mid][ue].append(ep)
+                    level = parse_level(m.get("instrumentName"))
+                    if level is not None:
+                        levels[ep] = level
+            print(f"  → Found {len(nav.get('markets', []))} epics")
+    print(f"[+] Fetched {len(fx_ids)} navigation nodes in {time.perf_counter() - start:.2f}s ({workers} concurrent)")
+    return mapping, levels
+
+def discover_markets():
+    """
+    Fetch the market tree and map its forex markets. Returns (fx_ids, mapping,
+    levels); levels go to the ingest on the event loop (LocalIngest.set_levels).
+    """
+    tree = fetch_market_tree()
+    fx_ids = extract_forex_ids(tree)
+    if not fx_ids:
+        return fx_ids, None, {}
+    mapping, levels = map_market_data(fx_ids)
+    cache.save_mapping(fx_ids, mapping, levels)
+    return fx_ids, mapping, levels
+
+async def discover_markets_async():
+    """Run discover_markets on a worker thread so the event loop keeps running."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, discover_markets)
 
 def print_market_mapping(mapping):
     """Print a summary of the market mapping."""
@@ -0,0 +1,214 @@
+# ---------------------------------------------------------------
+# File        : history.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+In-memory tick history. Every forex underlying and strike epic gets a Series:
+a fixed-capacity ring of (time, bid, ask) ticks in NumPy columns, plus 1s, 5s
+and 1m OHLC bars of the mid price in rings of their own. Memory per series is
+fixed by HISTORY_TICKS and HISTORY_BARS, and epic series are dropped when
+their tables are unsubscribed.
+
+Appending a tick is three array stores; a quote equal to the previous one is
+skipped. Bars are brought up to date in one vectorized pass over the ticks
+since the last pass (np.maximum.reduceat and friends), when they are read or
+before unrolled ticks would be overwritten.
+Rolling statistics are computed over a time window on demand.
+
+    history = parsing.tick_history
+    history.bars("EURUSD", 5)          # {"start", "open", "high", "low", "close", "ticks"}
+    history.stats("NB.I.EUR-USD...", window=60)
+"""
+
+import time
+
+import numpy as np
+
+from .config import Config
+
+# Bar lengths in seconds
+BAR_INTERVALS = (1, 5, 60)
+
+BAR_FIELDS = ("start", "open", "high", "low", "close", "ticks")
+
+def _ring_order(count, capacity, n):
+    """Ring positions of the last n of count items, oldest first."""
+    return (np.arange(count - n, count) % capacity) if count > capacity or n < count else slice(0, count)
+
+class Bars:
+    """Fixed-capacity ring of OHLC bars of one interval."""
+
+    __slots__ = ("interval", "capacity", "columns", "count", "last_bucket")
+
+    def __init__(self, interval, capacity):
+        self.interval = interval
+        self.capacity = capacity
+        self.columns = {field: np.zeros(capacity) for field in BAR_FIELDS}
+        self.count = 0
+        self.last_bucket = None
+
+    def add(self, ts, price):
+        """Fold time-ordered ticks into the bars."""
+        if not len(ts):
+            return
+        buckets = np.floor_divide(ts, self.interval).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)]
+        opens = price[starts]
+        highs = np.maximum.reduceat(price, starts)
+        lows = np.minimum.reduceat(price, starts)
+        closes = price[ends - 1]
+        ticks = ends - starts
+        columns = self.columns
+
+        # The first group may continue the open bar
+        if self.count and buckets[0] == self.last_bucket:
+            last = (self.count - 1) % self.capacity
+            columns["high"][last] = max(columns["high"][last], highs[0])
+            columns["low"][last] = min(columns["low"][last], lows[0])
+            columns["close"][last] = closes[0]
+            columns["ticks"][last] += ticks[0]
+            starts, opens, highs, lows, closes, ticks = starts[1:], opens[1:], highs[1:], lows[1:], closes[1:], ticks[1:]
+        self.last_bucket = buckets[-1]
+
+        new = len(starts)
+        if not new:
+            return
+        keep = min(new, self.capacity)
+        slots = np.arange(self.count + new - keep, self.count + new) % self.capacity
+        values = {
+            "start": buckets[starts] * float(self.interval), "open": opens, "high": highs,
+            "low": lows, "close": closes, "ticks": ticks,
+        }
+        for field, column in values.items():
+            columns[field][slots] = column[-keep:]
+        self.count += new
+
+    def arrays(self, n=None):
+        """The last n bars (all kept by default) as {field: array}, oldest first."""
+        held = min(self.count, self.capacity)
+        n = held if n is None else min(n, held)
+        order = _ring_order(self.count, self.capacity, n)
+        return {field: column[order].copy() for field, column in self.columns.items()}
+
+class Series:
+    """Tick ring of one epic or underlying, with its bars."""
+
+    __slots__ = ("name", "capacity", "ts", "bid", "ask", "count", "rolled", "bars", "last")
+
+    def __init__(self, name, capacity, bar_capacity, intervals=BAR_INTERVALS):
+        self.name = name
+        self.capacity = capacity
+        self.ts = np.zeros(capacity)
+        self.bid = np.zeros(capacity)
+        self.ask = np.zeros(capacity)
+        self.count = 0
+        self.rolled = 0  # ticks already folded into the bars
+        self.bars = {interval: Bars(interval, bar_capacity) for interval in intervals}
+        self.last = None
+
+    def append(self, ts, bid, ask):
+        if (bid, ask) == self.last:
+            return
+        self.last = (bid, ask)
+        i = self.count % self.capacity
+        self.ts[i] = ts
+        self.bid[i] = bid
+        self.ask[i] = ask
+        self.count += 1
+        if self.count - self.rolled >= self.capacity:
+            self.roll()
+
+    def roll(self):
+        """Fold the ticks since the last roll into every bar interval."""
+        new = self.count - self.rolled
+        if not new:
+            return
+        order = _ring_order(self.count, self.capacity, new)
+        ts = self.ts[order]
+        mid = (self.bid[order] + self.ask[order]) * 0.5
+        priced = ~np.isnan(mid)
+        if not priced.all():
+            ts, mid = ts[priced], mid[priced]
+        for bars in self.bars.values():
+            bars.add(ts, mid)
+        self.rolled = self.count
+
+    def ticks(self, n=None):
+        """The last n ticks (all kept by default) as (ts, bid, ask) arrays, oldest first."""
+        held = min(self.count, self.capacity)
+        n = held if n is None else min(n, held)
+        order = _ring_order(self.count, self.capacity, n)
+        return self.ts[order].copy(), self.bid[order].copy(), self.ask[order].copy()
+
+    def since(self, start):
+        """Ticks at or after start (epoch seconds) as (ts, bid, ask) arrays."""
+        ts, bid, ask = self.ticks()
+        first = np.searchsorted(ts, start)
+        return ts[first:], bid[first:], ask[first:]
+
+class TickHistory:
+    """Series per epic or underlying name, created on first tick."""
+
+    def __init__(self, capacity=None, bar_capacity=None, intervals=BAR_INTERVALS):
+        self.capacity = capacity or Config.HISTORY_TICKS
+        self.bar_capacity = bar_capacity or Config.HISTORY_BARS
+        self.intervals = intervals
+        self.series = {}  # name -> Series
+
+    def record(self, name, bid, ask, ts=None):
+        """Append a tick (ts defaults to now, in epoch seconds)."""
+        series = self.series.get(name)
+        if series is None:
+            series = self.series[name] = Series(name, self.capacity, self.bar_capacity, self.intervals)
+        series.append(time.time() if ts is None else ts, bid, ask)
+
+    def get(self, name):
+        return self.series.get(name)
+
+    def names(self):
+        return sorted(self.series)
+
+    def discard(self, name):
+        self.series.pop(name, None)
+
+    def clear(self):
+        self.series.clear()
+
+    def bars(self, name, interval, n=None):
+        """The last n bars of a series for one of BAR_INTERVALS, or None if unknown."""
+        series = self.series.get(name)
+        if series is None:
+            return None
+        series.roll()
+        return series.bars[interval].arrays(n)
+
+    def stats(self, name, window=60.0, now=None):
+        """
+        Rolling statistics over the last window seconds: last and mean mid and
+        spread, and volatility as the standard deviation of tick-to-tick log
+        returns of the mid. None if the series is unknown or has no priced ticks.
+        """
+        series = self.series.get(name)
+        if series is None:
+            return None
+        now = time.time() if now is None else now
+        ts, bid, ask = series.since(now - window)
+        mid = (bid + ask) * 0.5
+        priced = ~np.isnan(mid)
+        if not priced.any():
+            return None
+        mid, spread = mid[priced], (ask - bid)[priced]
+        returns = np.diff(np.log(mid)) if len(mid) > 1 and (mid > 0).all() else np.zeros(0)
+        return {
+            "ticks": int(len(mid)),
+            "mid": float(mid[-1]),
+            "spread": float(spread[-1]),
+            "mean_mid": float(mid.mean()),
+            "mean_spread": float(spread.mean()),
+            "volatility": float(returns.std()) if len(returns) else 0.0,
+        }
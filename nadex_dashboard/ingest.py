@@ -0,0 +1,173 @@
+# ---------------------------------------------------------------
+# File        : ingest.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Where a WebSocketManager sends what it receives and subscribes.
+
+LocalIngest decodes frames and relays them to frontends in this process.
+ForwardingIngest, used by shard worker processes, puts the same events on a
+multiprocessing queue instead; the parent replays them into its LocalIngest
+with apply_event.
+"""
+
+import collections
+import queue
+import re
+import time
+
+from .parsing import decoder, ladders, update_table_mapping, remove_table_mapping, register_raw_table, process_message
+from .frontend import relay_to_frontend, relay_updates, broadcast_to_frontend
+from .metrics import ingest_stats, shard_drops
+
+# Tables that received a snapshot in a frame, without decoding it
+SNAPSHOT_RE = re.compile(r"z\((\d+),")
+
+class LocalIngest:
+    """Decode and relay in this process, optionally recording every frame."""
+
+    # TickRecorder, or None
+    recorder = None
+
+    def map_table(self, epic, table_id, kind, underlying):
+        update_table_mapping(epic, table_id, kind, underlying)
+        if self.recorder:
+            self.recorder.define(decoder.schemas[table_id])
+
+    def unmap_table(self, table_id):
+        remove_table_mapping(table_id)
+
+    def register_raw(self, table_id, kind, fields, name):
+        register_raw_table(table_id, kind, fields, name)
+        if self.recorder:
+            self.recorder.define(decoder.schemas[table_id])
+
+    def set_levels(self, levels):
+        """Strike levels {epic: level} from a discovery pass, for the ladders."""
+        ladders.set_levels(levels)
+
+    async def frame(self, msg, want_snapshots=False):
+        """
+        Process a Nadex frame and queue it for the frontends: as received to
+        raw clients, decoded updates to the others. With want_snapshots,
+        returns the ids of tables that got a snapshot.
+        """
+        received = time.perf_counter()
+        if self.recorder:
+            self.recorder.frame(msg)
+        updates = process_message(msg)
+        ingest_stats.frame(received, updates)
+        if not updates:
+            await relay_to_frontend(msg)
+            return ()
+        await relay_to_frontend(msg, decoded=True)
+        relay_updates(updates)
+        if want_snapshots:
+            return [update.table for update in updates if update.kind == "z"]
+        return ()
+
+    async def status(self, data):
+        await broadcast_to_frontend(data)
+
+    def take_resync(self):
+        """Whether the manager should resync its session; never for local ingest."""
+        return False
+
+class ForwardingIngest:
+    """
+    Forward events to the parent process over a multiprocessing queue.
+
+    Nothing here blocks the worker's event loop. When the queue is full,
+    table events wait in a local backlog, in order, and frames are dropped.
+    Once events fit again the drop count goes to the parent and take_resync()
+    tells the manager to reconnect, which replays every subscription and so
+    sends fresh snapshots.
+    """
+
+    def __init__(self, queue, shard):
+        self.queue = queue
+        self.shard = shard
+        self.backlog = collections.deque()  # events waiting for room, in order
+        self.dropped = 0                    # frames dropped since the last resync
+        self._resync = False
+
+    def _flush(self):
+        """Move backlogged events to the queue; True once the backlog is empty."""
+        backlog = self.backlog
+        try:
+            while backlog:
+                self.queue.put_nowait(backlog[0])
+                backlog.popleft()
+            if self.dropped:
+                self.queue.put_nowait(("dropped", self.shard, self.dropped))
+                print(f"[+] Shard {self.shard}: parent caught up after {self.dropped} dropped frames, resyncing")
+                self.dropped = 0
+                self._resync = True
+        except queue.Full:
+            return False
+        return True
+
+    def _send(self, event):
+        """Queue an event that must not be lost."""
+        self.backlog.append(event)
+        self._flush()
+
+    def take_resync(self):
+        """True once after frames were dropped and the parent caught up."""
+        resync, self._resync = self._resync, False
+        return resync
+
+    def map_table(self, epic, table_id, kind, underlying):
+        self._send(("map", epic, table_id, kind, underlying))
+
+    def unmap_table(self, table_id):
+        self._send(("unmap", table_id))
+
+    def register_raw(self, table_id, kind, fields, name):
+        self._send(("raw", table_id, kind, fields, name))
+
+    def set_levels(self, levels):
+        self._send(("levels", levels))
+
+    async def frame(self, msg, want_snapshots=False):
+        # A frame may only follow the events queued before it
+        if not self._flush():
+            self._drop()
+        else:
+            try:
+                self.queue.put_nowait(("frame", msg))
+            except queue.Full:
+                self._drop()
+        if want_snapshots:
+            return [int(t) for t in SNAPSHOT_RE.findall(msg)]
+        return ()
+
+    def _drop(self):
+        if not self.dropped:
+            print(f"[-] Shard {self.shard}: parent queue full, dropping frames until it catches up")
+        self.dropped += 1
+
+    async def status(self, data):
+        self._send(("status", dict(data, shard=self.shard)))
+
+async def apply_event(ingest, event):
+    """Replay an event forwarded by a ForwardingIngest."""
+    op = event[0]
+    if op == "frame":
+        await ingest.frame(event[1])
+    elif op == "map":
+        ingest.map_table(*event[1:])
+    elif op == "unmap":
+        ingest.unmap_table(event[1])
+    elif op == "raw":
+        ingest.register_raw(*event[1:])
+    elif op == "levels":
+        ingest.set_levels(event[1])
+    elif op == "status":
+        await ingest.status(event[1])
+    elif op == "dropped":
+        shard_drops[event[1]] = shard_drops.get(event[1], 0) + event[2]
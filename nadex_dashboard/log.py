@@ -0,0 +1,134 @@
+# ---------------------------------------------------------------
+# File        : log.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Non-blocking logging for the per-update output. Records go through a queue
+(logging.handlers.QueueHandler) to a listener thread that does the stdout
+writes, so the event loop never blocks on a slow terminal or journald pipe.
+
+Hot-path output is split into categories, each a logger under "nadex.":
+    forex     underlying price updates (tables 8-14)
+    option    strike/order book updates
+    mapping   table mapping changes
+    ping      keepalive PING/PONG
+    frontend  messages received from frontend clients
+
+Call sites check the category first, so disabled or sampled-out records
+are never formatted. Categories stay disabled until setup(), so importing
+the parsing modules (benchmarks, scripts, tests) formats nothing:
+
+    if forex_log.sample():
+        forex_log.info(f"[FOREX] ...")
+
+Settings: LOG_LEVEL, LOG_CATEGORIES (enabled names, or "all"), LOG_SAMPLE
+(emit every Nth record: "10", or per category "option=10,forex=2") and
+LOG_QUIET, which emits no per-update records and instead a per-second
+summary of how many there were.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from .config import Config
+
+class Category:
+    """A log category with an enable flag, 1-in-N sampling and a record count."""
+
+    __slots__ = ("name", "logger", "enabled", "every", "count")
+
+    def __init__(self, name):
+        self.name = name
+        self.logger = logging.getLogger(f"nadex.{name}")
+        self.enabled = False  # until setup()
+        self.every = 1
+        self.count = 0
+
+    def sample(self):
+        """Count a record; True if it should be formatted and logged."""
+        self.count += 1
+        return self.enabled and self.count % self.every == 0
+
+    def info(self, message):
+        self.logger.info(message)
+
+    def debug(self, message):
+        self.logger.debug(message)
+
+forex_log = Category("forex")
+option_log = Category("option")
+mapping_log = Category("mapping")
+ping_log = Category("ping")
+frontend_log = Category("frontend")
+CATEGORIES = {c.name: c for c in (forex_log, option_log, mapping_log, ping_log, frontend_log)}
+
+_listener = None
+_summary = None
+
+def _parse_sample(value):
+    """'10' or 'option=10,forex=2' -> {category or '*': every}."""
+    every = {}
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, n = part.rpartition("=")
+        try:
+            every[name or "*"] = max(1, int(n))
+        except ValueError:
+            print(f"[-] Ignoring invalid LOG_SAMPLE entry: {part}")
+    return every
+
+def setup():
+    """Configure categories from Config and start the queue listener (once per process)."""
+    global _listener, _summary
+    if _listener is not None:
+        return
+    enabled = {c.strip() for c in Config.LOG_CATEGORIES.split(",") if c.strip()}
+    every = _parse_sample(Config.LOG_SAMPLE)
+    for name, category in CATEGORIES.items():
+        category.enabled = not Config.LOG_QUIET and ("all" in enabled or name in enabled)
+        category.every = every.get(name, every.get("*", 1))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger("nadex")
+    root.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
+    root.propagate = False
+    root.addHandler(logging.handlers.QueueHandler(records))
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    atexit.register(shutdown)
+
+    if Config.LOG_QUIET:
+        _summary = threading.Thread(target=_summarize, name="nadex-log-summary", daemon=True)
+        _summary.start()
+
+def _summarize():
+    """Log per-second record counts of every category (quiet mode)."""
+    stats = logging.getLogger("nadex.stats")
+    last = {name: c.count for name, c in CATEGORIES.items()}
+    while _listener is not None:
+        time.sleep(1.0)
+        counts = {name: c.count for name, c in CATEGORIES.items()}
+        rates = {name: counts[name] - last[name] for name in counts}
+        last = counts
+        if any(rates.values()):
+            stats.info(f"[STATS] {time.strftime('%H:%M:%S')} " + " ".join(f"{n}={r}/s" for n, r in rates.items()))
+
+def shutdown():
+    """Flush queued records and stop the listener."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
@@ -6,6 +6,7 @@
 # Copyright (c) Shivam Garg. All rights reserved.
 # ---------------------------------------------------------------
 
+import argparse
 import asyncio
 import signal
 import sys
@@ -13,8 +14,18 @@ import websockets
 import contextlib
 
 from .config import Config
-from .helpers import get_session_info, fetch_market_tree, extract_forex_ids, map_market_data, print_market_mapping
+from . import cache
+from . import log
+from .helpers import get_session_info, discover_markets_async, print_market_mapping
 from .websocket_manager import WebSocketManager
+from .shards import run_shards
+from .pipeline import Pipeline
+from .ingest import LocalIngest
+from .parsing import decoder
+from .recorder import TickRecorder
+from .metrics import start_metrics_server, loop_lag
+from .replay import replay
+from .tui import Dashboard
 from .frontend import frontend_handler, close_all_frontend_connections
 
 # Global shutdown event
@@ -25,39 +36,90 @@ def signal_handler(signum, frame):
     print(f"\n[!] Received signal {signum}. Initiating graceful shutdown...")
     shutdown_event.set()
 
-async def main():
-    """Main application entry point."""
-    # Set up signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
-    # 1) Start frontend server
-    server = await websockets.serve(frontend_handler, "0.0.0.0", Config.FRONTEND_PORT)
-    print(f"[+] Frontend WS listening on ws://0.0.0.0:{Config.FRONTEND_PORT}")
+async def start_nadex(ingest):
+    """Create a session, discover markets and start streaming; None if nothing to stream."""
+    # Blocking HTTP runs on worker threads so the frontend server stays responsive
+    loop = asyncio.get_running_loop()
+    sid, host, phase = await loop.run_in_executor(None, get_session_info)
+    print(f"[+] Session={sid} phase={phase+2} host={host}")
 
-    try:
-        # 2) Get session info and market data
-        sid, host, phase = get_session_info()
-        print(f"[+] Session={sid} phase={phase+2} host={host}")
+    # Warm start: subscribe from a recent cached mapping right away and
+    # reconcile against live navigation once subscribed
+    cached = cache.load_mapping()
+    if cached:
+        fx_ids, mapping, levels, age = cached
+        print(f"[+] Warm start from cached market mapping ({int(age)}s old)")
+    else:
+        fx_ids, mapping, levels = await discover_markets_async()
+    if not fx_ids:
+        print("[-] No forex IDs found, exiting.")
+        return None
+    ingest.set_levels(levels)
+
+    print_market_mapping(mapping)
+
+    if Config.SHARDS > 1:
+        return asyncio.create_task(
+            run_shards((sid, phase, host), mapping, fx_ids, shutdown_event,
+                       reconcile=bool(cached), ingest=ingest)
+        )
+    mgr = WebSocketManager(sid, phase, host, mapping, fx_ids, shutdown_event,
+                           reconcile=bool(cached), ingest=ingest)
+    return asyncio.create_task(mgr.run())
+
+async def main(replay_path=None, speed=1.0, tui=False):
+    """
+    Main application entry point. With replay_path, frames come from a
+    recording instead of Nadex; with tui, the terminal shows a full-screen
+    dashboard instead of the log.
+    """
+    # Before logging starts, so its output lands in the dashboard's log pane
+    dashboard = Dashboard(on_quit=shutdown_event.set) if tui else None
+    if dashboard:
+        dashboard.open()
+    log.setup()
+
+    # Set up signal handlers (through the loop, so they wake it even when idle)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, signal_handler, signum, None)
+    
+    # 1) Start frontend server, or the fan-out worker processes that serve it
+    pipeline = server = catalogs = None
+    if Config.FANOUT_PROCESSES > 0:
+        pipeline = Pipeline()
+        pipeline.start()
+        catalogs = asyncio.create_task(pipeline.serve_catalogs())
+    else:
+        server = await websockets.serve(frontend_handler, "0.0.0.0", Config.FRONTEND_PORT)
+        print(f"[+] Frontend WS listening on ws://0.0.0.0:{Config.FRONTEND_PORT}")
+    ingest = pipeline.ingest if pipeline else LocalIngest()
+    metrics_server = await start_metrics_server()
+    loop_lag.start()
 
-        tree = fetch_market_tree()
-        fx_ids = extract_forex_ids(tree)
-        if not fx_ids:
-            print("[-] No forex IDs found, exiting.")
-            return
+    tui_task = asyncio.create_task(dashboard.run()) if dashboard else None
 
-        mapping = map_market_data(fx_ids)
-        print_market_mapping(mapping)
+    recorder = None
+    if Config.RECORD_DIR and not replay_path:
+        recorder = TickRecorder(Config.RECORD_DIR, Config.RECORD_SEGMENT_SIZE,
+                                Config.RECORD_SEGMENT_SECONDS, decoder.schemas.values())
+        ingest.recorder = recorder
+        print(f"[+] Recording ticks to {Config.RECORD_DIR}")
 
-        # 3) Start WebSocket manager
-        mgr = WebSocketManager(sid, phase, host, mapping, fx_ids, shutdown_event)
-        nadex_task = asyncio.create_task(mgr.listen_and_relay())
+    try:
+        # 2-3) Connect to Nadex, or replay a recording instead
+        if replay_path:
+            nadex_task = asyncio.create_task(replay(replay_path, speed, ingest))
+        else:
+            nadex_task = await start_nadex(ingest)
+            if nadex_task is None:
+                return
 
         # 4) Wait for shutdown signal
         await shutdown_event.wait()
         print("\n[!] Shutdown requested — cleaning up…")
 
-        # 5) Cancel WebSocket manager
+        # 5) Cancel WebSocket manager (or replay)
         nadex_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await nadex_task
@@ -67,14 +129,39 @@ async def main():
         raise
     finally:
         # 6) Close all connections
-        await close_all_frontend_connections()
-        server.close()
-        await server.wait_closed()
+        if tui_task:
+            tui_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await tui_task
+            dashboard.close()
+        if recorder:
+            recorder.close()
+        if metrics_server:
+            metrics_server.close()
+        if pipeline:
+            catalogs.cancel()
+            await pipeline.stop()
+        else:
+            await close_all_frontend_connections()
+            server.close()
+            await server.wait_closed()
         print("[+] All done. Bye.")
+        log.shutdown()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="nadex_dashboard", description="Nadex 5-minute binary options dashboard")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="serve a recording (tick recorder directory or .jsonl corpus) instead of live data")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed as a multiple of real time; 0 = as fast as possible (default 1)")
+    parser.add_argument("--tui", action="store_true",
+                        help="full-screen dashboard of forex prices and strike ladders instead of the update log")
+    return parser.parse_args(argv)
 
 def cli_entry():
+    args = parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.replay, args.speed, args.tui))
     except KeyboardInterrupt:
         print("\n[!] Interrupted by user")
     except Exception as e:
@@ -84,12 +171,4 @@ def cli_entry():
         sys.exit(0)
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print("\n[!] Interrupted by user")
-    except Exception as e:
-        print(f"[ERROR] {e}")
-        sys.exit(1)
-    else:
-        sys.exit(0)
\ No newline at end of file
+    cli_entry()
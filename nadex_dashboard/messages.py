@@ -8,6 +8,51 @@
 
 from .config import Config
 
+# Field schemas (LS_schema) of the MERGE tables we subscribe to
+FOREX_SCHEMA = ["lastTradedPrice", "updateTime"]
+
+STRIKE_SCHEMA = [
+    "displayOffer", "displayBid", "bidSize", "offerSize", "updateTime",
+    "delayTime", "marketStatus", "swapPointSell", "swapPointBuy",
+]
+
+ORDERBOOK_SCHEMA = [
+    "displayOffer", "displayBid", "bidSize", "offerSize",
+    "displayOffer2", "displayBid2", "bidSize2", "offerSize2",
+    "displayOffer3", "displayBid3", "bidSize3", "offerSize3",
+    "displayOffer4", "displayBid4", "bidSize4", "offerSize4",
+    "displayOffer5", "displayBid5", "bidSize5", "offerSize5",
+]
+
+# Names of the values as they arrive. Nadex sends them in the order of the
+# field codes in LS_id (BD1, AK1, BS1, AS1, ...), bid before offer, whatever
+# the LS_schema labels above say; the schemas are sent unchanged.
+STRIKE_FIELDS = [
+    "displayBid", "displayOffer", "bidSize", "offerSize", "updateTime",
+    "delayTime", "marketStatus", "swapPointSell", "swapPointBuy",
+]
+
+ORDERBOOK_FIELDS = [
+    "displayBid", "displayOffer", "bidSize", "offerSize",
+    "displayBid2", "displayOffer2", "bidSize2", "offerSize2",
+    "displayBid3", "displayOffer3", "bidSize3", "offerSize3",
+    "displayBid4", "displayOffer4", "bidSize4", "offerSize4",
+    "displayBid5", "displayOffer5", "bidSize5", "offerSize5",
+]
+
+# Field schemas and modes of the core tables (1-7)
+CORE_SCHEMAS = {
+    1: (["HEARTBEAT"], "RAW"),
+    2: (["message"], "RAW"),
+    3: (["AC_AVAILABLE_BALANCE", "AC_USED_MARGIN"], "MERGE"),
+    4: (["json"], "RAW"),
+    5: (["message"], "RAW"),
+    6: (["json"], "RAW"),
+    7: (["json"], "RAW"),
+}
+
+HIERARCHY_SCHEMA = ["json"]
+
 class WebSocketMessages:
     """Class to handle all WebSocket message templates"""
     
@@ -70,7 +115,7 @@ class WebSocketMessages:
             msg = (
                 "control\r\n"
                 f"LS_mode=MERGE&LS_id=V2-F-LTP%2CUTM%7CCH.U.X%3A{symbol}:1321%3ABLD.OPT-1-1.IP&"
-                "LS_schema=lastTradedPrice%20updateTime&LS_snapshot=true&LS_requested_max_frequency=1&"
+                f"LS_schema={'%20'.join(FOREX_SCHEMA)}&LS_snapshot=true&LS_requested_max_frequency=1&"
                 f"LS_table={table}&LS_req_phase={phase_val}&LS_win_phase=50&LS_op=add&LS_session={session_id}&"
             )
             messages.append(msg)
@@ -83,7 +128,7 @@ class WebSocketMessages:
         return (
             "control\r\n"
             f"LS_mode=MERGE&LS_id=V2-F-BD1%2CAK1%2CBS1%2CAS1%2CUTM%2CDLY%2CUBS%2CSWAP_3_SHORT%2CSWAP_3_LONG%7C{encoded_epic}&"
-            "LS_schema=displayOffer%20displayBid%20bidSize%20offerSize%20updateTime%20delayTime%20marketStatus%20swapPointSell%20swapPointBuy&"
+            f"LS_schema={'%20'.join(STRIKE_SCHEMA)}&"
             f"LS_snapshot=true&LS_requested_max_frequency=1&LS_table={table_counter}&"
             f"LS_req_phase={req_phase_counter}&LS_win_phase={win_phase}&LS_op=add&LS_session={session_id}&"
         )
@@ -94,7 +139,7 @@ class WebSocketMessages:
         return (
             "control\r\n"
             f"LS_mode=MERGE&LS_id=V2-F-BD1%2CAK1%2CBS1%2CAS1%2CBD2%2CAK2%2CBS2%2CAS2%2CBD3%2CAK3%2CBS3%2CAS3%2CBD4%2CAK4%2CBS4%2CAS4%2CBD5%2CAK5%2CBS5%2CAS5%7C{encoded_epic}&"
-            "LS_schema=displayOffer%20displayBid%20bidSize%20offerSize%20displayOffer2%20displayBid2%20bidSize2%20offerSize2%20displayOffer3%20displayBid3%20bidSize3%20offerSize3%20displayOffer4%20displayBid4%20bidSize4%20offerSize4%20displayOffer5%20displayBid5%20bidSize5%20offerSize5&"
+            f"LS_schema={'%20'.join(ORDERBOOK_SCHEMA)}&"
             f"LS_snapshot=true&LS_requested_max_frequency=1&LS_table={table_counter}&"
             f"LS_req_phase={req_phase_counter}&LS_win_phase={win_phase}&LS_op=add&LS_session={session_id}&"
         )
@@ -109,6 +154,15 @@ class WebSocketMessages:
             f"LS_req_phase={req_phase_counter}&LS_win_phase={win_phase}&LS_op=add&LS_session={session_id}&"
         )
     
+    @staticmethod
+    def get_delete_message(session_id, table_counter, req_phase_counter, win_phase):
+        """Generate unsubscribe message for a table"""
+        return (
+            "control\r\n"
+            f"LS_table={table_counter}&LS_req_phase={req_phase_counter}&LS_win_phase={win_phase}&"
+            f"LS_op=delete&LS_session={session_id}&"
+        )
+    
     @staticmethod
     def get_ping_message(session_id, phase):
         """Generate ping/keepalive message"""
@@ -117,20 +171,32 @@ class WebSocketMessages:
             f"LS_polling=true&LS_polling_millis=0&LS_idle_millis=0&LS_container=lsc&"
         )
 
+def batch_control(messages):
+    """
+    Pack control requests into one frame: a single "control" header followed
+    by one request body per line.
+    """
+    bodies = [m[len("control\r\n"):] if m.startswith("control\r\n") else m for m in messages]
+    return "control\r\n" + "\r\n".join(bodies)
+
 class MessageTable:
-    """Class to display message information in a table format"""
+    """Class to display message information in a table format (one row per live table)"""
     
     def __init__(self):
-        self.messages = []
+        self.messages = {}
     
     def add_message(self, message_type, table_id, description, epic=None):
-        """Add a message to the table"""
-        self.messages.append({
+        """Add a message to the table, replacing any earlier row for the same table"""
+        self.messages[table_id] = {
             'type': message_type,
             'table': table_id,
             'description': description,
             'epic': epic or 'N/A'
-        })
+        }
+    
+    def remove_message(self, table_id):
+        """Remove the row of a deleted table"""
+        self.messages.pop(table_id, None)
     
     def print_table(self):
         """Print the message table"""
@@ -140,7 +206,7 @@ class MessageTable:
         print(f"{'Type':<20} {'Table':<8} {'Epic':<30} {'Description':<40}")
         print("-"*100)
         
-        for msg in self.messages:
+        for msg in self.messages.values():
             print(f"{msg['type']:<20} {msg['table']:<8} {msg['epic']:<30} {msg['description']:<40}")
         
         print("-"*100)
@@ -149,6 +215,6 @@ class MessageTable:
     
     def clear(self):
         """Clear the message table"""
-        self.messages = []
+        self.messages = {}
 
         
\ No newline at end of file
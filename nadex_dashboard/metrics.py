@@ -0,0 +1,261 @@
+# ---------------------------------------------------------------
+# File        : metrics.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Runtime metrics: event-loop lag, ingest counters, latency histograms and a
+Prometheus text-format endpoint (GET /metrics on METRICS_HOST:METRICS_PORT).
+
+The hot path only bumps plain counters; labels (kind, epic, underlying),
+per-client queue state and subscription counts are looked up when scraped.
+"""
+
+import asyncio
+import bisect
+import time
+import weakref
+
+from .config import Config
+
+class LoopLagMonitor:
+    """
+    Measures event-loop stalls. A background task sleeps for a fixed interval;
+    anything past the interval before it wakes up again is time the loop
+    spent blocked. Stall time counts only lags above the threshold.
+    """
+
+    def __init__(self, interval=0.05, threshold=0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self.window_max = 0.0
+        self.stall_time = 0.0
+        self.stalls = 0
+        self._task = None
+
+    def start(self):
+        """Start the monitor task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the monitor task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - start - self.interval
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.window_max:
+                self.window_max = lag
+            if lag > self.threshold:
+                self.stall_time += lag
+                self.stalls += 1
+
+    def mark(self):
+        """Start a measurement window; pass the result to since()."""
+        self.window_max = 0.0
+        return (self.stall_time, self.stalls)
+
+    def since(self, mark):
+        """(stall seconds, stall count, max lag seconds) since mark."""
+        stall_time, stalls = mark
+        return (self.stall_time - stall_time, self.stalls - stalls, self.window_max)
+
+# Shared monitor for the ingest loop
+loop_lag = LoopLagMonitor()
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels=""):
+        """(metric line name, value) pairs for this histogram."""
+        sep = "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{sep}le="{bound:g}"}}', cumulative
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}}', self.count
+        suffix = f"{{{labels}}}" if labels else ""
+        yield f"{name}_sum{suffix}", self.sum
+        yield f"{name}_count{suffix}", self.count
+
+class IngestStats:
+    """Frame and per-table update counters plus receive-to-parse latency."""
+
+    def __init__(self):
+        self.frames = 0
+        self.updates = {}  # table_id -> updates received since it was mapped
+        self.retired = {}  # underlying -> updates of tables since unmapped
+        self.parse_latency = Histogram()
+
+    def frame(self, received, updates):
+        """Count a decoded frame received at perf_counter() time received."""
+        self.frames += 1
+        counts = self.updates
+        for update in updates:
+            update.received = received
+            counts[update.table] = counts.get(update.table, 0) + 1
+        self.parse_latency.observe(time.perf_counter() - received)
+
+    def retire(self, table_id, underlying):
+        """
+        Drop the count of an unmapped table, so an epic that reuses the id
+        starts from zero; it stays in its underlying's total.
+        """
+        count = self.updates.pop(table_id, 0)
+        if count:
+            self.retired[underlying] = self.retired.get(underlying, 0) + count
+
+# Shared counters for this process
+ingest_stats = IngestStats()
+
+# Receive-to-frontend-send latency of updates, observed by client writers
+send_latency = Histogram()
+
+# Fan-out worker resyncs from the ring, by reason
+ring_resyncs = {"overrun": 0, "decode": 0}
+
+# Frames shard workers dropped while the parent's queue was full, by shard
+shard_drops = {}
+
+# WebSocketManagers whose subscription registries are reported
+managers = weakref.WeakSet()
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for sample, value in samples:
+        lines.append(f"{sample} {value:g}" if isinstance(value, float) else f"{sample} {value}")
+
+def render():
+    """All metrics of this process in Prometheus text format."""
+    from . import parsing
+    from .frontend import frontend_clients
+
+    lines = []
+    _metric(lines, "nadex_frames_total", "counter", "Nadex frames received",
+            [("nadex_frames_total", ingest_stats.frames)])
+
+    schemas = parsing.decoder.schemas
+    by_table, by_underlying = [], dict(ingest_stats.retired)
+    for table_id, count in list(ingest_stats.updates.items()):
+        schema = schemas.get(table_id)
+        kind = schema.kind if schema else "UNKNOWN"
+        name = (schema.name or "") if schema else ""
+        underlying = parsing.table_underlying.get(table_id, "")
+        by_table.append((
+            f'nadex_table_updates_total{{table="{table_id}",kind="{kind}",'
+            f'name="{_label(name)}",underlying="{underlying}"}}', count
+        ))
+        by_underlying[underlying] = by_underlying.get(underlying, 0) + count
+    _metric(lines, "nadex_table_updates_total", "counter", "Decoded updates per table", by_table)
+    _metric(lines, "nadex_underlying_updates_total", "counter", "Decoded updates per underlying pair",
+            [(f'nadex_underlying_updates_total{{underlying="{u}"}}', c) for u, c in sorted(by_underlying.items())])
+
+    _metric(lines, "nadex_parse_seconds", "histogram", "Frame receive to decoded and applied",
+            ingest_stats.parse_latency.samples("nadex_parse_seconds"))
+    _metric(lines, "nadex_frontend_send_seconds", "histogram", "Update receive to sent to a frontend client",
+            send_latency.samples("nadex_frontend_send_seconds"))
+
+    sessions = list(frontend_clients.values())
+    _metric(lines, "nadex_frontend_clients", "gauge", "Connected frontend clients",
+            [("nadex_frontend_clients", len(sessions))])
+    queued, dropped, sent = [], [], []
+    for session in sessions:
+        addr = session.remote_address
+        client = _label(f"{addr[0]}:{addr[1]}" if addr else id(session))
+        labels = f'client="{client}",format="{session.format}"'
+        queued.append((f"nadex_frontend_queue_depth{{{labels}}}", len(session.queue)))
+        dropped.append((f"nadex_frontend_dropped_total{{{labels}}}", session.dropped))
+        sent.append((f"nadex_frontend_frames_sent_total{{{labels}}}", session.sent))
+    _metric(lines, "nadex_frontend_queue_depth", "gauge", "Messages queued per frontend client", queued)
+    _metric(lines, "nadex_frontend_dropped_total", "counter", "Messages dropped per frontend client", dropped)
+    _metric(lines, "nadex_frontend_frames_sent_total", "counter", "Frames sent per frontend client", sent)
+
+    _metric(lines, "nadex_ring_resyncs_total", "counter", "Fan-out worker resyncs from the ring",
+            [(f'nadex_ring_resyncs_total{{reason="{r}"}}', c) for r, c in ring_resyncs.items()])
+    _metric(lines, "nadex_shard_frames_dropped_total", "counter", "Frames a shard worker dropped on a full queue",
+            [(f'nadex_shard_frames_dropped_total{{shard="{s}"}}', c) for s, c in sorted(shard_drops.items())])
+
+    _metric(lines, "nadex_loop_lag_max_seconds", "gauge", "Largest event-loop lag seen",
+            [("nadex_loop_lag_max_seconds", loop_lag.max_lag)])
+    _metric(lines, "nadex_loop_stall_seconds_total", "counter", "Event-loop time lost to stalls",
+            [("nadex_loop_stall_seconds_total", loop_lag.stall_time)])
+    _metric(lines, "nadex_loop_stalls_total", "counter", "Event-loop stalls above the threshold",
+            [("nadex_loop_stalls_total", loop_lag.stalls)])
+
+    tables, pending, reconnects = [], [], []
+    for mgr in list(managers):
+        shard = mgr.shard.index
+        kinds = {}
+        for kind, _ in mgr.subscriptions.tables.values():
+            kinds[kind] = kinds.get(kind, 0) + 1
+        for kind, count in sorted(kinds.items()):
+            tables.append((f'nadex_subscribed_tables{{shard="{shard}",kind="{kind}"}}', count))
+        pending.append((f'nadex_subscriptions_pending{{shard="{shard}"}}', len(mgr.pacer.pending)))
+        reconnects.append((f'nadex_reconnects_total{{shard="{shard}"}}', mgr.reconnects))
+    _metric(lines, "nadex_subscribed_tables", "gauge", "Registered strike and hierarchy tables", tables)
+    _metric(lines, "nadex_subscriptions_pending", "gauge", "Tables awaiting their first snapshot", pending)
+    _metric(lines, "nadex_reconnects_total", "counter", "Nadex reconnects", reconnects)
+    return "\n".join(lines) + "\n"
+
+async def _handle(reader, writer):
+    try:
+        request = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        path = request.split(b" ")[1] if request.count(b" ") >= 2 else b""
+        if path.split(b"?")[0] == b"/metrics":
+            status, body = "200 OK", render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(port=None):
+    """Serve GET /metrics; returns the server, or None if METRICS_PORT is 0."""
+    port = Config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle, Config.METRICS_HOST, port)
+    print(f"[+] Metrics on http://{Config.METRICS_HOST}:{port}/metrics")
+    return server
@@ -0,0 +1,166 @@
+# ---------------------------------------------------------------
+# File        : orderbook.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import math
+from array import array
+
+from .messages import STRIKE_FIELDS, ORDERBOOK_FIELDS
+
+# Depth levels carried by the ORDERBOOK subscription
+LEVELS = 5
+
+# Value stored for empty ($) price/size fields
+EMPTY = math.nan
+
+# Field names, in arrival order, of each strike table type
+TABLE_SCHEMAS = {
+    "STRIKE": STRIKE_FIELDS,
+    "ORDERBOOK": ORDERBOOK_FIELDS,
+}
+
+# Schema field name (without level suffix) -> index into OrderBook.levels
+_LEVEL_FIELDS = {
+    "displayBid": 0,
+    "displayOffer": 1,
+    "bidSize": 2,
+    "offerSize": 3,
+}
+_SCALAR_FIELDS = {
+    "updateTime": "update_time",
+    "marketStatus": "market_status",
+}
+
+def _to_float(value):
+    """Convert a Lightstreamer field value to float, EMPTY if blank or invalid."""
+    if not value:
+        return EMPTY
+    try:
+        return float(value)
+    except ValueError:
+        return EMPTY
+
+def build_field_plan(schema):
+    """
+    Map schema positions onto OrderBook slots. Returns (level_slots, scalar_slots):
+    (position, array index, level) for depth fields, (position, attribute) for
+    scalar fields. Fields not held in the book are left out.
+    """
+    level_slots, scalar_slots = [], []
+    for pos, name in enumerate(schema):
+        if name in _SCALAR_FIELDS:
+            scalar_slots.append((pos, _SCALAR_FIELDS[name]))
+            continue
+        base = name.rstrip("0123456789")
+        if base in _LEVEL_FIELDS:
+            level = int(name[len(base):] or 1) - 1
+            level_slots.append((pos, _LEVEL_FIELDS[base], level))
+    return tuple(level_slots), tuple(scalar_slots)
+
+class OrderBook:
+    """Five-level bid/ask depth for a single epic, held in preallocated arrays."""
+
+    __slots__ = ("epic", "bids", "asks", "bid_sizes", "ask_sizes", "levels",
+                 "update_time", "market_status", "updates")
+
+    def __init__(self, epic):
+        self.epic = epic
+        self.bids = array("d", [EMPTY]) * LEVELS
+        self.asks = array("d", [EMPTY]) * LEVELS
+        self.bid_sizes = array("d", [EMPTY]) * LEVELS
+        self.ask_sizes = array("d", [EMPTY]) * LEVELS
+        self.levels = (self.bids, self.asks, self.bid_sizes, self.ask_sizes)
+        self.update_time = None
+        self.market_status = None
+        self.updates = 0
+
+    @property
+    def best_bid(self):
+        return self.bids[0]
+
+    @property
+    def best_ask(self):
+        return self.asks[0]
+
+    def apply(self, plan, values):
+        """Apply a MERGE delta in place. None values (#) leave the field unchanged."""
+        level_slots, scalar_slots = plan
+        levels = self.levels
+        n = len(values)
+        for pos, arr, level in level_slots:
+            if pos >= n:
+                break
+            value = values[pos]
+            if value is not None:
+                levels[arr][level] = _to_float(value)
+        for pos, attr in scalar_slots:
+            if pos < n and values[pos] is not None:
+                setattr(self, attr, values[pos])
+        self.updates += 1
+
+    def to_dict(self):
+        """Return the current book state as plain Python types."""
+        return {
+            "epic": self.epic,
+            "bids": self.bids.tolist(),
+            "asks": self.asks.tolist(),
+            "bid_sizes": self.bid_sizes.tolist(),
+            "ask_sizes": self.ask_sizes.tolist(),
+            "update_time": self.update_time,
+            "market_status": self.market_status,
+        }
+
+class OrderBookStore:
+    """In-memory order books keyed by epic, addressable by Lightstreamer table id."""
+
+    def __init__(self):
+        self.books = {}   # epic -> OrderBook
+        self.tables = {}  # table_id -> (OrderBook, field plan)
+        self._plans = {kind: build_field_plan(schema) for kind, schema in TABLE_SCHEMAS.items()}
+
+    def register(self, table_id, epic, kind):
+        """Attach a subscribed table to the book of its epic."""
+        plan = self._plans.get(kind)
+        if plan is None:
+            return None
+        book = self.books.get(epic)
+        if book is None:
+            book = self.books[epic] = OrderBook(epic)
+        self.tables[table_id] = (book, plan)
+        return book
+
+    def unregister(self, table_id):
+        """Detach a table, dropping the book once none of its tables remain."""
+        entry = self.tables.pop(table_id, None)
+        if entry is None:
+            return
+        book = entry[0]
+        if not any(b is book for b, _ in self.tables.values()):
+            self.books.pop(book.epic, None)
+
+    def apply(self, table_id, values):
+        """Apply an update for table_id. Returns the updated book, or None if untracked."""
+        entry = self.tables.get(table_id)
+        if entry is None:
+            return None
+        book, plan = entry
+        book.apply(plan, values)
+        return book
+
+    def get(self, epic):
+        """Get the book for an epic."""
+        return self.books.get(epic)
+
+    def get_by_table(self, table_id):
+        """Get the book a table id feeds."""
+        entry = self.tables.get(table_id)
+        return entry[0] if entry else None
+
+    def clear(self):
+        """Drop all books and table registrations."""
+        self.books.clear()
+        self.tables.clear()
@@ -6,153 +6,215 @@
 # Copyright (c) Shivam Garg. All rights reserved.
 # ---------------------------------------------------------------
 
+import math
 import re
-from collections import defaultdict
+import time
+
+from .analytics import StrikeLadders
+from .decoder import FrameDecoder, MergedState
+from .history import TickHistory
+from .log import forex_log, option_log, mapping_log
+from .messages import FOREX_SCHEMA, CORE_SCHEMAS
+from .metrics import ingest_stats
+from .orderbook import OrderBookStore, TABLE_SCHEMAS
+
+# Underlying forex price tables (8-14)
+FOREX_TABLES = {
+    8: "AUD/USD",
+    9: "EUR/USD",
+    10: "GBP/USD",
+    11: "USD/JPY",
+    12: "EUR/JPY",
+    13: "GBP/JPY",
+    14: "USD/CAD"
+}
 
 # Global table to epic mapping
 table_to_epic = {}
 
-# Regex to extract z() and d() calls
-CALL_RE = re.compile(r"(z|d)\(\s*([^)]*?)\s*\)")
+# Bumped whenever the table mapping changes, so derived indexes can refresh
+mapping_version = 0
 
-def update_table_mapping(epic, table_id, type):
+def pair_key(name):
+    """
+    Normalize an underlying name ("EUR/USD", "SEURUSD", an underlying epic or
+    a strike epic) to its pair key, e.g. "EURUSD".
+    """
+    letters = re.sub(r"[^A-Z]", "", str(name).upper())
+    for code in _PAIR_KEYS:
+        if code in letters:
+            return code
+    return letters
+
+_PAIR_KEYS = [pair.replace("/", "") for pair in FOREX_TABLES.values()]
+
+# Underlying pair key per forex and strike table
+table_underlying = {tbl: pair_key(pair) for tbl, pair in FOREX_TABLES.items()}
+
+# Global order book store, fed by STRIKE/ORDERBOOK tables
+order_books = OrderBookStore()
+
+# Global frame decoder, routing each table id to its field schema
+decoder = FrameDecoder()
+for _tbl, (_fields, _mode) in CORE_SCHEMAS.items():
+    decoder.register(_tbl, "CORE", _fields, mode=_mode)
+for _tbl, _pair in FOREX_TABLES.items():
+    decoder.register(_tbl, "FOREX", FOREX_SCHEMA, _pair)
+
+# Latest merged state per MERGE table, served as snapshots to new frontends
+table_state = MergedState()
+
+# Latest merged [lastTradedPrice, updateTime] per forex table
+forex_prices = {tbl: [None, None] for tbl in FOREX_TABLES}
+
+# Recent ticks and OHLC bars per underlying pair key and per strike epic
+tick_history = TickHistory()
+
+# Quotes changed by the frame being processed, recorded once when it ends
+_frame_spots = {}  # pair key -> forex price
+_frame_books = {}  # epic -> OrderBook
+
+# Strike-aligned analytics arrays per underlying pair key
+ladders = StrikeLadders(order_books, table_underlying)
+
+def update_table_mapping(epic, table_id, type, underlying=None, verbose=True):
     """
     Update the table_to_epic mapping when new subscriptions are made.
     Call this function whenever you process the subscription table from logs.
     """
-    global table_to_epic
-    
+    global table_to_epic, mapping_version
+
     table_to_epic[table_id] = epic + " " + type
-    
-    print(f"[INFO] Updated table mappings for {len(table_to_epic)} tables")
+    table_underlying[table_id] = pair_key(underlying or epic)
+    mapping_version += 1
+    order_books.register(table_id, epic, type)
+    decoder.register(table_id, type, TABLE_SCHEMAS[type], epic)
+    ladders.invalidate()
 
-def parse_csv_args(argstr):
-    """
-    Parse comma-separated arguments, handling quoted strings properly.
-    Returns list of cleaned argument strings.
-    """
-    # Handle quoted strings and regular comma separation
-    tokens = re.findall(r"""'[^']*'|[^,]+""", argstr)
-    # Strip whitespace and quotes, convert $ to empty string, # to None representation
-    parts = []
-    for token in tokens:
-        cleaned = token.strip().strip("'")
-        if cleaned == '$':
-            parts.append('')  # Empty value
-        elif cleaned == '#':
-            parts.append(None)  # Null value
+    if verbose and mapping_log.sample():
+        mapping_log.info(f"[INFO] Updated table mappings for {len(table_to_epic)} tables")
+
+def register_raw_table(table_id, kind, fields, name=None):
+    """Register a RAW-mode table (e.g. hierarchy JSON) so its updates are decoded and relayed."""
+    decoder.register(table_id, kind, fields, name, mode="RAW")
+
+def _apply_forex(update):
+    """Merge a forex underlying update (tables 8-14), record and log it."""
+    state = forex_prices[update.table]
+    for i, value in enumerate(update.values[:2]):
+        if value is not None:
+            state[i] = value
+    if update.values and update.values[0]:
+        try:
+            price = float(update.values[0])
+        except ValueError:
+            pass
         else:
-            parts.append(cleaned)
-    
-    return [p for p in parts if p is not None]  # Filter out None values
+            pair = table_underlying[update.table]
+            _frame_spots[pair] = price
+    if update.kind != "d" or not forex_log.sample():  # Only log updates for forex
+        return
+    price = state[0] or "N/A"
+    timestamp = state[1] or "N/A"
+    pair = update.schema.name
+    forex_log.info(f"[FOREX] {pair:8} -> {price:>10} @ {timestamp}")
 
-def find_time_field(parts, start_idx=3):
-    """
-    Find the timestamp field in the message parts.
-    Looks for HH:MM:SS pattern starting from start_idx.
-    """
-    for i in range(start_idx, len(parts)):
-        if parts[i] and re.match(r"\d{2}:\d{2}:\d{2}", str(parts[i])):
-            return i, parts[i]
-    return None, None
+def _fmt_price(value):
+    """Format a book price for display."""
+    return "N/A" if math.isnan(value) else f"{value:g}"
+
+def _apply_option(update):
+    """Apply a binary option update to the order book store, record and log it."""
+    book = order_books.apply(update.table, update.values)
+    if book is None:
+        return
+    _frame_books[book.epic] = book
+    if not option_log.sample():
+        return
+    tag = "INIT" if update.kind == "z" else "UPDATE"
+    bid = _fmt_price(book.best_bid)
+    ask = _fmt_price(book.best_ask)
+    timestamp = book.update_time or "N/A"
+
+    # Clean up epic name for display
+    epic_short = table_to_epic[update.table].replace("NB.I.", "").replace(".IP", "")
+
+    option_log.info(f"[{tag:6}] {epic_short:35} bid={bid:>6} ask={ask:>6} @ {timestamp}")
+
+def _end_frame():
+    """Record the quotes the frame changed, once per pair or epic, and refresh the ladders."""
+    if _frame_spots or _frame_books:
+        now = time.time()
+        for pair, price in _frame_spots.items():
+            tick_history.record(pair, price, price, now)
+            ladders.spot(pair, price)
+        for book in _frame_books.values():
+            tick_history.record(book.epic, book.best_bid, book.best_ask, now)
+            ladders.update(book)
+        _frame_spots.clear()
+        _frame_books.clear()
+    ladders.refresh()
 
 def process_forex_prices(msg: str):
     """
     Process underlying forex price updates (tables 8-14).
     These are the base currency pair prices that affect all options.
     """
-    # Look for d() calls on tables 8-14 (forex underlying prices)
-    forex_tables = {
-        8: "AUD/USD",
-        9: "EUR/USD", 
-        10: "GBP/USD",
-        11: "USD/JPY",
-        12: "EUR/JPY",
-        13: "GBP/JPY", 
-        14: "USD/CAD"
-    }
-    
-    for match in CALL_RE.finditer(msg):
-        call_type, argstr = match.groups()
-        if call_type != 'd':  # Only process updates for forex
-            continue
-            
-        parts = parse_csv_args(argstr)
-        if len(parts) < 3:
-            continue
-            
-        try:
-            tbl = int(parts[0])
-        except (ValueError, TypeError):
-            continue
-            
-        if tbl in forex_tables:
-            price = parts[2] if len(parts) > 2 else "N/A"
-            time_idx, timestamp = find_time_field(parts)
-            if not timestamp:
-                timestamp = "N/A"
-                
-            pair = forex_tables[tbl]
-            print(f"[FOREX] {pair:8} -> {price:>10} @ {timestamp}")
+    for update in decoder.decode(msg):
+        if update.table in FOREX_TABLES:
+            _apply_forex(update)
+    _end_frame()
 
 def process_option_prices(msg: str):
     """
-    Process binary option price updates.
+    Process binary option price updates into the order book store.
     """
-    for match in CALL_RE.finditer(msg):
-        call_type, argstr = match.groups()
-        parts = parse_csv_args(argstr)
-        
-        if len(parts) < 3:
-            continue
-            
-        try:
-            tbl = int(parts[0])
-        except (ValueError, TypeError):
-            continue
-            
-        epic = table_to_epic.get(tbl)
-        if not epic:
-            continue  # Not one of our tracked option tables
-            
-        # Extract key information
-        item = parts[1] if len(parts) > 1 else "1"
-        price = parts[2] if len(parts) > 2 else "N/A"
-        
-        # For z() calls, bid/ask are typically in positions 2,3
-        # For d() calls, structure can vary
-        if call_type == "z":
-            # Initial price setting: z(tbl, item, bid, ask, size1, size2, time, ...)
-            bid = parts[2] if len(parts) > 2 else "N/A"
-            ask = parts[3] if len(parts) > 3 else "N/A" 
-            time_idx, timestamp = find_time_field(parts, 4)
-            tag = "INIT"
-        else:  # 'd' call
-            # Price update: d(tbl, item, price, [other_fields...], time, [more_fields...])
-            bid = parts[2] if len(parts) > 2 else "N/A"
-            ask = parts[3] if len(parts) > 3 else "N/A"
-            time_idx, timestamp = find_time_field(parts)
-            tag = "UPDATE"
-            
-        if not timestamp:
-            timestamp = "N/A"
-            
-        # Clean up epic name for display
-        epic_short = epic.replace("NB.I.", "").replace(".IP", "")
-        
-        print(f"[{tag:6}] {epic_short:35} bid={bid:>6} ask={ask:>6} @ {timestamp}")
+    for update in decoder.decode(msg):
+        if update.table in table_to_epic:
+            _apply_option(update)
+    _end_frame()
 
 def process_message(msg: str):
     """
     Main message processor that handles both forex and option updates.
+    The frame is decoded once; returns the list of decoded updates.
     """
-    # Process forex underlying prices first
-    process_forex_prices(msg)
-    
-    # Then process option prices
-    process_option_prices(msg)
+    updates = decoder.decode(msg)
+    for update in updates:
+        table_state.apply(update)
+        if update.table in FOREX_TABLES:
+            _apply_forex(update)
+        elif update.table in table_to_epic:
+            _apply_option(update)
+    if updates:
+        _end_frame()
+    return updates
+
+def remove_table_mapping(table_id):
+    """Forget a single unsubscribed table."""
+    global mapping_version
+    if table_to_epic.pop(table_id, None) is None:
+        return
+    decoder.unregister(table_id)
+    table_state.discard(table_id)
+    ingest_stats.retire(table_id, table_underlying.pop(table_id, ""))
+    book = order_books.get_by_table(table_id)
+    order_books.unregister(table_id)
+    if book is not None and order_books.get(book.epic) is None:
+        tick_history.discard(book.epic)
+    ladders.invalidate()
+    mapping_version += 1
 
 def clear_table_mapping():
     """Clear the global table_to_epic mapping."""
-    global table_to_epic
-    table_to_epic.clear()
\ No newline at end of file
+    global table_to_epic, mapping_version
+    for table_id in table_to_epic:
+        decoder.unregister(table_id)
+        table_state.discard(table_id)
+        ingest_stats.retire(table_id, table_underlying.pop(table_id, ""))
+    table_to_epic.clear()
+    mapping_version += 1
+    for epic in order_books.books:
+        tick_history.discard(epic)
+    order_books.clear()
+    ladders.invalidate()
\ No newline at end of file
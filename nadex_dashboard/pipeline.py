@@ -0,0 +1,282 @@
+# ---------------------------------------------------------------
+# File        : pipeline.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Multi-process fan-out. This process reads from Nadex and decodes frames;
+FANOUT_PROCESSES worker processes serve the frontend port (shared with
+SO_REUSEPORT) and do the per-client work.
+
+The ingest side writes one marshal-encoded record per event into a shared
+memory ring (ringbuffer.py):
+    ("map", epic, table, kind, underlying)          strike/order book table added
+    ("unmap", table)                                table removed
+    ("raw", table, kind, fields, name)              RAW-mode table added
+    ("upd", received, [(kind, table, values)], msg) decoded updates of one frame, and the frame
+    ("frame", msg)                                  frame with nothing decoded
+    ("status", data)                                status broadcast
+    ("catalog", worker, events, state)              resync answer for one worker
+
+Each worker mirrors the table mapping and merged state and relays through
+frontend.py as in single-process mode. The ring never blocks ingest: a worker
+that falls a full ring behind, or reads a record it cannot decode, skips
+ahead and asks for a catalog, i.e. the current mappings and merged state,
+and sends every client a fresh snapshot. An idle worker sleeps on a pipe
+that the writer signals after the next record. Workers that exit are
+restarted and resync the same way.
+"""
+
+import asyncio
+import contextlib
+import marshal
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+import websockets
+
+from . import log, parsing
+from .config import Config
+from .decoder import Update
+from .frontend import (frontend_handler, relay_to_frontend, relay_updates, broadcast_to_frontend,
+                       frontend_clients, send_snapshot, close_all_frontend_connections)
+from .ingest import LocalIngest
+from .metrics import ingest_stats, ring_resyncs, start_metrics_server, loop_lag
+from .ringbuffer import RingWriter, RingReader, Overrun
+
+# Longest an idle worker sleeps before checking for shutdown and new records
+WAIT_TIMEOUT = 0.1
+
+class RingIngest(LocalIngest):
+    """Decode in this process and publish the results to the ring."""
+
+    def __init__(self, ring):
+        self.ring = ring
+
+    def _write(self, record):
+        try:
+            self.ring.write(marshal.dumps(record))
+        except ValueError as e:
+            print(f"[ERROR] Dropped {record[0]} record: {e}")
+
+    def map_table(self, epic, table_id, kind, underlying):
+        super().map_table(epic, table_id, kind, underlying)
+        self._write(("map", epic, table_id, kind, underlying))
+
+    def unmap_table(self, table_id):
+        super().unmap_table(table_id)
+        self._write(("unmap", table_id))
+
+    def register_raw(self, table_id, kind, fields, name):
+        super().register_raw(table_id, kind, fields, name)
+        self._write(("raw", table_id, kind, list(fields), name))
+
+    async def frame(self, msg, want_snapshots=False):
+        received = time.perf_counter()
+        if self.recorder:
+            self.recorder.frame(msg)
+        updates = parsing.process_message(msg)
+        ingest_stats.frame(received, updates)
+        if not updates:
+            self._write(("frame", msg))
+            return ()
+        # perf_counter() is system-wide on Linux, so workers can measure from it
+        self._write(("upd", received, [(u.kind, u.table, u.values) for u in updates], msg))
+        if want_snapshots:
+            return [update.table for update in updates if update.kind == "z"]
+        return ()
+
+    async def status(self, data):
+        self._write(("status", data))
+
+    def write_catalog(self, worker):
+        """Publish the current mappings and merged state for one worker."""
+        events = []
+        for table_id, schema in parsing.decoder.schemas.items():
+            if table_id in parsing.table_to_epic:
+                events.append(("map", schema.name, table_id, schema.kind, parsing.table_underlying.get(table_id)))
+            elif schema.mode == "RAW":
+                events.append(("raw", table_id, schema.kind, list(schema.fields), schema.name))
+        state = [(table_id, values) for table_id, (_, values) in parsing.table_state.tables.items()]
+        self._write(("catalog", worker, events, state))
+
+class Pipeline:
+    """The shared ring, the fan-out worker processes and their resync requests."""
+
+    def __init__(self, workers=None):
+        self.count = workers or Config.FANOUT_PROCESSES
+        self.ring = RingWriter(Config.RING_BUFFER_SIZE, waiters=self.count)
+        self.ingest = RingIngest(self.ring)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.requests = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        # Wakeup pipe per worker: the ring writes to one end, the worker sleeps on the other
+        self.wakeups = [self.ctx.Pipe(duplex=False) for _ in range(self.count)]
+        for index, (_, send_end) in enumerate(self.wakeups):
+            self.ring.set_wakeup(index, send_end.fileno())
+        self.workers = [self._spawn(index) for index in range(self.count)]
+        self.restarts = 0
+
+    def _spawn(self, index):
+        return self.ctx.Process(
+            target=_worker_main,
+            args=(index, self.ring.name, self.wakeups[index][0], self.requests, self.stop_event),
+            name=f"nadex-fanout-{index}",
+            daemon=True,
+        )
+
+    def start(self):
+        for proc in self.workers:
+            proc.start()
+        print(f"[+] Fan-out: {self.count} worker processes on ws://0.0.0.0:{Config.FRONTEND_PORT}"
+              f" ({self.ring.capacity >> 20} MiB ring)")
+
+    def restart_dead(self):
+        """Start a new process for every worker that exited."""
+        if self.stop_event.is_set():
+            return
+        for index, proc in enumerate(self.workers):
+            if proc.is_alive():
+                continue
+            print(f"[-] Fan-out worker {index} exited (code {proc.exitcode}); restarting")
+            proc.close()
+            # The new worker asks for a catalog on start, like the first one
+            self.workers[index] = self._spawn(index)
+            self.workers[index].start()
+            self.restarts += 1
+
+    async def serve_catalogs(self):
+        """Answer resync requests from workers and restart dead ones until cancelled."""
+        while True:
+            try:
+                while True:
+                    self.ingest.write_catalog(self.requests.get_nowait())
+            except queue.Empty:
+                pass
+            self.restart_dead()
+            await asyncio.sleep(0.5)
+
+    async def stop(self):
+        self.stop_event.set()
+        loop = asyncio.get_running_loop()
+        for proc in self.workers:
+            await loop.run_in_executor(None, proc.join, 5)
+            if proc.is_alive():
+                proc.terminate()
+        self.ring.close()
+        for receive_end, send_end in self.wakeups:
+            receive_end.close()
+            send_end.close()
+
+def _worker_main(index, ring_name, wakeup, requests, stop):
+    """Entry point of a fan-out worker process."""
+    # The parent handles Ctrl+C and sets stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    log.setup()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_worker(index, ring_name, wakeup, requests, stop))
+
+async def _wait(ring, fd, timeout):
+    """Sleep until the writer signals fd, at most timeout seconds."""
+    if not ring.sleep():
+        return
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await asyncio.wait_for(ready, timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        loop.remove_reader(fd)
+        ring.woke()
+    with contextlib.suppress(BlockingIOError):
+        os.read(fd, 4096)
+
+def _resync(index, ring, requests, reason):
+    """Skip everything unread and ask the parent for a catalog."""
+    ring_resyncs[reason] += 1
+    ring.skip_to_end()
+    requests.put(index)
+
+async def _worker(index, ring_name, wakeup, requests, stop):
+    ring = RingReader(ring_name, slot=index)
+    fd = wakeup.fileno()
+    os.set_blocking(fd, False)
+    server = await websockets.serve(frontend_handler, "0.0.0.0", Config.FRONTEND_PORT, reuse_port=True)
+    # Client queues and send latency of this worker, next to the main process's port
+    metrics_server = await start_metrics_server(Config.METRICS_PORT and Config.METRICS_PORT + 1 + index)
+    loop_lag.start()
+    # Whatever was mapped before this worker attached comes with a catalog
+    requests.put(index)
+    try:
+        while not stop.is_set():
+            try:
+                records = ring.read()
+            except Overrun:
+                print(f"[-] Fan-out worker {index} fell behind the ring; resyncing")
+                _resync(index, ring, requests, "overrun")
+                continue
+            if not records:
+                await _wait(ring, fd, WAIT_TIMEOUT)
+                continue
+            for record in records:
+                try:
+                    event = marshal.loads(record)
+                except (ValueError, EOFError, TypeError) as e:
+                    print(f"[ERROR] Fan-out worker {index} read a bad ring record ({e}); resyncing")
+                    _resync(index, ring, requests, "decode")
+                    break
+                await _apply(index, event)
+    finally:
+        await close_all_frontend_connections()
+        server.close()
+        await server.wait_closed()
+        if metrics_server:
+            metrics_server.close()
+        ring.close()
+
+async def _apply(index, record):
+    """Mirror one ring record into this worker's state and relay it."""
+    op = record[0]
+    if op == "upd":
+        schemas = parsing.decoder.schemas
+        updates = []
+        for kind, table, values in record[2]:
+            schema = schemas.get(table)
+            if schema is None:
+                continue
+            update = Update(kind, table, values, schema)
+            update.received = record[1]
+            parsing.table_state.apply(update)
+            updates.append(update)
+        await relay_to_frontend(record[3], decoded=True)
+        relay_updates(updates)
+    elif op == "frame":
+        await relay_to_frontend(record[1])
+    elif op == "map":
+        parsing.update_table_mapping(*record[1:], verbose=False)
+    elif op == "unmap":
+        parsing.remove_table_mapping(record[1])
+    elif op == "raw":
+        parsing.register_raw_table(*record[1:])
+    elif op == "status":
+        await broadcast_to_frontend(record[1])
+    elif op == "catalog" and record[1] == index:
+        _, _, events, state = record
+        parsing.clear_table_mapping()
+        for event in events:
+            await _apply(index, event)
+        for table, values in state:
+            schema = parsing.decoder.schemas.get(table)
+            if schema is not None:
+                parsing.table_state.apply(Update("z", table, values, schema))
+        await broadcast_to_frontend({"type": "status", "status": "resync"})
+        for session in list(frontend_clients.values()):
+            send_snapshot(session)
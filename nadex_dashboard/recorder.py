@@ -0,0 +1,263 @@
+# ---------------------------------------------------------------
+# File        : recorder.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Append-only tick recorder. Every received Nadex frame is stored with its
+receive time in segment files under RECORD_DIR, named ticks-<first ns>.seg.
+
+Segment layout (little-endian):
+    header  : magic b"NXTK", u16 version, u16 reserved, u64 created (ns)
+    record* : u32 payload length, u8 type, u64 time (ns), payload
+
+    type 1  TABLE  JSON {"table", "kind", "name", "fields", "mode"}
+    type 2  FRAME  the frame text as UTF-8
+
+A segment is a preallocated, memory-mapped file of RECORD_SEGMENT_SIZE bytes,
+so appending is a copy into the page cache. The length of a record is written
+last; a zero length marks the end of a segment that was not closed cleanly.
+Segments rotate when full and at every RECORD_SEGMENT_SECONDS boundary, and
+each one starts with the TABLE records of every table known at that time,
+so segments can be read on their own.
+
+When a segment is closed it is truncated to its used length and a background
+thread writes ticks-<first ns>.idx: per epic/pair name, the [time, offset,
+table id] of every frame that carries an update of it. TickReader uses these
+(or scans a segment without one) to answer queries by name and time range.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from .decoder import FrameDecoder
+
+MAGIC = b"NXTK"
+VERSION = 1
+TABLE = 1
+FRAME = 2
+
+_HEADER = struct.Struct("<4sHHQ")
+_RECORD = struct.Struct("<IBQ")
+_LEN = struct.Struct("<I")
+
+# Table ids updated in a frame
+_TABLES_RE = re.compile(r"[zd]\((\d+),")
+
+class TickRecorder:
+    """Appends frames to rotating memory-mapped segments."""
+
+    def __init__(self, directory, segment_size, segment_seconds, schemas=()):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.segment_seconds = segment_seconds
+        self.tables = {}  # table_id -> TABLE payload, replayed into each segment
+        self.file = self.mm = None
+        self.indexers = []
+        for schema in schemas:
+            self.define(schema)
+        os.makedirs(directory, exist_ok=True)
+
+    def define(self, schema):
+        """Record the schema of a (re)subscribed table."""
+        payload = json.dumps({
+            "table": schema.table_id, "kind": schema.kind, "name": schema.name,
+            "fields": list(schema.fields), "mode": schema.mode,
+        }).encode("utf-8")
+        self.tables[schema.table_id] = payload
+        if self.mm is not None:
+            self._append(TABLE, time.time_ns(), payload)
+
+    def frame(self, msg, ts=None):
+        """Record a received frame (ts defaults to now, in ns)."""
+        ts = ts or time.time_ns()
+        if self.mm is None or ts >= self.rotate_at:
+            self._rotate(ts)
+        self._append(FRAME, ts, msg.encode("utf-8"))
+
+    def _append(self, kind, ts, payload):
+        end = self.pos + _RECORD.size + len(payload)
+        if end > self.segment_size:
+            if self.pos == _HEADER.size + self.definitions:
+                print(f"[ERROR] Tick recorder dropped a {len(payload)} byte record larger than a segment")
+                return
+            self._rotate(ts)
+            end = self.pos + _RECORD.size + len(payload)
+        mm = self.mm
+        _RECORD.pack_into(mm, self.pos, 0, kind, ts)
+        mm[self.pos + _RECORD.size:end] = payload
+        _LEN.pack_into(mm, self.pos, len(payload))
+        self.pos = end
+
+    def _rotate(self, ts):
+        self._close_segment()
+        path = os.path.join(self.directory, f"ticks-{ts}.seg")
+        self.file = open(path, "w+b")
+        self.file.truncate(self.segment_size)
+        self.mm = mmap.mmap(self.file.fileno(), self.segment_size)
+        _HEADER.pack_into(self.mm, 0, MAGIC, VERSION, 0, ts)
+        self.pos = _HEADER.size
+        self.definitions = 0
+        period = self.segment_seconds * 10**9
+        self.rotate_at = (ts // period + 1) * period if period else float("inf")
+        for payload in self.tables.values():
+            self._append(TABLE, ts, payload)
+        self.definitions = self.pos - _HEADER.size
+
+    def _close_segment(self):
+        if self.mm is None:
+            return
+        path = self.file.name
+        self.mm.close()
+        self.file.truncate(self.pos)
+        self.file.close()
+        self.file = self.mm = None
+        indexer = threading.Thread(target=write_index, args=(path,), name="nadex-tick-index", daemon=True)
+        indexer.start()
+        self.indexers = [t for t in self.indexers if t.is_alive()] + [indexer]
+
+    def close(self):
+        """Close the current segment and wait for its index."""
+        self._close_segment()
+        for indexer in self.indexers:
+            indexer.join()
+
+def iter_records(path):
+    """Yield (offset, type, time ns, payload) for each record of a segment."""
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, version, _, _ = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a tick segment")
+        pos = _HEADER.size
+        while pos + _RECORD.size <= len(data):
+            length, kind, ts = _RECORD.unpack_from(data, pos)
+            if length == 0:
+                break
+            start = pos + _RECORD.size
+            yield pos, kind, ts, data[start:start + length]
+            pos = start + length
+    finally:
+        data.close()
+
+def build_index(path):
+    """Scan a segment into its index dict."""
+    names = {}      # table_id -> name, as of the current record
+    tables = {}     # name -> {"kind", "fields", "mode"}
+    entries = {}    # name -> [[ts, offset, table_id], ...]
+    first = last = None
+    for offset, kind, ts, payload in iter_records(path):
+        if kind == TABLE:
+            spec = json.loads(payload)
+            name = spec["name"] or str(spec["table"])
+            names[spec["table"]] = name
+            tables[name] = {"kind": spec["kind"], "fields": spec["fields"], "mode": spec["mode"]}
+            continue
+        if kind != FRAME:
+            continue
+        first = ts if first is None else first
+        last = ts
+        for table_id in set(_TABLES_RE.findall(payload.decode("utf-8", "replace"))):
+            name = names.get(int(table_id))
+            if name is not None:
+                entries.setdefault(name, []).append([ts, offset, int(table_id)])
+    return {"first_ts": first, "last_ts": last, "tables": tables, "entries": entries}
+
+def write_index(path):
+    """Write the .idx sidecar of a closed segment."""
+    try:
+        index = build_index(path)
+        tmp = path[:-4] + ".idx.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, path[:-4] + ".idx")
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Failed to index {path}: {e}")
+
+class TickReader:
+    """Indexed queries over the segments in a recording directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = sorted(
+            (int(name[6:-4]), os.path.join(directory, name))
+            for name in os.listdir(directory)
+            if name.startswith("ticks-") and name.endswith(".seg")
+        )
+        self._indexes = {}
+
+    def index(self, path):
+        """The index of a segment, from its sidecar or by scanning it."""
+        index = self._indexes.get(path)
+        if index is None:
+            try:
+                with open(path[:-4] + ".idx", "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                # Still being written, or the recorder did not shut down cleanly
+                return build_index(path)
+            self._indexes[path] = index
+        return index
+
+    def _candidates(self, start, end):
+        """Segments that may hold records in [start, end] (ns, None = open)."""
+        for i, (first, path) in enumerate(self.segments):
+            nxt = self.segments[i + 1][0] if i + 1 < len(self.segments) else None
+            if end is not None and first > end:
+                break
+            if start is not None and nxt is not None and nxt <= start:
+                continue
+            yield path
+
+    def names(self):
+        """Every epic/pair name with recorded updates."""
+        found = set()
+        for _, path in self.segments:
+            found.update(self.index(path)["entries"])
+        return sorted(found)
+
+    def frames(self, start=None, end=None):
+        """Yield (time ns, frame text) in recorded order."""
+        for path in self._candidates(start, end):
+            for _, kind, ts, payload in iter_records(path):
+                if kind != FRAME or (start is not None and ts < start):
+                    continue
+                if end is not None and ts > end:
+                    return
+                yield ts, payload.decode("utf-8")
+
+    def updates(self, name, start=None, end=None):
+        """Yield (time ns, Update) for one epic or pair between start and end (ns)."""
+        decoder = FrameDecoder()
+        for path in self._candidates(start, end):
+            index = self.index(path)
+            entries = index["entries"].get(name)
+            if not entries:
+                continue
+            spec = index["tables"][name]
+            lo = 0 if start is None else bisect.bisect_left(entries, [start])
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for ts, offset, table_id in entries[lo:]:
+                        if end is not None and ts > end:
+                            return
+                        length = _LEN.unpack_from(mm, offset)[0]
+                        frame = mm[offset + _RECORD.size:offset + _RECORD.size + length].decode("utf-8")
+                        decoder.register(table_id, spec["kind"], spec["fields"], name, spec["mode"])
+                        for update in decoder.decode(frame):
+                            if update.table == table_id:
+                                yield ts, update
+                        decoder.unregister(table_id)
+                finally:
+                    mm.close()
@@ -0,0 +1,83 @@
+# ---------------------------------------------------------------
+# File        : replay.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Replay recorded Nadex frames through the live ingest path (parsing, order
+books and frontend relay) without credentials or network access.
+
+Sources:
+    a recorder directory  ticks-*.seg segments written by recorder.py
+    a .jsonl corpus       the benchmark corpus format (benchmarks/corpus)
+
+speed is a multiple of real time; 0 replays as fast as possible.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from .orderbook import TABLE_SCHEMAS
+from .recorder import TickReader, iter_records, TABLE, FRAME
+
+def read_source(path):
+    """
+    Yield ("table", table_id, kind, name, fields, mode) and
+    ("frame", seconds, msg) events from a recording.
+    """
+    if os.path.isdir(path):
+        for _, segment in TickReader(path).segments:
+            for _, kind, ts, payload in iter_records(segment):
+                if kind == TABLE:
+                    spec = json.loads(payload)
+                    yield ("table", spec["table"], spec["kind"], spec["name"], spec["fields"], spec["mode"])
+                elif kind == FRAME:
+                    yield ("frame", ts / 1e9, payload.decode("utf-8"))
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["kind"] == "tables":
+                for table_id, epic, kind in record["tables"]:
+                    yield ("table", table_id, kind, epic, TABLE_SCHEMAS[kind], "MERGE")
+            elif record["kind"] == "frame":
+                yield ("frame", record["t"], record["data"])
+
+async def replay(path, speed, ingest):
+    """Feed a recording into ingest, paced at speed x real time."""
+    print(f"[+] Replaying {path} at {'max' if speed <= 0 else f'{speed:g}x'} speed")
+    frames = 0
+    first = None
+    started = time.perf_counter()
+    for event in read_source(path):
+        if event[0] == "table":
+            _, table_id, kind, name, fields, mode = event
+            if kind in TABLE_SCHEMAS:
+                ingest.map_table(name, table_id, kind, None)
+            elif mode == "RAW":
+                ingest.register_raw(table_id, kind, fields, name)
+            continue
+
+        _, ts, msg = event
+        if first is None:
+            first = ts
+        if speed > 0:
+            delay = started + (ts - first) / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)
+        else:
+            # Let the frontend writers run between frames
+            await asyncio.sleep(0)
+        await ingest.frame(msg)
+        frames += 1
+
+    elapsed = time.perf_counter() - started
+    rate = frames / elapsed if elapsed else 0
+    print(f"[+] Replay finished: {frames} frames in {elapsed:.2f}s ({rate:,.0f} frames/s). Ctrl+C to exit.")
@@ -0,0 +1,226 @@
+# ---------------------------------------------------------------
+# File        : ringbuffer.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Single-writer, multi-reader byte ring in multiprocessing.shared_memory.
+
+Layout:
+    header  : magic b"NXRB", u32 capacity, u64 write position (twice),
+              u64 reserved position (twice), u32 waiter slots, one wait
+              flag byte per slot
+    data    : capacity bytes of records, each u32 length + payload
+
+Positions are logical byte counts that only grow; the offset in the data
+area is position % capacity. A record never wraps: if it does not fit before
+the end, the writer leaves a pad marker (length 0xFFFFFFFF, or nothing when
+fewer than 4 bytes remain) and continues at offset 0.
+
+The writer never waits for readers. Before touching the data area it
+publishes the reserved position, the end of what it is about to write; after
+the record is in place it publishes the write position. Both are written
+twice so a reader can detect a torn read of them. A reader checks after
+copying that the reserved position is still within capacity bytes of where
+it started, so a record the writer was overwriting meanwhile is never
+returned. A reader that falls behind like this gets an Overrun and must
+resynchronize from some other source of state.
+
+Readers that run out of records can sleep instead of polling: a reader with
+a waiter slot sets its wait flag and blocks on a wakeup fd (e.g. a pipe)
+registered with the writer, and the writer signals it after the next record.
+A wakeup lost to store/load reordering between the two processes is covered
+by the reader's wait timeout.
+"""
+
+import os
+import struct
+from multiprocessing import shared_memory
+
+MAGIC = b"NXRB"
+_HEADER = struct.Struct("<4sI")
+_POS = struct.Struct("<Q")
+_LEN = struct.Struct("<I")
+_POS_A = _HEADER.size
+_POS_B = _POS_A + _POS.size
+_RES_A = _POS_B + _POS.size
+_RES_B = _RES_A + _POS.size
+_WAITERS = _RES_B + _POS.size
+_FLAGS = _WAITERS + _LEN.size
+PAD = 0xFFFFFFFF
+
+class Overrun(Exception):
+    """The writer lapped this reader; records were lost."""
+
+def _data_start(waiters):
+    return _FLAGS + waiters
+
+def _pack_pair(buf, first, value):
+    _POS.pack_into(buf, first, value)
+    _POS.pack_into(buf, first + _POS.size, value)
+
+def _unpack_pair(buf, first):
+    """A value written by _pack_pair, retrying on a torn read."""
+    while True:
+        b = _POS.unpack_from(buf, first + _POS.size)[0]
+        a = _POS.unpack_from(buf, first)[0]
+        if a == b:
+            return a
+
+class RingWriter:
+    """Creates the shared ring and appends records to it."""
+
+    def __init__(self, capacity, name=None, waiters=0):
+        self.capacity = capacity
+        self.waiters = waiters
+        self.data = _data_start(waiters)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.data + capacity)
+        self.buf = self.shm.buf
+        _HEADER.pack_into(self.buf, 0, MAGIC, capacity)
+        _LEN.pack_into(self.buf, _WAITERS, waiters)
+        self.buf[_FLAGS:self.data] = bytes(waiters)
+        self.wakeups = [None] * waiters  # slot -> fd written to wake its reader
+        self.pos = 0
+        self._publish()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def set_wakeup(self, slot, fd):
+        """Register the fd that wakes the reader of a waiter slot; made non-blocking."""
+        os.set_blocking(fd, False)
+        self.wakeups[slot] = fd
+
+    def _publish(self):
+        _pack_pair(self.buf, _RES_A, self.pos)
+        _pack_pair(self.buf, _POS_A, self.pos)
+
+    def _wake(self):
+        """Signal the readers sleeping on a wait flag."""
+        flags = self.buf[_FLAGS:self.data]
+        if not any(flags):
+            return
+        for slot, flag in enumerate(flags):
+            fd = self.wakeups[slot]
+            if flag and fd is not None:
+                self.buf[_FLAGS + slot] = 0
+                try:
+                    os.write(fd, b"\0")
+                except (BlockingIOError, BrokenPipeError):
+                    # Full: a wakeup is already pending. Broken: the reader is gone.
+                    pass
+
+    def write(self, payload):
+        """Append one record."""
+        size = _LEN.size + len(payload)
+        if size > self.capacity:
+            raise ValueError(f"Record of {len(payload)} bytes does not fit a {self.capacity} byte ring")
+        offset = self.pos % self.capacity
+        room = self.capacity - offset
+        data = self.data
+        # Everything up to the reserved position may be overwritten from here on
+        _pack_pair(self.buf, _RES_A, self.pos + (room + size if size > room else size))
+        if size > room:
+            if room >= _LEN.size:
+                _LEN.pack_into(self.buf, data + offset, PAD)
+            self.pos += room
+            offset = 0
+        _LEN.pack_into(self.buf, data + offset, len(payload))
+        start = data + offset + _LEN.size
+        self.buf[start:start + len(payload)] = payload
+        self.pos += size
+        _pack_pair(self.buf, _POS_A, self.pos)
+        if self.waiters:
+            self._wake()
+
+    def close(self):
+        """Detach and remove the shared memory."""
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+class RingReader:
+    """Attaches to a ring by name and reads records from the current write position."""
+
+    def __init__(self, name, slot=None):
+        # Readers are expected to be children of the writer's process, sharing
+        # its resource tracker, so attaching does not hand them the unlink
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.buf = self.shm.buf
+        magic, self.capacity = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{name} is not a ring buffer")
+        waiters = _LEN.unpack_from(self.buf, _WAITERS)[0]
+        if slot is not None and not 0 <= slot < waiters:
+            raise ValueError(f"Waiter slot {slot} out of range (ring has {waiters})")
+        self.data = _data_start(waiters)
+        self.flag = None if slot is None else _FLAGS + slot
+        self.pos = self.write_position()
+
+    def write_position(self):
+        """The published write position (retries on a torn read)."""
+        return _unpack_pair(self.buf, _POS_A)
+
+    def sleep(self):
+        """
+        Set this reader's wait flag before blocking on its wakeup fd. Returns
+        False, with the flag cleared, if records arrived meanwhile.
+        """
+        self.buf[self.flag] = 1
+        if self.write_position() != self.pos:
+            self.buf[self.flag] = 0
+            return False
+        return True
+
+    def woke(self):
+        """Clear the wait flag after waking (the writer clears it when it signals)."""
+        self.buf[self.flag] = 0
+
+    def skip_to_end(self):
+        """Drop everything unread, e.g. after an Overrun."""
+        self.pos = self.write_position()
+
+    def read(self, max_bytes=1 << 20):
+        """
+        Return the payloads of records written since the last read, up to
+        about max_bytes. Raises Overrun if the writer lapped this reader.
+        """
+        end = self.write_position()
+        if end - self.pos > self.capacity:
+            raise Overrun()
+        capacity = self.capacity
+        data = self.data
+        pos = self.pos
+        chunks = []
+        total = 0
+        while pos < end and total < max_bytes:
+            offset = pos % capacity
+            room = capacity - offset
+            if room < _LEN.size:
+                pos += room
+                continue
+            length = _LEN.unpack_from(self.buf, data + offset)[0]
+            if length == PAD:
+                pos += room
+                continue
+            if length > end - pos - _LEN.size:
+                # A length the writer has already overwritten
+                raise Overrun()
+            start = data + offset + _LEN.size
+            chunks.append(bytes(self.buf[start:start + length]))
+            pos += _LEN.size + length
+            total += length
+        # Anything copied is valid only if the writer has not since started
+        # to reuse it: all it may be writing lies below the reserved position
+        if _unpack_pair(self.buf, _RES_A) - self.pos > capacity:
+            raise Overrun()
+        self.pos = pos
+        return chunks
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
@@ -0,0 +1,157 @@
+# ---------------------------------------------------------------
+# File        : shards.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Sharded ingest: the strike epics are split across SHARDS Lightstreamer
+sessions, each with its own connection and table id range, and merged into
+one stream for the frontend server.
+
+By default every shard is a WebSocketManager task in this process. With
+SHARD_PROCESSES, each shard runs in a worker process that handles the
+connection, TLS, subscriptions and discovery, and forwards raw frames and
+table mapping events over a queue; this process decodes and fans out.
+"""
+
+import asyncio
+import contextlib
+import multiprocessing
+import queue
+import signal
+
+from . import helpers, log
+from .config import Config
+from .helpers import get_session_info
+from .ingest import LocalIngest, ForwardingIngest, apply_event
+from .subscriptions import Shard
+from .websocket_manager import WebSocketManager
+
+def make_shards(count=None):
+    """Shard specs with disjoint table id ranges of SHARD_TABLE_SPAN ids each."""
+    count = max(1, count or Config.SHARDS)
+    span = Config.SHARD_TABLE_SPAN
+    return [
+        Shard(
+            index, count, Config.SHARD_BY,
+            first_table=Config.INITIAL_TABLE_COUNTER + index * span,
+            last_table=Config.INITIAL_TABLE_COUNTER + (index + 1) * span - 1,
+        )
+        for index in range(count)
+    ]
+
+def _plain(mapping):
+    """A picklable copy of a {mid: {underlying: [epics]}} mapping."""
+    return {mid: {ue: list(eps) for ue, eps in ueps.items()} for mid, ueps in mapping.items()}
+
+async def _new_session():
+    loop = asyncio.get_running_loop()
+    sid, host, phase = await loop.run_in_executor(None, get_session_info)
+    return sid, phase, host
+
+async def run_shards(session, mapping, fx_ids, shutdown_event, reconcile=False, ingest=None):
+    """
+    Run all shards until shutdown. session is (sid, phase, host) of an
+    already created session, used by the primary shard. ingest defaults to
+    a LocalIngest.
+    """
+    shards = make_shards()
+    print(f"[+] Sharded ingest: {len(shards)} sessions by {Config.SHARD_BY}"
+          f"{' in worker processes' if Config.SHARD_PROCESSES else ''}")
+    if Config.SHARD_PROCESSES:
+        await _run_processes(shards, session, mapping, fx_ids, shutdown_event, reconcile, ingest)
+        return
+
+    tasks = []
+    for shard in shards:
+        sid, phase, host = session if shard.primary else await _new_session()
+        mgr = WebSocketManager(sid, phase, host, mapping, fx_ids, shutdown_event,
+                               reconcile=reconcile, shard=shard, ingest=ingest)
+        tasks.append(asyncio.create_task(mgr.run()))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _run_processes(shards, session, mapping, fx_ids, shutdown_event, reconcile, ingest=None):
+    """Start one worker process per shard and apply their events here."""
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue(maxsize=Config.SHARD_QUEUE_SIZE)
+    stop = ctx.Event()
+    workers = []
+    for shard in shards:
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(shard, session if shard.primary else None, helpers.xst_token,
+                  _plain(mapping), list(fx_ids), reconcile, events, stop),
+            name=f"nadex-shard-{shard.index}",
+            daemon=True,
+        )
+        proc.start()
+        workers.append(proc)
+
+    ingest = ingest or LocalIngest()
+    loop = asyncio.get_running_loop()
+    try:
+        while not shutdown_event.is_set():
+            try:
+                # Block a worker thread, not the loop, waiting for the next event
+                event = await loop.run_in_executor(None, events.get, True, 0.5)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in workers):
+                    print("[ERROR] All shard workers exited")
+                    return
+                continue
+            await apply_event(ingest, event)
+            # Drain whatever else is already queued without a thread hop
+            while True:
+                try:
+                    event = events.get_nowait()
+                except queue.Empty:
+                    break
+                await apply_event(ingest, event)
+    finally:
+        stop.set()
+        for proc in workers:
+            await loop.run_in_executor(None, proc.join, 5)
+            if proc.is_alive():
+                proc.terminate()
+
+def _worker_main(shard, session, xst_token, mapping, fx_ids, reconcile, events, stop):
+    """Entry point of a shard worker process."""
+    # The parent handles Ctrl+C and sets stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    helpers.xst_token = xst_token
+    log.setup()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_worker(shard, session, mapping, fx_ids, reconcile, events, stop))
+
+async def _worker(shard, session, mapping, fx_ids, reconcile, events, stop):
+    shutdown_event = asyncio.Event()
+
+    async def watch_stop():
+        while not stop.is_set():
+            await asyncio.sleep(0.5)
+        shutdown_event.set()
+
+    watcher = asyncio.create_task(watch_stop())
+    try:
+        sid, phase, host = session or await _new_session()
+        print(f"[+] {shard} worker: session={sid} host={host}")
+        mgr = WebSocketManager(sid, phase, host, mapping, fx_ids, shutdown_event,
+                               reconcile=reconcile, shard=shard,
+                               ingest=ForwardingIngest(events, shard.index))
+        nadex_task = asyncio.create_task(mgr.run())
+        await shutdown_event.wait()
+        nadex_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await nadex_task
+    except Exception as e:
+        print(f"[ERROR] {shard} worker failed: {e}")
+    finally:
+        watcher.cancel()
@@ -0,0 +1,235 @@
+# ---------------------------------------------------------------
+# File        : subscriptions.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import asyncio
+import heapq
+import time
+import zlib
+
+from .parsing import pair_key
+
+# Tables subscribed per strike epic: STRIKE (top of book) and ORDERBOOK (5 levels)
+STRIKE_TABLES = ("STRIKE", "ORDERBOOK")
+
+def flatten_mapping(mapping):
+    """{mid: {underlying: [epics]}} -> {epic: underlying}, in mapping order."""
+    epics = {}
+    for ueps in mapping.values():
+        for ue, eps in ueps.items():
+            for epic in eps:
+                epics.setdefault(epic, ue)
+    return epics
+
+class Shard:
+    """
+    One of count partitions of the strike epics, each with its own
+    Lightstreamer session and a disjoint range of table ids. Epics are
+    assigned by a stable hash of their underlying ("underlying", keeping a
+    pair's whole ladder together) or of the epic itself ("hash"). Shard 0
+    is the primary and also carries the core, forex and hierarchy tables.
+    """
+
+    def __init__(self, index=0, count=1, by="underlying", first_table=15, last_table=None):
+        self.index = index
+        self.count = count
+        self.by = by
+        self.first_table = first_table
+        self.last_table = last_table
+
+    @property
+    def primary(self):
+        return self.index == 0
+
+    def owns(self, epic, underlying):
+        if self.count <= 1:
+            return True
+        key = epic if self.by == "hash" else pair_key(underlying)
+        return zlib.crc32(key.encode()) % self.count == self.index
+
+    def select(self, mapping):
+        """The part of a {mid: {underlying: [epics]}} mapping owned by this shard."""
+        if self.count <= 1:
+            return mapping
+        selected = {}
+        for mid, ueps in mapping.items():
+            for ue, eps in ueps.items():
+                mine = [epic for epic in eps if self.owns(epic, ue)]
+                if mine:
+                    selected.setdefault(mid, {})[ue] = mine
+        return selected
+
+    def __repr__(self):
+        return f"shard {self.index + 1}/{self.count}"
+
+class SubscriptionRegistry:
+    """
+    Live Lightstreamer table subscriptions of one session.
+
+    Table ids are handed out lowest-free-first. An id released by a delete is
+    held back until the next sync() before it is reused, so late updates for
+    the deleted table cannot be mistaken for the new one. The request phase
+    counter wraps within a fixed window. Both keep the id space and every
+    per-table structure bounded by the number of live tables.
+    """
+
+    def __init__(self, first_table, first_req_phase, req_phase_window=100000, last_table=None):
+        self.first_table = first_table
+        self.last_table = last_table
+        self.first_req_phase = first_req_phase
+        self.req_phase_window = req_phase_window
+        self.strikes = {}       # epic -> {"underlying", "tables": {kind: table_id}}
+        self.tables = {}        # table_id -> (kind, name)
+        self._next_table = first_table
+        self._free = []         # heap of reusable table ids
+        self._released = []     # ids deleted since the last sync
+        self._req_phase = first_req_phase
+
+    @property
+    def high_water(self):
+        """Highest table id ever allocated."""
+        return self._next_table - 1
+
+    def allocate(self, kind, name):
+        """Take a table id for a new subscription."""
+        if self._free:
+            table_id = heapq.heappop(self._free)
+        else:
+            table_id = self._next_table
+            if self.last_table is not None and table_id > self.last_table:
+                raise RuntimeError(f"Table id range {self.first_table}-{self.last_table} exhausted")
+            self._next_table += 1
+        self.tables[table_id] = (kind, name)
+        return table_id
+
+    def release(self, table_id):
+        """Free a deleted table's id; it becomes reusable after the next sync()."""
+        if self.tables.pop(table_id, None) is not None:
+            self._released.append(table_id)
+
+    def next_req_phase(self):
+        """Next LS_req_phase value, wrapping within the configured window."""
+        phase = self._req_phase
+        self._req_phase += 1
+        if self._req_phase >= self.first_req_phase + self.req_phase_window:
+            self._req_phase = self.first_req_phase
+        return phase
+
+    def add_strike(self, epic, underlying):
+        """Record a strike epic and allocate its tables. Returns {kind: table_id}."""
+        tables = {kind: self.allocate(kind, epic) for kind in STRIKE_TABLES}
+        self.strikes[epic] = {"underlying": underlying, "tables": tables}
+        return tables
+
+    def remove_strike(self, epic):
+        """Forget a strike epic and release its tables. Returns {kind: table_id}."""
+        entry = self.strikes.pop(epic)
+        for table_id in entry["tables"].values():
+            self.release(table_id)
+        return entry["tables"]
+
+    def sync(self, mapping):
+        """
+        Diff a fresh market mapping against the live strikes.
+        Returns (added, removed): added is a list of (epic, underlying) not yet
+        subscribed, removed a list of live epics no longer listed.
+        """
+        for table_id in self._released:
+            heapq.heappush(self._free, table_id)
+        self._released = []
+
+        wanted = flatten_mapping(mapping)
+        added = [(epic, ue) for epic, ue in wanted.items() if epic not in self.strikes]
+        removed = [epic for epic in self.strikes if epic not in wanted]
+        return added, removed
+
+    def clear(self):
+        """Forget every subscription, e.g. for a new session."""
+        self.strikes.clear()
+        self.tables.clear()
+        self._next_table = self.first_table
+        self._free = []
+        self._released = []
+        self._req_phase = self.first_req_phase
+
+class SubscriptionPacer:
+    """
+    Flow control for subscription bursts. A table counts as acknowledged when
+    its first snapshot (z) arrives; new batches go out only while fewer than
+    window tables are still waiting. Tables that get no snapshot within
+    ack_timeout stop counting against the window.
+    """
+
+    def __init__(self, window, ack_timeout):
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.pending = {}  # table_id -> time sent
+        self.started = 0.0
+        self.expected = 0
+        self.acked = 0
+        self.timed_out = 0
+        self._changed = asyncio.Event()
+
+    def begin(self):
+        """Start timing a subscription burst."""
+        self.started = time.perf_counter()
+        self.expected = self.acked = self.timed_out = 0
+
+    def sent(self, table_ids):
+        """Record tables whose subscriptions were just sent."""
+        now = time.perf_counter()
+        for table_id in table_ids:
+            self.pending.pop(table_id, None)
+            self.pending[table_id] = now
+        self.expected += len(table_ids)
+
+    def acknowledge(self, table_id):
+        """A table's first snapshot arrived."""
+        if self.pending.pop(table_id, None) is not None:
+            self.acked += 1
+            self._changed.set()
+
+    def forget(self, table_id):
+        """Stop waiting for a table (e.g. it was deleted)."""
+        self.pending.pop(table_id, None)
+
+    def _expire(self):
+        """Drop tables that waited longer than ack_timeout; returns the next expiry delay."""
+        now = time.perf_counter()
+        # pending is in send order, so the stale tables are at the front
+        stale = []
+        for table_id, sent in self.pending.items():
+            if now - sent < self.ack_timeout:
+                break
+            stale.append(table_id)
+        for table_id in stale:
+            del self.pending[table_id]
+        self.timed_out += len(stale)
+        if not self.pending:
+            return self.ack_timeout
+        return self.ack_timeout - (now - next(iter(self.pending.values())))
+
+    async def _wait_until(self, limit):
+        """Wait until at most limit tables are pending."""
+        while True:
+            delay = self._expire()
+            if len(self.pending) <= limit:
+                return
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_for_window(self):
+        """Wait until another batch may be sent."""
+        await self._wait_until(self.window - 1)
+
+    async def wait_for_all(self):
+        """Wait until every sent table is acknowledged or timed out; returns elapsed seconds."""
+        await self._wait_until(0)
+        return time.perf_counter() - self.started
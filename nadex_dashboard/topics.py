@@ -0,0 +1,83 @@
+# ---------------------------------------------------------------
+# File        : topics.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+from . import parsing
+
+# Table kinds a client can subscribe to
+STRIKE_KINDS = ("STRIKE", "ORDERBOOK")
+
+class Topics:
+    """What a frontend client has subscribed to."""
+
+    def __init__(self):
+        self.underlyings = set()  # pair keys, e.g. "EURUSD"
+        self.epics = set()
+        self.forex = False
+
+    def update(self, request, subscribe=True):
+        """Apply a subscribe/unsubscribe request body."""
+        underlyings = {parsing.pair_key(u) for u in request.get("underlyings", [])}
+        epics = set(request.get("epics", []))
+        if subscribe:
+            self.underlyings |= underlyings
+            self.epics |= epics
+            if request.get("forex"):
+                self.forex = True
+        else:
+            self.underlyings -= underlyings
+            self.epics -= epics
+            if request.get("forex"):
+                self.forex = False
+
+    def matches(self, schema, underlying):
+        """Whether an update for a table with this schema/underlying is wanted."""
+        if schema.kind == "FOREX":
+            return self.forex or underlying in self.underlyings
+        if schema.kind in STRIKE_KINDS:
+            return underlying in self.underlyings or schema.name in self.epics
+        return False
+
+    def to_dict(self):
+        return {
+            "underlyings": sorted(self.underlyings),
+            "epics": sorted(self.epics),
+            "forex": self.forex,
+        }
+
+class TopicRouter:
+    """
+    Index from table id to the client sessions that should receive decoded
+    updates of it. Sessions without topics receive everything, except
+    verbatim raw sessions, which get the frames themselves. The index is built lazily
+    per table and dropped whenever subscriptions, clients or the table
+    mapping change.
+    """
+
+    def __init__(self):
+        self._audience = {}  # table_id -> tuple of sessions
+        self._mapping_version = None
+
+    def invalidate(self):
+        """Drop the index after a client or subscription change."""
+        self._audience.clear()
+
+    def audience(self, schema, sessions):
+        """Sessions subscribed to decoded updates of the table of schema."""
+        if self._mapping_version != parsing.mapping_version:
+            self._mapping_version = parsing.mapping_version
+            self._audience.clear()
+        table_id = schema.table_id
+        result = self._audience.get(table_id)
+        if result is None:
+            underlying = parsing.table_underlying.get(table_id)
+            result = tuple(
+                s for s in sessions
+                if not s.verbatim and (s.topics is None or s.topics.matches(schema, underlying))
+            )
+            self._audience[table_id] = result
+        return result
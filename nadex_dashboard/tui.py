@@ -0,0 +1,316 @@
+# ---------------------------------------------------------------
+# File        : tui.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Full-screen terminal dashboard (--tui). Instead of one line per update it
+redraws TUI_FPS times a second from the merged state: the forex underlyings
+(tables 8-14) and, per pair, a strike ladder with bid/ask/size for every
+order book level.
+
+Screen keeps the last drawn frame and writes only the cells that changed,
+so an idle ladder costs nothing and a busy one a few hundred bytes per
+frame. While the dashboard is up, stdout (fd 1, including that of worker
+processes started after it) goes to a pipe whose lines are shown in a log
+pane at the bottom, and the per-update log categories are turned off.
+
+Keys: j/k or arrows scroll, space/b page, g top, q quit.
+"""
+
+import asyncio
+import atexit
+import collections
+import os
+import re
+import shutil
+import sys
+import termios
+import threading
+import time
+import tty
+
+from . import log, parsing
+from .config import Config
+from .metrics import ingest_stats
+from .orderbook import LEVELS
+
+# Terminal control sequences
+ALT_SCREEN_ON = "\x1b[?1049h\x1b[?25l\x1b[2J"
+ALT_SCREEN_OFF = "\x1b[?25h\x1b[?1049l"
+
+# Unchanged cells shorter than a cursor move are rewritten rather than skipped
+_GAP = 8
+
+# Lines kept in the log pane and shown at the bottom of the screen
+LOG_LINES = 200
+LOG_ROWS = 5
+
+_LEVEL_WIDTH = 24
+_LABEL_WIDTH = 25
+_ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+def changed_runs(old, new, gap=_GAP):
+    """[start, end) column ranges where new differs from old (same length)."""
+    runs = []
+    for x, (a, b) in enumerate(zip(old, new)):
+        if a == b:
+            continue
+        if runs and x - runs[-1][1] < gap:
+            runs[-1][1] = x + 1
+        else:
+            runs.append([x, x + 1])
+    return runs
+
+class Screen:
+    """Diff renderer: keeps the drawn frame and writes only changed cells."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.rows = []
+        self.size = None
+        self.bytes = 0  # written by the last draw
+
+    def _write(self, text):
+        data = text.encode("utf-8", "replace")
+        while data:
+            data = data[os.write(self.fd, data):]
+        self.bytes = len(text)
+
+    def open(self):
+        self._write(ALT_SCREEN_ON)
+
+    def close(self):
+        self._write(ALT_SCREEN_OFF)
+
+    def draw(self, lines, size):
+        """Draw lines on a (columns, rows) terminal."""
+        width, height = size
+        # Leave the last column free so the bottom-right cell never scrolls
+        width -= 1
+        parts = []
+        if size != self.size:
+            self.size = size
+            self.rows = [" " * width] * height
+            parts.append("\x1b[2J")
+        for y in range(height):
+            new = lines[y] if y < len(lines) else ""
+            new = new[:width].ljust(width)
+            old = self.rows[y]
+            if new == old:
+                continue
+            for start, end in changed_runs(old, new):
+                parts.append(f"\x1b[{y + 1};{start + 1}H{new[start:end]}")
+            self.rows[y] = new
+        self._write("".join(parts))
+
+class OutputCapture:
+    """Redirects fd 1 into a pipe and keeps its last lines for the log pane."""
+
+    def __init__(self, keep=LOG_LINES):
+        self.lines = collections.deque(maxlen=keep)
+        self.terminal = None
+        self._pipe = None
+
+    def start(self):
+        """Returns a fd that still writes to the terminal."""
+        sys.stdout.flush()
+        self.terminal = os.dup(1)
+        read_end, write_end = os.pipe()
+        os.dup2(write_end, 1)
+        os.close(write_end)
+        self._pipe = read_end
+        threading.Thread(target=self._read, name="nadex-tui-output", daemon=True).start()
+        return self.terminal
+
+    def _read(self):
+        partial = b""
+        while True:
+            try:
+                chunk = os.read(self._pipe, 65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            *complete, partial = (partial + chunk).split(b"\n")
+            for line in complete:
+                text = _ANSI_RE.sub("", line.decode("utf-8", "replace")).replace("\r", "").replace("\t", " ")
+                if text.strip():
+                    self.lines.append(text)
+
+    def stop(self):
+        """Restore fd 1 to the terminal."""
+        if self.terminal is None:
+            return
+        sys.stdout.flush()
+        os.dup2(self.terminal, 1)
+        os.close(self.terminal)
+        self.terminal = None
+
+def _natural_key(text):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+def _fmt(value, width):
+    return " " * width if value != value else f"{value:>{width}g}"
+
+def _fmt_size(value):
+    return "-" if value != value else f"{value:g}"
+
+class Dashboard:
+    """Builds dashboard frames from the merged state and draws them at a fixed rate."""
+
+    def __init__(self, fps=None, on_quit=None):
+        self.fps = fps or Config.TUI_FPS
+        self.on_quit = on_quit
+        self.capture = OutputCapture()
+        self.screen = None
+        self.scroll = 0
+        self.body_rows = 0
+        self._ladders = None
+        self._ladders_version = None
+        self._tty = None
+        self._rate = (time.monotonic(), 0, 0.0)
+
+    def open(self):
+        """Take over the terminal. Call before log.setup() so logging goes to the pane."""
+        self.screen = Screen(self.capture.start())
+        self.screen.open()
+        if sys.stdin.isatty():
+            fd = sys.stdin.fileno()
+            self._tty = (fd, termios.tcgetattr(fd))
+            tty.setcbreak(fd)
+        # Also restore the terminal if startup fails before the main loop's cleanup
+        atexit.register(self.close)
+
+    def close(self):
+        """Give the terminal back and print the tail of the log pane."""
+        if self.screen is None:
+            return
+        if self._tty:
+            fd, attrs = self._tty
+            termios.tcsetattr(fd, termios.TCSADRAIN, attrs)
+            self._tty = None
+        self.screen.close()
+        self.screen = None
+        self.capture.stop()
+        for line in list(self.capture.lines)[-LOG_ROWS * 2:]:
+            print(line)
+
+    async def run(self):
+        """Redraw at the configured rate until cancelled."""
+        # The ladder replaces the per-update lines
+        for category in log.CATEGORIES.values():
+            category.enabled = False
+        loop = asyncio.get_running_loop()
+        if self._tty:
+            loop.add_reader(self._tty[0], self._on_key)
+        interval = 1.0 / self.fps
+        deadline = loop.time()
+        try:
+            while True:
+                size = self.terminal_size()
+                self.screen.draw(self.frame(*size), size)
+                deadline += interval
+                delay = deadline - loop.time()
+                if delay < 0:
+                    # Fell behind; keep the rate instead of catching up
+                    deadline = loop.time()
+                    delay = 0
+                await asyncio.sleep(delay)
+        finally:
+            if self._tty:
+                loop.remove_reader(self._tty[0])
+
+    def terminal_size(self):
+        """(columns, rows) of the terminal; fd 1 is the capture pipe by now."""
+        try:
+            return tuple(os.get_terminal_size(self.screen.fd))
+        except OSError:
+            return tuple(shutil.get_terminal_size())
+
+    def _on_key(self):
+        keys = os.read(self._tty[0], 32).decode("utf-8", "replace")
+        page = max(1, self.body_rows - 1)
+        for key in re.findall(r"\x1b\[[AB56]~?|.", keys):
+            if key in ("j", "\x1b[B"):
+                self.scroll += 1
+            elif key in ("k", "\x1b[A"):
+                self.scroll -= 1
+            elif key in (" ", "\x1b[6~"):
+                self.scroll += page
+            elif key in ("b", "\x1b[5~"):
+                self.scroll -= page
+            elif key == "g":
+                self.scroll = 0
+            elif key == "q" and self.on_quit:
+                self.on_quit()
+        self.scroll = max(0, self.scroll)
+
+    def ladders(self):
+        """{pair: [(label, book), ...]} sorted by epic; rebuilt when the mapping changes."""
+        if self._ladders_version != parsing.mapping_version:
+            ladders = {key: {} for key in parsing.table_underlying.values()}
+            for table_id, (book, _) in parsing.order_books.tables.items():
+                pair = parsing.table_underlying.get(table_id)
+                if pair is not None:
+                    ladders.setdefault(pair, {})[book.epic] = book
+            self._ladders = {
+                pair: [(epic.replace("NB.I.", "").replace(".IP", ""), books[epic])
+                       for epic in sorted(books, key=_natural_key)]
+                for pair, books in ladders.items() if books
+            }
+            self._ladders_version = parsing.mapping_version
+        return self._ladders
+
+    def _header(self):
+        now = time.monotonic()
+        last, frames, rate = self._rate
+        if now - last >= 1.0:
+            rate = (ingest_stats.frames - frames) / (now - last)
+            self._rate = (now, ingest_stats.frames, rate)
+        books = len(parsing.order_books.books)
+        return (f" NADEX  {time.strftime('%H:%M:%S')}  books={books}  tables={len(parsing.table_to_epic)}"
+                f"  frames/s={rate:,.0f}  draw={self.screen.bytes}B   [j/k scroll, q quit]")
+
+    def _forex(self, width):
+        """Forex underlyings, as many per line as fit."""
+        cells = []
+        for table_id, pair in parsing.FOREX_TABLES.items():
+            price, stamp = parsing.forex_prices[table_id]
+            cells.append(f"{pair:8}{price or '-':>11} {stamp or '':8}")
+        per_line = max(1, width // 32)
+        return ["  ".join(cells[i:i + per_line]) for i in range(0, len(cells), per_line)]
+
+    def _ladder(self, levels):
+        lines = []
+        underlyings = {parsing.table_underlying[t]: (name, parsing.forex_prices[t][0])
+                       for t, name in parsing.FOREX_TABLES.items()}
+        columns = "".join(f"{'bid' + str(n):>6} {'ask' + str(n):>6} {'size':>9} " for n in range(1, levels + 1))
+        for pair, rows in self.ladders().items():
+            name, spot = underlyings.get(pair, (pair, None))
+            lines.append(f"── {name}  spot {spot or '-'}  {len(rows)} strikes ".ljust(80, "─"))
+            lines.append(f"{'strike':{_LABEL_WIDTH}}{columns}updated")
+            for label, book in rows:
+                cells = "".join(
+                    f"{_fmt(book.bids[i], 6)} {_fmt(book.asks[i], 6)} "
+                    f"{_fmt_size(book.bid_sizes[i]) + '/' + _fmt_size(book.ask_sizes[i]):>9} "
+                    for i in range(levels)
+                )
+                lines.append(f"{label[:_LABEL_WIDTH - 1]:{_LABEL_WIDTH}}{cells}{book.update_time or ''}")
+        return lines
+
+    def frame(self, width, height):
+        """The lines of one frame for a width x height terminal."""
+        levels = max(1, min(LEVELS, (width - _LABEL_WIDTH - 9) // _LEVEL_WIDTH))
+        top = [self._header(), *self._forex(width), ""]
+        logs = list(self.capture.lines)[-LOG_ROWS:]
+        bottom = ["─" * width, *logs]
+        self.body_rows = max(0, height - len(top) - LOG_ROWS - 1)
+        body = self._ladder(levels)
+        self.scroll = min(self.scroll, max(0, len(body) - self.body_rows))
+        body = body[self.scroll:self.scroll + self.body_rows]
+        body += [""] * (self.body_rows - len(body))
+        return top + body + bottom
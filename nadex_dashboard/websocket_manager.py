@@ -8,35 +8,71 @@
 
 import asyncio
 import datetime
+import random
 import time
 import websockets
 from collections import defaultdict
 
 from .config import Config
-from nadex_dashboard.messages import WebSocketMessages, MessageTable
-from .parsing import update_table_mapping, clear_table_mapping, process_message
-from .frontend import relay_to_frontend
-from .helpers import fetch_market_tree, extract_forex_ids, map_market_data
+from nadex_dashboard.messages import WebSocketMessages, MessageTable, HIERARCHY_SCHEMA, batch_control
+from .helpers import discover_markets_async, get_session_info
+from .ingest import LocalIngest
+from .log import ping_log
+from .metrics import loop_lag, managers
+from .subscriptions import Shard, SubscriptionRegistry, SubscriptionPacer, flatten_mapping
+
+def next_rollover(now, minutes=5):
+    """The next 5-minute boundary strictly after now."""
+    base = now.replace(second=0, microsecond=0) - datetime.timedelta(minutes=now.minute % minutes)
+    return base + datetime.timedelta(minutes=minutes)
 
 class WebSocketManager:
     """Manages WebSocket connections and subscriptions to Nadex."""
     
-    def __init__(self, session_id, phase, host, market_mapping, forex_ids, shutdown_event):
+    def __init__(self, session_id, phase, host, market_mapping, forex_ids, shutdown_event,
+                 reconcile=False, shard=None, ingest=None):
         self.session = session_id
         self.phase = phase + 2
         self.host = host
         self.mapping = market_mapping
         self.fx_ids = forex_ids
         self.shutdown_event = shutdown_event
+        # Mapping came from the warm-start cache; check it against live data
+        self.reconcile = reconcile
+        # Which strikes this connection carries, and where its frames go
+        self.shard = shard or Shard(first_table=Config.INITIAL_TABLE_COUNTER)
+        self.ingest = ingest or LocalIngest()
 
-        self.table_counter = Config.INITIAL_TABLE_COUNTER
-        self.req_phase_counter = Config.INITIAL_REQ_PHASE_COUNTER
+        # Table ids and request phases for strike and hierarchy subscriptions
+        self.subscriptions = SubscriptionRegistry(
+            self.shard.first_table, Config.INITIAL_REQ_PHASE_COUNTER, last_table=self.shard.last_table
+        )
         self.win_phase = Config.WIN_PHASE
+        self.batch_size = max(1, Config.CONTROL_BATCH_SIZE)
+        self.pacer = SubscriptionPacer(Config.SUBSCRIBE_WINDOW, Config.SUBSCRIBE_ACK_TIMEOUT)
 
         self.last_ping = time.time()
         self.ping_interval = Config.PING_INTERVAL
 
         self.message_table = MessageTable()
+        self.connected_since = None  # monotonic time of the first frame on this connection
+        self.reconnects = 0
+        managers.add(self)
+
+    async def send_batched(self, ws, requests, paced=False):
+        """
+        Send (table_ids, control message) pairs, batch_size requests per frame.
+        With paced, each batch waits for room in the snapshot window.
+        """
+        for i in range(0, len(requests), self.batch_size):
+            if self.shutdown_event.is_set():
+                return
+            batch = requests[i:i + self.batch_size]
+            if paced:
+                await self.pacer.wait_for_window()
+            await ws.send(batch_control([m for _, m in batch]))
+            if paced:
+                self.pacer.sent([t for tables, _ in batch for t in tables])
 
     async def send_initial_subscriptions(self, ws):
         """Send initial subscription messages."""
@@ -48,73 +84,142 @@ class WebSocketManager:
         await ws.send(msg)
         self.message_table.add_message("BIND", 1, "Session bind")
         await asyncio.sleep(0.1)
+        if not self.shard.primary:
+            print(f"[+] Done init ({self.shard}: bind only)")
+            return
 
+        requests = []
         # core (2–7)
         core = WebSocketMessages.get_core_subscriptions(self.session, Config.NADEX_USER_ID)
         for i, m in enumerate(core, start=2):
-            await ws.send(m)
+            requests.append(((i,), m))
             self.message_table.add_message("CORE", i, f"Core idx {i}")
-            await asyncio.sleep(0.1)
 
         # binary FX (8–14)
         bins = WebSocketMessages.get_binary_fx_subscriptions(self.session)
         for idx, m in enumerate(bins, start=8):
-            await ws.send(m)
+            requests.append(((idx,), m))
             self.message_table.add_message("BINARY", idx, f"Bin idx {idx}")
-            await asyncio.sleep(0.1)
 
+        await self.send_batched(ws, requests)
         print(f"[+] Done init (1–14)")
 
-    async def send_strike_subscriptions(self, ws):
-        """Send strike subscription messages."""
-        print(f"[+] Starting strike subs at table {self.table_counter}")
-        count = 0
-        for mid, ueps in self.mapping.items():
-            for ue, eps in ueps.items():
-                for epic in eps:
-                    if self.shutdown_event.is_set():
-                        return
-                    
-                    update_table_mapping(epic, self.table_counter, "STRIKE")
-                    
-                    enc = epic.replace(".", "%2E").replace("-", "%2D")
-                    m1 = WebSocketMessages.get_strike_message_type1(
-                        self.session, enc, self.table_counter, self.req_phase_counter, self.win_phase
-                    )
-                    await ws.send(m1)
-                    self.message_table.add_message("STRIKE1", self.table_counter, epic)
-                    self.table_counter += 1
-                    self.req_phase_counter += 1
-                    await asyncio.sleep(0.05)
-                    
-                    update_table_mapping(epic, self.table_counter, "ORDERBOOK")
-                    m2 = WebSocketMessages.get_strike_message_type2(
-                        self.session, enc, self.table_counter, self.req_phase_counter, self.win_phase
-                    )
-                    await ws.send(m2)
-                    self.message_table.add_message("STRIKE2", self.table_counter, epic)
-                    self.table_counter += 1
-                    self.req_phase_counter += 1
-                    await asyncio.sleep(0.05)
-                    count += 1
-        print(f"[+] Sent {count} strike subs")
+    async def send_strike_subscriptions(self, ws, epics=None):
+        """
+        Send strike subscription messages for (epic, underlying) pairs, default
+        all mapped, and report the time until every new table has its snapshot.
+        """
+        if epics is None:
+            epics = list(flatten_mapping(self.shard.select(self.mapping)).items())
+        if not epics:
+            return
+        print(f"[+] Starting strike subs ({len(epics)} epics)")
+        self.pacer.begin()
+        requests = []
+        for epic, ue in epics:
+            tables = self.subscriptions.add_strike(epic, ue)
+            enc = epic.replace(".", "%2E").replace("-", "%2D")
+
+            table = tables["STRIKE"]
+            self.ingest.map_table(epic, table, "STRIKE", ue)
+            requests.append(((table,), WebSocketMessages.get_strike_message_type1(
+                self.session, enc, table, self.subscriptions.next_req_phase(), self.win_phase
+            )))
+            self.message_table.add_message("STRIKE1", table, epic)
+
+            table = tables["ORDERBOOK"]
+            self.ingest.map_table(epic, table, "ORDERBOOK", ue)
+            requests.append(((table,), WebSocketMessages.get_strike_message_type2(
+                self.session, enc, table, self.subscriptions.next_req_phase(), self.win_phase
+            )))
+            self.message_table.add_message("STRIKE2", table, epic)
+
+        await self.send_batched(ws, requests, paced=True)
+        print(f"[+] Sent {len(epics)} strike subs")
+        elapsed = await self.pacer.wait_for_all()
+        print(
+            f"[+] Full book: {self.pacer.acked}/{self.pacer.expected} tables in {elapsed:.2f}s"
+            f" ({self.pacer.timed_out} without snapshot)"
+        )
+
+    async def send_strike_unsubscriptions(self, ws, epics):
+        """Delete the tables of expired strike epics."""
+        requests = []
+        for epic in epics:
+            for table in self.subscriptions.remove_strike(epic).values():
+                requests.append(((table,), WebSocketMessages.get_delete_message(
+                    self.session, table, self.subscriptions.next_req_phase(), self.win_phase
+                )))
+                self.pacer.forget(table)
+                self.ingest.unmap_table(table)
+                self.message_table.remove_message(table)
+        await self.send_batched(ws, requests)
+        if epics:
+            print(f"[+] Deleted {len(epics)} expired strike subs")
 
     async def send_hierarchy_subscriptions(self, ws):
         """Send hierarchy subscription messages."""
-        print(f"[+] Starting hierarchy subs at table {self.table_counter}")
+        print(f"[+] Starting hierarchy subs ({len(self.fx_ids)} markets)")
+        requests = []
         for fid in self.fx_ids:
-            if self.shutdown_event.is_set():
-                return
-            m = WebSocketMessages.get_hierarchy_message(
-                self.session, fid, self.table_counter, self.req_phase_counter, self.win_phase
-            )
-            await ws.send(m)
-            self.message_table.add_message("HIER", self.table_counter, fid)
-            self.table_counter += 1
-            self.req_phase_counter += 1
-            await asyncio.sleep(0.1)
+            table = self.subscriptions.allocate("HIER", fid)
+            self.ingest.register_raw(table, "HIER", HIERARCHY_SCHEMA, fid)
+            requests.append(((table,), WebSocketMessages.get_hierarchy_message(
+                self.session, fid, table, self.subscriptions.next_req_phase(), self.win_phase
+            )))
+            self.message_table.add_message("HIER", table, fid)
+        await self.send_batched(ws, requests)
         print(f"[+] Sent {len(self.fx_ids)} hierarchy subs")
 
+    async def replay_subscriptions(self, ws):
+        """Resubscribe every registered table under its existing id on a new session."""
+        print(f"[+] Replaying {len(self.subscriptions.tables)} subscriptions")
+        self.pacer.pending.clear()  # anything unacknowledged belonged to the old session
+        self.pacer.begin()
+        strikes, others = [], []
+        for table, (kind, name) in sorted(self.subscriptions.tables.items()):
+            phase = self.subscriptions.next_req_phase()
+            if kind == "HIER":
+                m = WebSocketMessages.get_hierarchy_message(self.session, name, table, phase, self.win_phase)
+                others.append(((table,), m))
+                self.message_table.add_message("HIER", table, name)
+                continue
+            enc = name.replace(".", "%2E").replace("-", "%2D")
+            if kind == "STRIKE":
+                m = WebSocketMessages.get_strike_message_type1(self.session, enc, table, phase, self.win_phase)
+                self.message_table.add_message("STRIKE1", table, name)
+            else:
+                m = WebSocketMessages.get_strike_message_type2(self.session, enc, table, phase, self.win_phase)
+                self.message_table.add_message("STRIKE2", table, name)
+            strikes.append(((table,), m))
+        await self.send_batched(ws, strikes, paced=True)
+        await self.send_batched(ws, others)
+        elapsed = await self.pacer.wait_for_all()
+        print(
+            f"[+] Full book: {self.pacer.acked}/{self.pacer.expected} tables in {elapsed:.2f}s"
+            f" ({self.pacer.timed_out} without snapshot)"
+        )
+
+    async def maintain_subscriptions(self, ws):
+        """
+        Subscribe strikes and hierarchy (or replay them after a reconnect),
+        then keep them current at each rollover.
+        """
+        start = time.perf_counter()
+        if self.subscriptions.tables:
+            await self.replay_subscriptions(ws)
+        else:
+            await self.send_strike_subscriptions(ws)
+            if self.shard.primary:
+                await self.send_hierarchy_subscriptions(ws)
+        self.message_table.print_table()
+        print(f"[+] Startup subscriptions done in {time.perf_counter() - start:.2f}s")
+        if self.reconcile:
+            print("[+] Reconciling subscribed strikes with live navigation…")
+            await self.sync_strikes(ws, retire=True)
+            self.reconcile = False
+        await self.resubscribe_instruments(ws)
+
     async def handle_ping_pong(self, ws):
         """Handle ping/pong messages to keep connection alive."""
         while not self.shutdown_event.is_set():
@@ -122,76 +227,179 @@ class WebSocketManager:
                 ping = WebSocketMessages.get_ping_message(self.session, self.phase)
                 await ws.send(ping)
                 self.last_ping = time.time()
-                print(f"[PING] @ {time.strftime('%H:%M:%S')}")
+                if ping_log.sample():
+                    ping_log.info(f"[PING] @ {time.strftime('%H:%M:%S')}")
             try:
                 await asyncio.wait_for(self.shutdown_event.wait(), timeout=1.0)
                 break
             except asyncio.TimeoutError:
                 continue
 
-    async def resubscribe_instruments(self, ws):
-        """Periodically resubscribe to instruments."""
-        while not self.shutdown_event.is_set():
-            now = datetime.datetime.now()
-            # next 5-min mark
-            nxt = ((now.minute // 5) + 1) * 5
-            if nxt >= 60:
-                nxt_time = now.replace(hour=now.hour + 1, minute=0, second=0, microsecond=0)
-            else:
-                nxt_time = now.replace(minute=nxt, second=0, microsecond=0)
-            wait = (nxt_time - now).total_seconds()
-            print(f"[TIMER] wait {int(wait)}s until {nxt_time.strftime('%H:%M:%S')}")
+    async def _sleep_until(self, when):
+        """Sleep until a wall-clock datetime; returns False if shutdown was requested."""
+        wait = (when - datetime.datetime.now()).total_seconds()
+        if wait > 0:
             try:
                 await asyncio.wait_for(self.shutdown_event.wait(), timeout=wait)
-                break
             except asyncio.TimeoutError:
                 pass
-            if self.shutdown_event.is_set():
+        return not self.shutdown_event.is_set()
+
+    async def sync_strikes(self, ws, retire):
+        """
+        Discover markets and subscribe strikes not yet live. With retire, also
+        delete live strikes that are no longer listed.
+        """
+        try:
+            # Discovery is blocking HTTP; keep ingest and relay running
+            fx_ids, mapping, levels = await discover_markets_async()
+        except Exception as e:
+            print(f"[ERROR] Resubscription discovery failed: {e}")
+            return
+        if not fx_ids:
+            print("[-] none found on resub")
+            return
+        self.ingest.set_levels(levels)
+        self.mapping = mapping
+        added, removed = self.subscriptions.sync(self.shard.select(mapping))
+        if not retire:
+            removed = []
+        print(
+            f"[RESUB] +{len(added)} new, -{len(removed)} expired, "
+            f"{len(self.subscriptions.strikes) - len(removed)} unchanged"
+        )
+        # Delete expired strikes first so their ids are free for the next
+        # rollover, then add the new listings
+        await self.send_strike_unsubscriptions(ws, removed)
+        await self.send_strike_subscriptions(ws, added)
+
+    async def resubscribe_instruments(self, ws):
+        """
+        Keep strike subscriptions current across 5-minute rollovers. Discovery
+        starts PREFETCH_LEAD seconds before each boundary and repeats every
+        PREFETCH_POLL seconds, subscribing the next cycle's strikes as soon as
+        they are listed. Strikes that are no longer listed are deleted
+        RETIRE_GRACE seconds after the boundary.
+        """
+        lead = datetime.timedelta(seconds=Config.PREFETCH_LEAD)
+        grace = datetime.timedelta(seconds=Config.RETIRE_GRACE)
+        while not self.shutdown_event.is_set():
+            boundary = next_rollover(datetime.datetime.now())
+            print(f"[TIMER] prefetch at {(boundary - lead).strftime('%H:%M:%S')} for {boundary.strftime('%H:%M:%S')} rollover")
+            if not await self._sleep_until(boundary - lead):
                 break
 
             print(f"[RESUB] @ {datetime.datetime.now().strftime('%H:%M:%S')}")
-            tree = fetch_market_tree()
-            fx_ids = extract_forex_ids(tree)
-            if not fx_ids:
-                print("[-] none found on resub")
-                continue
-            self.mapping = map_market_data(fx_ids)
-            clear_table_mapping()  # Clear old mappings
-            await self.send_strike_subscriptions(ws)
+            mark = loop_lag.mark()
+            start = time.perf_counter()
+            retire_at = boundary + grace
+            while datetime.datetime.now() < retire_at:
+                await self.sync_strikes(ws, retire=False)
+                poll = datetime.datetime.now() + datetime.timedelta(seconds=Config.PREFETCH_POLL)
+                if not await self._sleep_until(min(poll, retire_at)):
+                    return
+            await self.sync_strikes(ws, retire=True)
+            stall, stalls, max_lag = loop_lag.since(mark)
+            print(
+                f"[RESUB] done in {time.perf_counter() - start:.2f}s, "
+                f"loop stalled {stall * 1000:.0f}ms ({stalls}x), max lag {max_lag * 1000:.0f}ms"
+            )
 
     async def listen_and_relay(self):
-        """Main WebSocket listener that relays messages."""
-        uri = f"wss://{self.host}/lightstreamer"
+        """
+        Main WebSocket listener that relays messages. Returns when the
+        connection ends, with "stalled" if it went silent or a resync reason
+        if the ingest dropped frames.
+        """
+        uri = f"{Config.NADEX_WS_SCHEME}://{self.host}/lightstreamer"
         async with websockets.connect(uri, subprotocols=["js.lightstreamer.com"]) as nadex_ws:
             await self.send_initial_subscriptions(nadex_ws)
             self.message_table.print_table()
+            if self.reconnects:
+                await self.ingest.status({"type": "status", "status": "reconnected", "reconnects": self.reconnects})
 
-            await self.send_strike_subscriptions(nadex_ws)
-            await self.send_hierarchy_subscriptions(nadex_ws)
-            self.message_table.print_table()
-
-            # Start background tasks
+            # Start background tasks; strike subscriptions run alongside the
+            # reader below, whose snapshots pace them
+            loop_lag.start()
             ping_task = asyncio.create_task(self.handle_ping_pong(nadex_ws))
-            resub_task = asyncio.create_task(self.resubscribe_instruments(nadex_ws))
-
-            print("[+] Relaying Nadex → Frontends…")
-            async for msg in nadex_ws:
-                if self.shutdown_event.is_set():
-                    break
-                    
-                # Detect PONG
-                if "PONG" in msg.upper():
-                    print(f"[PONG] @ {time.strftime('%H:%M:%S')}")
-                    
-                # Relay to frontend and process message
-                await relay_to_frontend(msg)
-                process_message(msg)
-
-            # Clean up background tasks
-            ping_task.cancel()
-            resub_task.cancel()
+            resub_task = asyncio.create_task(self.maintain_subscriptions(nadex_ws))
+
             try:
-                await ping_task
-                await resub_task
+                print("[+] Relaying Nadex → Frontends…")
+                while not self.shutdown_event.is_set():
+                    try:
+                        msg = await asyncio.wait_for(nadex_ws.recv(), timeout=Config.STALL_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        print(f"[-] No data from Nadex for {Config.STALL_TIMEOUT}s, treating connection as stalled")
+                        return "stalled"
+                    self.connected_since = self.connected_since or time.monotonic()
+
+                    # Detect PONG
+                    if "PONG" in msg.upper() and ping_log.sample():
+                        ping_log.info(f"[PONG] @ {time.strftime('%H:%M:%S')}")
+
+                    # Hand the frame to the ingest (decode and relay here, or
+                    # forward to the parent process); snapshots pace subscriptions
+                    snapshots = await self.ingest.frame(msg, bool(self.pacer.pending))
+                    for table in snapshots:
+                        self.pacer.acknowledge(table)
+                    if self.ingest.take_resync():
+                        return "resync after dropped frames"
+            finally:
+                # Clean up background tasks (the loop lag monitor is per process
+                # and may be shared with other shards, so it keeps running)
+                ping_task.cancel()
+                resub_task.cancel()
+                await asyncio.gather(ping_task, resub_task, return_exceptions=True)
+
+    def _backoff(self, attempt):
+        """Exponential reconnect delay with jitter (between half and all of the step)."""
+        step = min(Config.RECONNECT_MAX_DELAY, Config.RECONNECT_BASE_DELAY * (2 ** attempt))
+        return random.uniform(step / 2, step)
+
+    async def run(self):
+        """
+        Supervised connection loop. When the Nadex connection drops or stalls,
+        frontends are told about the gap, a new Lightstreamer session is created
+        (reusing the XST token while it is accepted) and every registered
+        subscription is replayed under its table id.
+        """
+        attempt = 0
+        while not self.shutdown_event.is_set():
+            self.connected_since = None
+            try:
+                reason = await self.listen_and_relay() or "connection closed"
             except asyncio.CancelledError:
-                pass
\ No newline at end of file
+                raise
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+            if self.shutdown_event.is_set():
+                break
+
+            # A connection that delivered data for a while resets the backoff
+            if self.connected_since and time.monotonic() - self.connected_since > Config.RECONNECT_MAX_DELAY:
+                attempt = 0
+            print(f"[-] Nadex connection lost ({reason})")
+            await self.ingest.status({"type": "status", "status": "disconnected", "reason": reason})
+
+            while not self.shutdown_event.is_set():
+                delay = self._backoff(attempt)
+                attempt += 1
+                print(f"[+] Reconnecting in {delay:.1f}s (attempt {attempt})…")
+                try:
+                    await asyncio.wait_for(self.shutdown_event.wait(), timeout=delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    loop = asyncio.get_running_loop()
+                    sid, host, phase = await loop.run_in_executor(None, get_session_info)
+                except Exception as e:
+                    print(f"[ERROR] Failed to create Nadex session: {e}")
+                    continue
+                self.session, self.host, self.phase = sid, host, phase + 2
+                # Strikes may have rolled while disconnected
+                self.reconcile = True
+                self.reconnects += 1
+                print(f"[+] New session={sid} host={host}")
+                break
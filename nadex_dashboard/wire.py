@@ -0,0 +1,138 @@
+# ---------------------------------------------------------------
+# File        : wire.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+"""
+Compact binary encoding of normalized table updates for frontend clients.
+
+A binary delta message (sent as a WebSocket binary frame):
+
+    header   : magic b"NB", u8 version, u8 type (1 = delta), u16 count
+    record*  : u32 seq, u32 table id, u32 field mask, u32 text mask, values
+
+All integers are little-endian; schemas have at most 32 fields. Bit i of
+the field mask is set when schema field i changed; the values of set fields
+follow in field order. If bit i
+of the text mask is also set, the value is text: its UTF-8 byte length as
+a varint (LEB128: 7 bits per byte, low bits first, high bit set on every
+byte but the last), then the bytes, never truncated. Otherwise it is a
+float64 price/size. Only canonical decimals go as floats: no sign on zero,
+no exponent, no leading or trailing zeros, at most 15 significant digits,
+so the float's shortest round-trip digits in fixed notation ("1.0845",
+"46") give back the text exactly. Anything else ("1.08450", "nan", "1e3") is text, as are
+empty ($) fields, with length 0.
+
+Field names per bit come from the schemas sent with the JSON snapshot
+({"schemas": {kind: [field, ...]}, "tables": [{"table", "kind", ...}]}).
+decode_message is the reference decoder.
+"""
+
+import re
+import struct
+
+MAGIC = b"NB"
+VERSION = 2  # 2: varint text lengths (1 had u8 lengths, truncated at 255 bytes)
+MSG_DELTA = 1
+
+_HEADER = struct.Struct("<2sBBH")
+MAX_RECORDS = 0xFFFF  # per delta message (u16 count)
+_SEQ = struct.Struct("<I")
+_RECORD = struct.Struct("<III")  # table id, field mask, text mask
+_FLOAT = struct.Struct("<d")
+
+# Decimals whose float64 formats back to the same text
+_NUMBER_RE = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d*[1-9])?")
+_MAX_DIGITS = 15
+
+def _is_number(value):
+    if not _NUMBER_RE.fullmatch(value) or value == "-0":
+        return False
+    digits = value.lstrip("-").replace(".", "").lstrip("0")
+    return len(digits) <= _MAX_DIGITS
+
+def _varint(n):
+    """LEB128 encoding of a non-negative int."""
+    if n < 0x80:
+        return bytes((n,))
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+def _read_varint(data, offset):
+    """(value, offset after it) of the LEB128 int at offset."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def encode_update_body(table, values):
+    """
+    Encode one update without its sequence number: table id, masks and
+    packed values. values is positional, None for unchanged fields.
+    """
+    mask = text_mask = 0
+    parts = []
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        mask |= 1 << i
+        if _is_number(value):
+            parts.append(_FLOAT.pack(float(value)))
+            continue
+        text_mask |= 1 << i
+        data = value.encode("utf-8")
+        parts.append(_varint(len(data)) + data)
+    return _RECORD.pack(table, mask, text_mask) + b"".join(parts)
+
+def encode_delta(records):
+    """Build a delta message from at most MAX_RECORDS (seq, encoded body) pairs."""
+    chunks = [_HEADER.pack(MAGIC, VERSION, MSG_DELTA, len(records))]
+    for seq, body in records:
+        chunks.append(_SEQ.pack(seq))
+        chunks.append(body)
+    return b"".join(chunks)
+
+def decode_message(data, table_fields):
+    """
+    Reference decoder. table_fields maps table id -> list of schema field
+    names. Returns a list of {"seq", "table", "fields"} dicts; prices and
+    sizes come back as floats, text fields as str.
+    """
+    magic, version, msg_type, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Nadex binary message")
+    if msg_type != MSG_DELTA:
+        raise ValueError(f"Unknown message type {msg_type}")
+    offset = _HEADER.size
+    updates = []
+    for _ in range(count):
+        (seq,) = _SEQ.unpack_from(data, offset)
+        table, mask, text_mask = _RECORD.unpack_from(data, offset + _SEQ.size)
+        offset += _SEQ.size + _RECORD.size
+        names = table_fields.get(table, [])
+        fields = {}
+        i = 0
+        while mask >> i:
+            if (mask >> i) & 1:
+                name = names[i] if i < len(names) else str(i)
+                if (text_mask >> i) & 1:
+                    length, offset = _read_varint(data, offset)
+                    fields[name] = bytes(data[offset:offset + length]).decode("utf-8")
+                    offset += length
+                else:
+                    (fields[name],) = _FLOAT.unpack_from(data, offset)
+                    offset += _FLOAT.size
+            i += 1
+        updates.append({"seq": seq, "table": table, "fields": fields})
+    return updates
@@ -0,0 +1,107 @@
+# ---------------------------------------------------------------
+# File        : test_analytics.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import math
+
+import pytest
+
+from nadex_dashboard.analytics import StrikeLadders, parse_level
+from nadex_dashboard.orderbook import OrderBookStore
+
+LOW, HIGH, FAR = "NB.I.EUR-USD.OPT-1-1", "NB.I.EUR-USD.OPT-1-2", "NB.I.EUR-USD.OPT-1-3"
+
+@pytest.fixture
+def store():
+    return OrderBookStore()
+
+@pytest.fixture
+def ladders(store):
+    table_underlying = {}
+    ladders = StrikeLadders(store, table_underlying)
+    for table_id, epic in [(20, HIGH), (22, LOW)]:
+        store.register(table_id, epic, "STRIKE")
+        table_underlying[table_id] = "EURUSD"
+    ladders.set_levels({LOW: 1.080, HIGH: 1.085})
+    return ladders
+
+def _quote(store, ladders, table_id, bid, ask):
+    ladders.update(store.apply(table_id, [bid, ask, "10", "20"]))
+
+@pytest.mark.parametrize("name, level", [
+    ("EUR/USD >1.08450 (3PM)", 1.0845),
+    ("USD/JPY >151.2 (11AM)", 151.2),
+    ("EUR/USD > -0.5", -0.5),
+    ("EUR/USD 3PM", None),
+    (None, None),
+])
+def test_parse_level(name, level):
+    assert parse_level(name) == level
+
+def test_ladder_is_sorted_by_level(store, ladders):
+    ladders.refresh()
+    _quote(store, ladders, 20, "30", "34")
+    _quote(store, ladders, 22, "60", "64")
+    ladders.spot("EURUSD", 1.0830)
+    ladders.refresh()
+    ladder = ladders.get("EURUSD")
+    assert ladder.epics == [LOW, HIGH]
+    assert ladder.level.tolist() == [1.080, 1.085]
+    assert ladder.mid.tolist() == [62.0, 32.0]
+    assert ladder.spread.tolist() == [4.0, 4.0]
+    assert ladder.probability.tolist() == pytest.approx([0.62, 0.32])
+    assert ladder.distance.tolist() == pytest.approx([0.003, -0.002])
+    assert ladder.bid_size.tolist() == [10.0, 10.0]
+
+def test_missing_values_are_nan(store, ladders):
+    store.register(24, FAR, "STRIKE")
+    ladders.table_underlying[24] = "EURUSD"
+    ladders.invalidate()
+    ladders.refresh()
+    _quote(store, ladders, 20, "30", "")
+    ladders.refresh()
+    ladder = ladders.get("EURUSD")
+    # No level known: last, with NaN level and distance
+    assert ladder.epics[-1] == FAR
+    assert math.isnan(ladder.level[-1]) and math.isnan(ladder.distance[-1])
+    # No spot yet, and an empty ask
+    assert math.isnan(ladder.spot) and math.isnan(ladder.distance[0])
+    assert math.isnan(ladder.mid[1])
+
+def test_rebuild_after_mapping_change(store, ladders):
+    ladders.refresh()
+    _quote(store, ladders, 20, "30", "34")
+    ladders.spot("EURUSD", 1.0830)
+    ladders.refresh()
+
+    store.unregister(22)
+    store.register(30, "NB.I.GBP-USD.OPT-1-1", "STRIKE")
+    ladders.table_underlying[30] = "GBPUSD"
+    ladders.invalidate()
+    ladders.refresh()
+    eurusd = ladders.get("EURUSD")
+    assert eurusd.epics == [HIGH]
+    # Quotes and spot carry over into the new columns
+    assert (eurusd.mid.tolist(), eurusd.spot) == ([32.0], 1.0830)
+    assert eurusd.distance.tolist() == pytest.approx([-0.002])
+    assert ladders.get("GBPUSD").epics == ["NB.I.GBP-USD.OPT-1-1"]
+    assert set(ladders.rows) == {HIGH, "NB.I.GBP-USD.OPT-1-1"}
+
+def test_set_levels_keeps_subscribed_epics(ladders):
+    ladders.refresh()
+    ladders.set_levels({FAR: 1.090})
+    # LOW and HIGH are subscribed, so their levels stay
+    assert ladders.levels == {LOW: 1.080, HIGH: 1.085, FAR: 1.090}
+    # FAR never got a row: the next pass without it drops its level
+    ladders.set_levels({})
+    assert ladders.levels == {LOW: 1.080, HIGH: 1.085}
+
+def test_to_dict(store, ladders):
+    ladders.refresh()
+    data = ladders.get("EURUSD").to_dict()
+    assert data["pair"] == "EURUSD" and data["epics"] == [LOW, HIGH]
+    assert data["level"] == [1.080, 1.085]
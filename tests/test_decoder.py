@@ -0,0 +1,88 @@
+# ---------------------------------------------------------------
+# File        : test_decoder.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import pytest
+
+from nadex_dashboard.decoder import FrameDecoder, MergedState, split_fields
+
+FIELDS = ["displayBid", "displayOffer", "updateTime"]
+
+@pytest.fixture
+def decoder():
+    d = FrameDecoder()
+    d.register(20, "STRIKE", FIELDS, "NB.I.EUR-USD.OPT-1-1")
+    d.register(21, "HIER", ["json"], "hier", mode="RAW")
+    return d
+
+def _values(decoder, frame):
+    return [(u.kind, u.table, u.values) for u in decoder.decode(frame)]
+
+def test_snapshot_and_delta(decoder):
+    assert _values(decoder, "z(20,1,'44.5','46','12:00:00');d(20,1,'45',#,$)") == [
+        ("z", 20, ["44.5", "46", "12:00:00"]),
+        ("d", 20, ["45", None, ""]),
+    ]
+
+def test_unregistered_tables_are_skipped(decoder):
+    assert _values(decoder, "d(99,1,'1','2');loop();d(20,1,#,'47',#)") == [("d", 20, [None, "47", None])]
+
+@pytest.mark.parametrize("frame, values", [
+    # Commas and parentheses inside quoted values
+    ("d(20,1,'a,b','c)d',#)", ["a,b", "c)d", None]),
+    # Escaped quotes and backslashes
+    (r"d(20,1,'it\'s','c\\d',$)", ["it's", "c\\d", ""]),
+    (r"d(20,1,'café',#,#)", ["café", None, None]),
+    # Whitespace around the call arguments and fields
+    ("d( 20 , 1 ,'1', '2' ,#)", ["1", "2", None]),
+    # Fewer fields than the schema
+    ("d(20,1,'1','2')", ["1", "2"]),
+])
+def test_quoting(decoder, frame, values):
+    assert _values(decoder, frame) == [("d", 20, values)]
+
+def test_raw_table_json_value(decoder):
+    frame = """d(21,1,'{"id": 1, "names": ["a", "b"]}')"""
+    assert _values(decoder, frame) == [("d", 21, ['{"id": 1, "names": ["a", "b"]}'])]
+
+def test_quoted_markers_are_literal_in_slow_path():
+    assert split_fields(",'#','$',#,$") == ["#", "$", None, ""]
+
+def test_to_raw_round_trip(decoder):
+    frame = r"d(20,1,'it\'s, ok','c\\d',$)"
+    (update,) = decoder.decode(frame)
+    (again,) = decoder.decode(update.to_raw())
+    assert again.values == update.values == ["it's, ok", "c\\d", ""]
+
+def test_fields_and_get(decoder):
+    (update,) = decoder.decode("d(20,1,'45',#,'12:00:01')")
+    assert update.fields() == {"displayBid": "45", "updateTime": "12:00:01"}
+    assert update.get("displayOffer", "n/a") == "n/a"
+    assert update.get("updateTime") == "12:00:01"
+
+def test_merged_state_snapshot(decoder):
+    state = MergedState()
+    for update in decoder.decode("z(20,1,'44','46','12:00:00');d(20,1,'45',#,#);d(20,1,#,$,'12:00:01')"):
+        state.apply(update)
+    # RAW tables are relayed but not merged
+    for update in decoder.decode("d(21,1,'{}')"):
+        state.apply(update)
+    (snapshot,) = state.snapshot()
+    assert (snapshot.kind, snapshot.table, snapshot.values) == ("z", 20, ["45", "", "12:00:01"])
+    assert state.snapshot(lambda schema: schema.kind == "FOREX") == []
+
+def test_merged_state_resets_on_new_schema(decoder):
+    state = MergedState()
+    for update in decoder.decode("z(20,1,'44','46','12:00:00')"):
+        state.apply(update)
+    # The id is reused for another epic
+    decoder.register(20, "STRIKE", FIELDS, "NB.I.EUR-USD.OPT-1-2")
+    for update in decoder.decode("d(20,1,'10',#,#)"):
+        state.apply(update)
+    (snapshot,) = state.snapshot()
+    assert snapshot.values == ["10", None, None]
+    assert snapshot.schema.name == "NB.I.EUR-USD.OPT-1-2"
@@ -0,0 +1,144 @@
+# ---------------------------------------------------------------
+# File        : test_fanout.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import asyncio
+import json
+
+import pytest
+
+from nadex_dashboard.decoder import FrameDecoder
+from nadex_dashboard.fanout import ClientSession, Snapshot, CONFLATE, DROP_OLDEST, DISCONNECT, RAW, JSON, BINARY
+from nadex_dashboard.wire import decode_message, MAX_RECORDS
+
+FIELDS = ["displayBid", "displayOffer", "updateTime"]
+
+class FakeWebSocket:
+    remote_address = ("127.0.0.1", 0)
+
+    def __init__(self):
+        self.closed_with = None
+
+    async def close(self, code, reason):
+        self.closed_with = code
+
+@pytest.fixture
+def decoder():
+    d = FrameDecoder()
+    d.register(20, "STRIKE", FIELDS, "NB.I.EUR-USD.OPT-1-1")
+    d.register(22, "STRIKE", FIELDS, "NB.I.EUR-USD.OPT-1-2")
+    return d
+
+def _update(decoder, frame):
+    (update,) = decoder.decode(frame)
+    return update
+
+def test_merge(decoder):
+    z = _update(decoder, "z(20,1,'44','46','12:00:00')")
+    d = _update(decoder, "d(20,1,'45',#,'12:00:01')")
+    merged = z.merge(d)
+    # A snapshot stays a snapshot, with the newer values over the older
+    assert (merged.kind, merged.values) == ("z", ["45", "46", "12:00:01"])
+    merged = d.merge(_update(decoder, "d(20,1,#,$,#)"))
+    assert (merged.kind, merged.values) == ("d", ["45", "", "12:00:01"])
+
+def test_conflation_reuses_seq(decoder):
+    session = ClientSession(FakeWebSocket(), max_queue=10, policy=CONFLATE, format=JSON)
+    session.enqueue(_update(decoder, "d(20,1,'44',#,#)"), key=20)
+    session.enqueue(_update(decoder, "d(22,1,'10',#,#)"), key=22)
+    session.enqueue(_update(decoder, "d(20,1,#,'46',#)"), key=20)
+    assert len(session.queue) == 2 and session.seq == 2
+    (frame,) = session._drain()
+    updates = json.loads(frame)["updates"]
+    assert [u["seq"] for u in updates] == [1, 2]
+    assert updates[0]["fields"] == {"displayBid": "44", "displayOffer": "46"}
+
+def test_no_conflation_across_a_snapshot(decoder):
+    session = ClientSession(FakeWebSocket(), max_queue=10, policy=CONFLATE, format=JSON)
+    session.enqueue(_update(decoder, "d(20,1,'1.0',#,#)"), key=20)
+    session.enqueue(Snapshot([_update(decoder, "z(20,1,'1.0','46',$)")]))
+    session.enqueue(_update(decoder, "d(20,1,'2.0',#,#)"), key=20)
+    session.enqueue("message")
+    session.enqueue(_update(decoder, "d(20,1,'3.0',#,#)"), key=20)
+    session.enqueue(_update(decoder, "d(20,1,'4.0',#,#)"), key=20)
+    frames = session._drain()
+    first, snapshot, second = [json.loads(frame) for frame in frames[:3]]
+    last = json.loads(frames[4])
+    assert frames[3] == "message"
+    # The snapshot is a barrier: later updates for table 20 queue after it
+    assert (first["updates"][0]["seq"], first["updates"][0]["fields"]) == (1, {"displayBid": "1.0"})
+    assert (snapshot["seq"], snapshot["tables"][0]["fields"]["displayBid"]) == (2, "1.0")
+    assert (second["updates"][0]["seq"], second["updates"][0]["fields"]) == (3, {"displayBid": "2.0"})
+    assert (last["updates"][0]["seq"], last["updates"][0]["fields"]) == (4, {"displayBid": "4.0"})
+
+def test_max_rate_conflates_any_policy(decoder):
+    session = ClientSession(FakeWebSocket(), max_queue=10, policy=DROP_OLDEST, format=RAW, max_rate=5)
+    assert not session.verbatim
+    for bid in ("1", "2", "3"):
+        session.enqueue(_update(decoder, f"d(20,1,'{bid}',#,#)"), key=20)
+    assert session._drain() == ["d(20,1,'3',#,#);"]
+
+def test_drop_oldest(decoder):
+    session = ClientSession(FakeWebSocket(), max_queue=2, policy=DROP_OLDEST, format=JSON)
+    for bid in ("1", "2", "3"):
+        session.enqueue(_update(decoder, f"d(20,1,'{bid}',#,#)"), key=20)
+    assert session.dropped == 1
+    (frame,) = session._drain()
+    # The gap in seq tells the client a message was dropped
+    assert [u["seq"] for u in json.loads(frame)["updates"]] == [2, 3]
+
+def test_disconnect_slow_consumer(decoder):
+    async def run():
+        websocket = FakeWebSocket()
+        session = ClientSession(websocket, max_queue=1, policy=DISCONNECT, format=RAW)
+        assert session.enqueue("a")
+        assert not session.enqueue("b")
+        await asyncio.sleep(0)
+        return session, websocket
+
+    session, websocket = asyncio.run(run())
+    assert session.closed and not session.queue
+    assert websocket.closed_with == 1013
+
+def test_snapshot_packing(decoder):
+    session = ClientSession(FakeWebSocket(), max_queue=10, format=JSON)
+    snapshot = Snapshot([_update(decoder, "z(20,1,'44','46',$)"), _update(decoder, "z(22,1,'1',#,#)")])
+    session.enqueue(_update(decoder, "d(20,1,'45',#,#)"), key=20)
+    session.enqueue(snapshot)
+    session.enqueue(_update(decoder, "d(22,1,'2',#,#)"), key=22)
+    first, middle, last = [json.loads(frame) for frame in session._drain()]
+    assert first["type"] == last["type"] == "delta"
+    assert (middle["type"], middle["seq"], len(middle["tables"])) == ("snapshot", 2, 2)
+    assert last["updates"][0]["seq"] == 3
+    assert snapshot.to_raw() == "z(20,1,'44','46',$);z(22,1,'1',#,#);"
+
+def test_raw_deltas_share_a_frame(decoder):
+    session = ClientSession(FakeWebSocket(), max_queue=10, format=RAW)
+    session.enqueue_many([
+        (_update(decoder, "d(20,1,'1',#,#)"), 20),
+        (_update(decoder, "d(22,1,'2',#,#)"), 22),
+    ])
+    assert session._drain() == ["d(20,1,'1',#,#);d(22,1,'2',#,#);"]
+
+def test_binary_deltas_split_at_record_limit(decoder):
+    count = MAX_RECORDS + 10
+    session = ClientSession(FakeWebSocket(), max_queue=count + 1, format=BINARY)
+    update = _update(decoder, "d(20,1,'1',#,#)")
+    session.enqueue_many([(update, None)] * count)
+    schema, first, second = session._drain()
+    assert json.loads(schema)["type"] == "schema"
+    records = decode_message(first, {20: FIELDS}) + decode_message(second, {20: FIELDS})
+    assert [r["seq"] for r in records] == list(range(1, count + 1))
+
+@pytest.mark.parametrize("kwargs, verbatim", [
+    ({}, True),
+    ({"policy": CONFLATE}, False),
+    ({"max_rate": 10}, False),
+    ({"format": JSON}, False),
+])
+def test_verbatim(kwargs, verbatim):
+    assert ClientSession(FakeWebSocket(), max_queue=10, **kwargs).verbatim is verbatim
@@ -0,0 +1,111 @@
+# ---------------------------------------------------------------
+# File        : test_history.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import math
+
+import numpy as np
+import pytest
+
+from nadex_dashboard.history import Bars, Series, TickHistory
+
+def _series(capacity=8, bar_capacity=16):
+    return Series("EURUSD", capacity, bar_capacity, intervals=(1, 5))
+
+def test_bars_fold_across_bucket_boundaries():
+    series = _series()
+    for ts, price in [(0.0, 10), (0.5, 12), (1.2, 11), (1.8, 9)]:
+        series.append(ts, price, price)
+    series.roll()
+    # Continues the open 1s bar, then opens the next one
+    for ts, price in [(1.9, 13), (2.1, 8)]:
+        series.append(ts, price, price)
+    series.roll()
+
+    bars = series.bars[1].arrays()
+    assert bars["start"].tolist() == [0.0, 1.0, 2.0]
+    assert bars["open"].tolist() == [10, 11, 8]
+    assert bars["high"].tolist() == [12, 13, 8]
+    assert bars["low"].tolist() == [10, 9, 8]
+    assert bars["close"].tolist() == [12, 13, 8]
+    assert bars["ticks"].tolist() == [2, 3, 1]
+
+    bar = {field: column.tolist() for field, column in series.bars[5].arrays().items()}
+    assert bar == {"start": [0.0], "open": [10], "high": [13], "low": [8], "close": [8], "ticks": [6]}
+
+def test_bar_ring_keeps_the_latest():
+    bars = Bars(1, capacity=3)
+    bars.add(np.arange(5.0), np.arange(5.0))
+    assert bars.arrays()["start"].tolist() == [2.0, 3.0, 4.0]
+    bars.add(np.array([5.0, 6.0]), np.array([5.0, 6.0]))
+    assert bars.arrays()["start"].tolist() == [4.0, 5.0, 6.0]
+    assert bars.arrays(2)["close"].tolist() == [5.0, 6.0]
+
+def test_tick_ring_wraparound():
+    series = _series(capacity=4)
+    for i in range(10):
+        series.append(float(i), i, i + 0.5)
+    ts, bid, ask = series.ticks()
+    assert ts.tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert (ask - bid).tolist() == [0.5] * 4
+    assert series.ticks(2)[0].tolist() == [8.0, 9.0]
+    # Ticks were folded into the bars before being overwritten
+    series.roll()
+    assert series.bars[1].arrays()["ticks"].sum() == 10
+    assert series.since(7.5)[0].tolist() == [8.0, 9.0]
+
+def test_repeated_quote_is_skipped():
+    series = _series()
+    series.append(0.0, 1.0, 2.0)
+    series.append(0.1, 1.0, 2.0)
+    series.append(0.2, 1.0, 2.5)
+    assert series.count == 2
+
+def test_nan_quotes_are_kept_but_not_in_bars():
+    series = _series()
+    series.append(0.0, math.nan, 50.0)
+    series.append(0.5, 40.0, 50.0)
+    series.append(1.5, math.nan, math.nan)
+    series.roll()
+    assert series.count == 3
+    bars = series.bars[1].arrays()
+    assert bars["start"].tolist() == [0.0]
+    assert (bars["open"][0], bars["ticks"][0]) == (45.0, 1)
+
+def test_stats():
+    history = TickHistory(capacity=16, bar_capacity=4)
+    for ts, bid, ask in [(0.0, 9, 11), (10.0, 10, 12), (20.0, 11, 13), (30.0, math.nan, 13)]:
+        history.record("EURUSD", bid, ask, ts)
+    stats = history.stats("EURUSD", window=25, now=30.0)
+    assert stats["ticks"] == 2
+    assert (stats["mid"], stats["spread"], stats["mean_mid"]) == (12.0, 2.0, 11.5)
+    assert stats["volatility"] == 0.0  # one return
+    assert history.stats("EURUSD", window=5, now=30.0) is None
+    assert history.stats("GBPUSD") is None
+
+def test_history_bars():
+    history = TickHistory(capacity=16, bar_capacity=4)
+    history.record("EURUSD", 1.0, 1.0, 0.2)
+    history.record("EURUSD", 2.0, 2.0, 61.0)
+    assert history.bars("EURUSD", 60)["start"].tolist() == [0.0, 60.0]
+    assert history.bars("GBPUSD", 60) is None
+    history.discard("EURUSD")
+    assert history.names() == []
+
+@pytest.mark.parametrize("capacity", [3, 4, 7])
+def test_rolled_bars_match_a_single_pass(capacity):
+    rng = np.random.default_rng(capacity)
+    ts = np.cumsum(rng.uniform(0.1, 2.0, 50))
+    price = rng.uniform(1.0, 2.0, 50)
+    series = _series(capacity=capacity)
+    for t, p in zip(ts, price):
+        series.append(t, p, p)
+    series.roll()
+    reference = Bars(5, capacity=16)
+    reference.add(ts, price)
+    for field, column in reference.arrays().items():
+        assert series.bars[5].arrays()[field] == pytest.approx(column)
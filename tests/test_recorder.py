@@ -0,0 +1,81 @@
+# ---------------------------------------------------------------
+# File        : test_recorder.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import os
+
+import pytest
+
+from nadex_dashboard.decoder import FrameDecoder
+from nadex_dashboard.recorder import TickRecorder, TickReader, iter_records, build_index, TABLE, FRAME
+
+EPIC = "NB.I.EUR-USD.OPT-1-1"
+FIELDS = ["displayBid", "displayOffer"]
+SECOND = 10**9
+
+@pytest.fixture
+def schemas():
+    decoder = FrameDecoder()
+    decoder.register(9, "FOREX", ["lastTradedPrice", "updateTime"], "EUR/USD")
+    decoder.register(20, "STRIKE", FIELDS, EPIC)
+    return decoder.schemas
+
+def _record(directory, schemas, frames, segment_size=1 << 16, segment_seconds=0):
+    recorder = TickRecorder(str(directory), segment_size, segment_seconds, schemas.values())
+    for ts, frame in frames:
+        recorder.frame(frame, ts)
+    recorder.close()
+    return TickReader(str(directory))
+
+def _segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+
+def test_rotates_at_time_boundary(tmp_path, schemas):
+    frames = [(100 * SECOND + i * 20 * SECOND, f"d(20,1,'{i}',#)") for i in range(4)]
+    reader = _record(tmp_path, schemas, frames, segment_seconds=30)
+    # Boundaries at multiples of 30s: 100s | 120s, 140s | 160s
+    assert _segments(tmp_path) == [f"ticks-{t}.seg" for t in (100 * SECOND, 120 * SECOND, 160 * SECOND)]
+    assert [ts for ts, _ in reader.frames()] == [ts for ts, _ in frames]
+
+def test_rotates_when_full(tmp_path, schemas):
+    frames = [(SECOND + i, f"d(20,1,'{i}',#)" + " " * 200) for i in range(20)]
+    reader = _record(tmp_path, schemas, frames, segment_size=1024)
+    paths = [os.path.join(tmp_path, name) for name in _segments(tmp_path)]
+    assert len(paths) > 1
+    for path in paths:
+        assert os.path.getsize(path) <= 1024
+        # Every segment starts with the table definitions
+        kinds = [kind for _, kind, _, _ in iter_records(path)]
+        assert kinds[:2] == [TABLE, TABLE] and set(kinds[2:]) == {FRAME}
+    assert [frame for _, frame in reader.frames()] == [frame for _, frame in frames]
+
+def test_index_lookup(tmp_path, schemas):
+    frames = [
+        (1 * SECOND, "z(9,1,'1.08',#);z(20,1,'44','46')"),
+        (2 * SECOND, "d(9,1,'1.09',#)"),
+        (3 * SECOND, "d(20,1,'45',#)"),
+        (4 * SECOND, "d(20,1,#,'47');d(9,1,'1.10',#)"),
+    ]
+    reader = _record(tmp_path, schemas, frames)
+    (path,) = [os.path.join(tmp_path, name) for name in _segments(tmp_path)]
+    assert os.path.exists(path[:-4] + ".idx")
+    assert reader.names() == ["EUR/USD", EPIC]
+
+    updates = [(ts // SECOND, u.kind, u.values) for ts, u in reader.updates(EPIC)]
+    assert updates == [(1, "z", ["44", "46"]), (3, "d", ["45", None]), (4, "d", [None, "47"])]
+    ranged = [ts // SECOND for ts, _ in reader.updates("EUR/USD", start=2 * SECOND, end=3 * SECOND)]
+    assert ranged == [2]
+    assert list(reader.updates("NB.I.UNKNOWN")) == []
+
+def test_segment_without_index_is_scanned(tmp_path, schemas):
+    reader = _record(tmp_path, schemas, [(SECOND, "d(20,1,'45',#)")])
+    (path,) = [os.path.join(tmp_path, name) for name in _segments(tmp_path)]
+    os.remove(path[:-4] + ".idx")
+    (entry,) = build_index(path)["entries"][EPIC]
+    assert (entry[0], entry[2]) == (SECOND, 20)
+    assert [u.values for _, u in TickReader(str(tmp_path)).updates(EPIC)] == [["45", None]]
+    assert reader.names() == [EPIC]
@@ -0,0 +1,98 @@
+# ---------------------------------------------------------------
+# File        : test_ringbuffer.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import os
+
+import pytest
+
+from nadex_dashboard.ringbuffer import RingWriter, RingReader, Overrun, _pack_pair, _RES_A
+
+@pytest.fixture
+def ring():
+    writer = RingWriter(256, waiters=1)
+    reader = RingReader(writer.name, slot=0)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+def _record(i):
+    return b"%03d" % i * (i % 9 + 1)
+
+def test_wraparound(ring):
+    writer, reader = ring
+    expected, received = [], []
+    for i in range(300):
+        writer.write(_record(i))
+        expected.append(_record(i))
+        if i % 4 == 3:
+            received += reader.read()
+    received += reader.read()
+    assert received == expected
+    assert writer.pos > 10 * writer.capacity
+
+def test_pad_at_end_of_data(ring):
+    writer, reader = ring
+    writer.write(b"a" * 200)
+    assert reader.read() == [b"a" * 200]
+    # Does not fit the 52 bytes left: a pad marker, then the record at offset 0
+    writer.write(b"b" * 60)
+    assert reader.read() == [b"b" * 60]
+    assert writer.pos == 256 + 64
+
+def test_max_bytes(ring):
+    writer, reader = ring
+    for i in range(5):
+        writer.write(b"%d" % i * 20)
+    assert len(reader.read(max_bytes=30)) == 2
+    assert len(reader.read()) == 3
+
+def test_record_too_large(ring):
+    writer, _ = ring
+    with pytest.raises(ValueError):
+        writer.write(b"x" * 253)
+
+def test_overrun(ring):
+    writer, reader = ring
+    for _ in range(10):
+        writer.write(b"y" * 60)
+    with pytest.raises(Overrun):
+        reader.read()
+    reader.skip_to_end()
+    assert reader.read() == []
+    writer.write(b"after")
+    assert reader.read() == [b"after"]
+
+def test_record_being_overwritten_is_not_returned(ring):
+    writer, reader = ring
+    writer.write(b"z" * 100)
+    # The writer has reserved bytes that alias the unread record but not yet
+    # published them: the copy may be torn
+    _pack_pair(writer.buf, _RES_A, writer.pos + writer.capacity - 50)
+    with pytest.raises(Overrun):
+        reader.read()
+
+def test_wakeup(ring):
+    writer, reader = ring
+    read_fd, write_fd = os.pipe()
+    try:
+        writer.set_wakeup(0, write_fd)
+        writer.write(b"no one waiting")
+        assert reader.sleep() is False  # unread records
+        reader.skip_to_end()
+        assert reader.sleep() is True
+        writer.write(b"wake")
+        assert os.read(read_fd, 16) == b"\0"
+        reader.woke()
+        # Not flagged any more: the next record sends nothing
+        writer.write(b"quiet")
+        os.set_blocking(read_fd, False)
+        with pytest.raises(BlockingIOError):
+            os.read(read_fd, 16)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
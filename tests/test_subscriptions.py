@@ -0,0 +1,99 @@
+# ---------------------------------------------------------------
+# File        : test_subscriptions.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import pytest
+
+from nadex_dashboard.subscriptions import SubscriptionRegistry, Shard, flatten_mapping
+
+MAPPING = {
+    "m1": {"EUR/USD": ["NB.I.EUR-USD.OPT-1-1", "NB.I.EUR-USD.OPT-1-2"]},
+    "m2": {"GBP/USD": ["NB.I.GBP-USD.OPT-1-1"]},
+}
+
+@pytest.fixture
+def registry():
+    return SubscriptionRegistry(first_table=15, first_req_phase=100)
+
+def test_flatten_mapping():
+    assert flatten_mapping(MAPPING) == {
+        "NB.I.EUR-USD.OPT-1-1": "EUR/USD",
+        "NB.I.EUR-USD.OPT-1-2": "EUR/USD",
+        "NB.I.GBP-USD.OPT-1-1": "GBP/USD",
+    }
+
+def test_sync_diffs_against_live_strikes(registry):
+    added, removed = registry.sync(MAPPING)
+    assert removed == []
+    assert added == list(flatten_mapping(MAPPING).items())
+    for epic, ue in added:
+        registry.add_strike(epic, ue)
+    assert registry.sync(MAPPING) == ([], [])
+
+    fresh = {"m1": {"EUR/USD": ["NB.I.EUR-USD.OPT-1-2", "NB.I.EUR-USD.OPT-1-3"]}}
+    added, removed = registry.sync(fresh)
+    assert added == [("NB.I.EUR-USD.OPT-1-3", "EUR/USD")]
+    assert sorted(removed) == ["NB.I.EUR-USD.OPT-1-1", "NB.I.GBP-USD.OPT-1-1"]
+
+def test_strike_tables(registry):
+    tables = registry.add_strike("NB.I.EUR-USD.OPT-1-1", "EUR/USD")
+    assert tables == {"STRIKE": 15, "ORDERBOOK": 16}
+    assert registry.tables[16] == ("ORDERBOOK", "NB.I.EUR-USD.OPT-1-1")
+    assert registry.remove_strike("NB.I.EUR-USD.OPT-1-1") == tables
+    assert registry.tables == {} and registry.strikes == {}
+
+def test_released_ids_are_held_until_sync(registry):
+    registry.add_strike("a", "EUR/USD")             # 15, 16
+    registry.add_strike("b", "EUR/USD")             # 17, 18
+    registry.remove_strike("a")
+    # Late updates for 15/16 may still arrive: not reused yet
+    assert registry.add_strike("c", "EUR/USD") == {"STRIKE": 19, "ORDERBOOK": 20}
+    registry.sync({})
+    assert registry.add_strike("d", "EUR/USD") == {"STRIKE": 15, "ORDERBOOK": 16}
+    assert registry.high_water == 20
+
+def test_lowest_free_id_first(registry):
+    for epic in "abc":
+        registry.add_strike(epic, "EUR/USD")        # 15-20
+    registry.remove_strike("c")
+    registry.remove_strike("a")
+    registry.sync({})
+    assert registry.allocate("HIER", "x") == 15
+    assert registry.allocate("HIER", "y") == 16
+    assert registry.allocate("HIER", "z") == 19
+
+def test_table_range_exhausted():
+    registry = SubscriptionRegistry(first_table=15, first_req_phase=100, last_table=18)
+    registry.add_strike("a", "EUR/USD")
+    registry.add_strike("b", "EUR/USD")
+    with pytest.raises(RuntimeError):
+        registry.allocate("STRIKE", "c")
+
+def test_req_phase_wraps(registry):
+    registry = SubscriptionRegistry(first_table=15, first_req_phase=100, req_phase_window=3)
+    assert [registry.next_req_phase() for _ in range(7)] == [100, 101, 102, 100, 101, 102, 100]
+
+def test_clear(registry):
+    registry.add_strike("a", "EUR/USD")
+    registry.next_req_phase()
+    registry.clear()
+    assert registry.strikes == {} and registry.tables == {}
+    assert registry.allocate("STRIKE", "b") == 15
+    assert registry.next_req_phase() == 100
+
+def test_shard_select_is_a_partition():
+    shards = [Shard(index, 3) for index in range(3)]
+    parts = [flatten_mapping(shard.select(MAPPING)) for shard in shards]
+    assert sum(len(part) for part in parts) == 3
+    merged = {}
+    for part in parts:
+        merged.update(part)
+    assert merged == flatten_mapping(MAPPING)
+    # By underlying, a pair's whole ladder lands on one shard
+    owners = {shard.index for shard in shards for epic, ue in flatten_mapping(MAPPING).items()
+              if ue == "EUR/USD" and shard.owns(epic, ue)}
+    assert len(owners) == 1
@@ -0,0 +1,68 @@
+# ---------------------------------------------------------------
+# File        : test_wire.py
+# Author      : Shivam Garg
+# Created on  : 27-06-2005
+
+# Copyright (c) Shivam Garg. All rights reserved.
+# ---------------------------------------------------------------
+
+import pytest
+
+from nadex_dashboard.wire import encode_delta, encode_update_body, decode_message, _varint, _read_varint
+
+FIELDS = ["displayBid", "displayOffer", "updateTime", "marketStatus", "name"]
+
+def _round_trip(values, table=15, seq=7):
+    data = encode_delta([(seq, encode_update_body(table, values))])
+    (update,) = decode_message(data, {table: FIELDS})
+    assert update["seq"] == seq and update["table"] == table
+    return update["fields"]
+
+@pytest.mark.parametrize("n", [0, 1, 127, 128, 255, 256, 16383, 16384, 2 ** 32])
+def test_varint_round_trip(n):
+    data = b"x" + _varint(n) + b"y"
+    assert _read_varint(data, 1) == (n, len(data) - 1)
+
+def test_prices_and_markers():
+    fields = _round_trip(["44.5", None, "14:35:00", "", None])
+    assert fields == {"displayBid": 44.5, "updateTime": "14:35:00", "marketStatus": ""}
+
+@pytest.mark.parametrize("value, sent", [
+    ("1.0845", 1.0845),
+    ("46", 46.0),
+    ("-12.25", -12.25),
+    ("0", 0.0),
+    # Would not format back to the same text
+    ("1.08450", "1.08450"),
+    ("007", "007"),
+    ("-0", "-0"),
+    ("1234567890123456", "1234567890123456"),
+    # Text that float() would accept
+    ("nan", "nan"),
+    ("inf", "inf"),
+    ("1_000", "1_000"),
+    ("1e3", "1e3"),
+    (" 1", " 1"),
+])
+def test_only_canonical_decimals_are_floats(value, sent):
+    assert _round_trip([value]) == {"displayBid": sent}
+
+def test_long_text_is_not_truncated():
+    name = "EUR/USD >1.08450 (3PM) " * 40
+    assert len(name.encode("utf-8")) > 255
+    assert _round_trip([None, None, None, None, name]) == {"name": name}
+
+def test_multibyte_text():
+    # 3- and 4-byte characters across the old 255-byte boundary
+    name = "€" * 84 + "😀" * 10
+    fields = _round_trip(["1", "2", "ok", "Händler ✓", name])
+    assert fields["marketStatus"] == "Händler ✓"
+    assert fields["name"] == name
+
+def test_several_records():
+    bodies = [(1, encode_update_body(8, ["1.0842", "12:00:00"])), (2, encode_update_body(9, [None, "é" * 300]))]
+    updates = decode_message(encode_delta(bodies), {8: ["price", "time"], 9: ["price", "time"]})
+    assert updates == [
+        {"seq": 1, "table": 8, "fields": {"price": 1.0842, "time": "12:00:00"}},
+        {"seq": 2, "table": 9, "fields": {"time": "é" * 300}},
+    ]